@@ -1,23 +1,132 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.db.models.functions import Substr
+from django.forms.models import BaseInlineFormSet
+from django.template.defaultfilters import truncatechars
+
+from .editing import delete_comment
 from .models import Submission, Comment, Vote
+from .purge import soft_delete_submission
+from .utils.paginator import EstimatedCountPaginator
+
+
+class BoundedInlineFormSet(BaseInlineFormSet):
+    """Only load the newest ``max_objects`` related rows into the inline."""
+
+    max_objects = 10
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not queryset.query.is_sliced:
+            queryset = queryset.order_by("-pk")[: self.max_objects]
+            self._queryset = queryset
+        return queryset
+
+
+class PreviewChangeList(ChangeList):
+    """Fetch only the head of the ``content`` column for the changelist."""
+
+    preview_length = 80
+
+    def get_queryset(self, request, *args, **kwargs):
+        queryset = super().get_queryset(request, *args, **kwargs)
+        return queryset.defer("content").annotate(content_head=Substr("content", 1, self.preview_length + 1))
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings shared by the blog tables, which are too large for
+    exact COUNT(*) queries and for <select> widgets listing every row.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class ContentPreviewAdmin(LargeTableAdmin):
+    def get_changelist(self, request, **kwargs):
+        return PreviewChangeList
+
+    @admin.display(description="content")
+    def content_preview(self, obj):
+        return truncatechars(obj.content_head, PreviewChangeList.preview_length)
 
 
 # Register your models here.
 class SubmissionInline(admin.TabularInline):
     model = Submission
+    formset = BoundedInlineFormSet
+    fields = ("title", "timestamp", "comment_count")
+    readonly_fields = ("timestamp", "comment_count")
+    extra = 0
     max_num = 10
+    show_change_link = True
 
 
 class CommentsInline(admin.StackedInline):
     model = Comment
+    formset = BoundedInlineFormSet
+    fields = ("author", "parent", "content", "score")
+    readonly_fields = ("score",)
+    raw_id_fields = ("author", "parent")
+    extra = 0
     max_num = 10
+    show_change_link = True
 
 
-class SubmissionAdmin(admin.ModelAdmin):
-    list_display = ("title", "content", "author", "timestamp", "updated", "comment_count")
+class SubmissionAdmin(ContentPreviewAdmin):
+    list_display = ("title", "content_preview", "author", "timestamp", "updated", "comment_count", "deleted")
+    list_select_related = ("author",)
+    list_filter = ("deleted", "timestamp")
+    autocomplete_fields = ("author",)
+    readonly_fields = ("comment_count", "deleted")
     inlines = [CommentsInline]
 
+    # Deleting hides the submission and leaves its thread to the purge job,
+    # see apps.blog.purge, instead of cascading in the request.
+
+    def get_deleted_objects(self, objs, request):
+        # Collecting the whole thread for the confirmation page is what the purge avoids.
+        return [str(obj) for obj in objs], {self.opts.verbose_name_plural: len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        soft_delete_submission(obj)
+
+    def delete_queryset(self, request, queryset):
+        for submission in queryset:
+            soft_delete_submission(submission)
+
+
+class CommentAdmin(ContentPreviewAdmin):
+    list_display = ("id", "author", "submission", "content_preview", "score", "timestamp", "deleted")
+    list_select_related = ("author", "submission")
+    list_filter = ("deleted", "timestamp")
+    autocomplete_fields = ("author",)
+    raw_id_fields = ("submission", "parent")
+    readonly_fields = ("ups", "downs", "score", "edited", "deleted")
+
+    # Deleting leaves a tombstone in the tree, see apps.blog.editing,
+    # instead of cascading to the replies.
+
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], {self.opts.verbose_name_plural: len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        delete_comment(obj)
+
+    def delete_queryset(self, request, queryset):
+        for comment in queryset:
+            delete_comment(comment)
+
+
+class VoteAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "comment", "submission", "value")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
+    raw_id_fields = ("submission", "comment")
+
 
 admin.site.register(Submission, SubmissionAdmin)
-admin.site.register(Comment)
-admin.site.register(Vote)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Vote, VoteAdmin)
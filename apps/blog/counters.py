@@ -0,0 +1,68 @@
+"""
+Reconciliation of denormalised counters against the rows they count.
+"""
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.perf.objects import invalidate
+
+from .models import Comment, Submission
+
+
+def actual_comment_count():
+    """:return: Expression counting the comments of the outer submission."""
+    comments = (
+        Comment.objects.filter(submission=OuterRef("pk"))
+        .order_by()
+        .values("submission")
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    return Coalesce(Subquery(comments), 0)
+
+
+def reconcile_comment_count_range(low, high):
+    """
+    Fix comment_count for submissions with ``low <= id < high`` in one
+    set-based UPDATE that only touches rows whose stored count is wrong.
+    The fixed submissions are dropped from the object cache.
+
+    :return: Number of submissions fixed
+    :rtype: int
+    """
+
+    wrong = list(
+        Submission.objects.filter(pk__gte=low, pk__lt=high)
+        .annotate(actual=actual_comment_count())
+        .exclude(comment_count=F("actual"))
+        .values_list("pk", flat=True)
+    )
+    if not wrong:
+        return 0
+    fixed = Submission.objects.filter(pk__in=wrong).update(comment_count=actual_comment_count())
+    invalidate(Submission, *wrong)
+    return fixed
+
+
+def reconcile_comment_counts(batch_size=1000, start_id=0):
+    """
+    Repair comment_count drift across all submissions.
+
+    Submissions are walked in primary key ranges of ``batch_size`` and each
+    range is fixed with :func:`reconcile_comment_count_range`, so every
+    statement is short and the table is never locked as a whole.
+
+    :param batch_size: Number of submission ids covered by one UPDATE
+    :type batch_size: int
+    :param start_id: Submission id to start from, to resume an interrupted run
+    :type start_id: int
+    :return: Yields (last id of the range, rows fixed in the range) after every batch
+    :rtype: Iterator[tuple[int, int]]
+    """
+
+    max_id = Submission.objects.aggregate(m=Max("pk"))["m"] or 0
+    low = start_id
+    while low <= max_id:
+        high = low + batch_size
+        yield high - 1, reconcile_comment_count_range(low, high)
+        low = high
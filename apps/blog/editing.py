@@ -0,0 +1,71 @@
+"""
+Editing and deleting comments without touching the MPTT tree.
+
+Saving a Comment goes through mptt, which moves the node when its parent
+or its ordering fields changed, and deleting one leaves its replies with
+``lft``/``rght`` values that no longer fit, until the tree is rebuilt.
+Both operations here are therefore narrow UPDATEs of the comment row:
+an edit replaces the content, a deletion turns the comment into a
+tombstone, with no content and no author, that keeps its place in the
+tree so its replies stay where they are.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.perf.objects import invalidate
+from apps.user.models import User
+from apps.user.utils.profile import invalidate_profile
+
+from .models import Comment
+from .notifications import discard_notifications
+from .utils.thread import invalidate_thread
+
+
+def edit_comment(comment, content):
+    """
+    Replace the content of a comment.
+
+    :param comment: Comment to edit, not deleted
+    :type comment: Comment
+    :param content: New raw comment text
+    :type content: str
+    :return: Whether it was edited, False if it was deleted meanwhile
+    :rtype: bool
+    """
+
+    comment.content = content
+    comment.edited = timezone.now()
+    # A concurrent delete_comment wins, its tombstone is not filled again.
+    edited = Comment.objects.filter(pk=comment.pk, deleted=False).update(
+        content=comment.content, edited=comment.edited
+    )
+    if not edited:
+        return False
+    invalidate_thread(comment.submission_id)
+    if comment.author_id:
+        invalidate_profile(comment.author_id)
+    return True
+
+
+def delete_comment(comment):
+    """
+    Turn a comment into a tombstone. Its score and votes are kept, the
+    author's comment_count goes down and notifications about it are removed.
+
+    :param comment: Comment to delete
+    :type comment: Comment
+    """
+
+    with transaction.atomic():
+        deleted = Comment.objects.filter(pk=comment.pk, deleted=False).update(deleted=True, content="", author=None)
+        if not deleted:
+            return
+        if comment.author_id:
+            User.objects.filter(pk=comment.author_id).update(comment_count=F("comment_count") - 1)
+            invalidate(User, comment.author_id)
+            invalidate_profile(comment.author_id)
+        discard_notifications([comment.pk])
+    comment.deleted, comment.content, comment.author = True, "", None
+    invalidate_thread(comment.submission_id)
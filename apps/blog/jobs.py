@@ -0,0 +1,44 @@
+from apps.jobs.queue import enqueue
+from apps.jobs.registry import job
+
+from .counters import reconcile_comment_count_range
+from .models import Submission
+from .notifications import notify_replies as write_notifications
+from .purge import BATCH_SIZE, purge_batch
+
+
+@job("blog.reconcile_comment_counts")
+def reconcile_comment_counts(payload):
+    """
+    Reconcile one range of submissions per run and queue the next range,
+    so a full pass never holds a single long transaction.
+    """
+
+    batch_size = payload.get("batch_size", 1000)
+    low = payload.get("start_id", 0)
+    reconcile_comment_count_range(low, low + batch_size)
+
+    if Submission.objects.filter(pk__gte=low + batch_size).exists():
+        enqueue("blog.reconcile_comment_counts", {"batch_size": batch_size, "start_id": low + batch_size})
+
+
+@job("blog.purge_submission")
+def purge_submission(payload):
+    """
+    Purge one batch of a soft-deleted submission per run and queue the
+    next one until the submission is gone.
+    """
+
+    batch_size = payload.get("batch_size", BATCH_SIZE)
+    progress = purge_batch(payload["submission_id"], batch_size)
+    if not progress["done"]:
+        enqueue("blog.purge_submission", {"submission_id": payload["submission_id"], "batch_size": batch_size})
+
+
+@job("blog.notify_replies", batch=True)
+def notify_replies(payloads):
+    """
+    Write the reply notifications of newly posted comments.
+    """
+
+    write_notifications([payload["comment_id"] for payload in payloads])
@@ -0,0 +1,110 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.utils import timezone
+
+from apps.blog import views  # noqa: F401 registers the get_item filter used below
+from apps.blog.models import Comment
+from apps.blog.templatetags.comment_tree import render_comment_tree
+from apps.blog.utils.synthetic import synthetic_thread
+from apps.user.models import User
+
+# comment.html as it was before {% comment_tree %}, kept as the baseline.
+RECURSETREE_TEMPLATE = """{% load humanize mptt_tags %}
+{% recursetree comments %}
+    <div class="media">
+        <div class="media-left">
+            <div class="vote comment-votes" data-what-id="{{ node.id }}">
+                {% with vote_value=comment_votes|get_item:node.id %}
+                    <div><i class="fa fa-chevron-up {% if vote_value == 1 %} upvoted {% endif %}"
+                            title="upvote" onclick="vote(this)"></i></div>
+                    <a class="score"> {{ node.score }}</a>
+                    <div><i class="fa fa-chevron-down {% if vote_value == -1 %} downvoted {% endif %}"
+                            title="downvote" onclick="vote(this)"></i></div>
+                {% endwith %}
+            </div>
+        </div>
+        <div class="media-body" style="margin-top: 14px" data-parent-id="{{ node.id }}">
+            <h6 class="media-heading">
+              <a {% if node.author %}href="{% url 'apps.user:user_profile' node.author_name %}"
+               {% else %}href="#"{% endif %}>{{ node.author_name }}</a> {{ node.timestamp|naturaltime }}</h6>
+            <h5>{{ node.content | safe }}</h5>
+            <div class="reply-container">
+                <ul class="buttons">
+                    <li><a href="javascript:void(0)" name="replyButton">reply</a></li>
+                </ul>
+            </div>
+            {% if not node.is_leaf_node %}
+                {{ children }}
+            {% endif %}
+        </div>
+    </div>
+{% endrecursetree %}"""
+
+
+def build_comments(size, max_depth):
+    """Unsaved Comment instances with valid MPTT columns, no database needed."""
+    author = User(id=1, username="bench_user")
+    now = timezone.now()
+    comments = []
+    for row in synthetic_thread(size, max_depth=max_depth):
+        comment = Comment(
+            id=row.id,
+            parent_id=row.parent_id,
+            submission_id=1,
+            tree_id=row.tree_id,
+            lft=row.lft,
+            rght=row.rght,
+            level=row.level,
+            score=row.id % 7,
+            content="Comment number {}".format(row.id),
+        )
+        comment.author = author
+        comment.timestamp = now
+        # Pose as loaded from the database, mptt refuses to traverse unsaved nodes.
+        comment._state.adding = False
+        comment._state.db = "default"
+        comments.append(comment)
+    return comments
+
+
+class Command(BaseCommand):
+    help = "Benchmark {% comment_tree %} against mptt's {% recursetree %} on synthetic threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+        parser.add_argument("--max-depth", type=int, default=8, help="Depth of the generated threads.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best one counts.")
+
+    def handle(self, *args, **options):
+        template = engines["django"].from_string(RECURSETREE_TEMPLATE)
+
+        self.stdout.write("{:>8} {:>16} {:>16} {:>8}".format("nodes", "recursetree ms", "comment_tree ms", "speedup"))
+        for size in options["sizes"]:
+            build = lambda: build_comments(size, options["max_depth"])  # noqa: E731
+            recursive = self.measure(
+                lambda nodes: template.render({"comments": nodes, "comment_votes": {}}), build, options["repeat"]
+            )
+            iterative = self.measure(lambda nodes: render_comment_tree(nodes, {}), build, options["repeat"])
+            speedup = "{:.1f}x".format(recursive / iterative) if isinstance(recursive, float) else "-"
+            self.stdout.write("{:>8} {:>16} {:>16.1f} {:>8}".format(size, self.format(recursive), iterative, speedup))
+
+    @staticmethod
+    def measure(render, build, repeat):
+        """:return: Best wall time in ms of ``render`` over fresh nodes, excluding ``build``"""
+        best = None
+        for _ in range(repeat):
+            nodes = build()
+            start = time.perf_counter()
+            try:
+                render(nodes)
+            except RecursionError:
+                return "RecursionError"
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    @staticmethod
+    def format(value):
+        return "{:.1f}".format(value) if isinstance(value, float) else value
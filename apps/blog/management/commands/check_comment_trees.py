@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.models import Comment
+from apps.blog.trees import BATCH_SIZE, check_trees, corrupted_trees, rebuild_tree
+
+
+class Command(BaseCommand):
+    help = (
+        "Check the MPTT columns of comment trees and rebuild only the corrupted ones, "
+        "each in its own short transaction. Checks every tree unless trees or submissions are given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tree", nargs="+", type=int, default=[], help="Tree ids to check.")
+        parser.add_argument(
+            "--submission", nargs="+", type=int, default=[], help="Check the trees of these submissions."
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Tree ids per check, rows per UPDATE.")
+        parser.add_argument("--start-id", type=int, default=0, help="Resume a full check from this tree id.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report corrupted trees.")
+
+    def handle(self, *args, **options):
+        if options["tree"] or options["submission"]:
+            tree_ids = set(options["tree"])
+            tree_ids.update(
+                Comment.objects.filter(submission_id__in=options["submission"])
+                .order_by()
+                .values_list("tree_id", flat=True)
+                .distinct()
+            )
+            batches = [(max(tree_ids, default=0), corrupted_trees(tree_ids))]
+        else:
+            batches = check_trees(options["batch_size"], options["start_id"])
+
+        found = rebuilt = 0
+        for last_id, corrupted in batches:
+            found += len(corrupted)
+            if options["verbosity"] > 1 or corrupted:
+                self.stdout.write("up to tree {}: {} corrupted {}".format(last_id, len(corrupted), corrupted or ""))
+            if options["dry_run"]:
+                continue
+            for tree_id in corrupted:
+                changed = rebuild_tree(tree_id, options["batch_size"])
+                rebuilt += 1
+                self.stdout.write("tree {}: rebuilt, {} comments moved".format(tree_id, changed))
+
+        self.stdout.write(self.style.SUCCESS("Found {} corrupted trees, rebuilt {}".format(found, rebuilt)))
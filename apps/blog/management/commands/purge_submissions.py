@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.models import Submission
+from apps.blog.purge import BATCH_SIZE, purge_batch
+from apps.jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Purge soft-deleted submissions batch by batch, reporting progress. "
+        "Safe to rerun, a purge that stopped half way continues where it left off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="Submission ids, defaults to every deleted submission.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows deleted per transaction.")
+        parser.add_argument("--queue", action="store_true", help="Queue purge jobs instead of purging here.")
+
+    def handle(self, *args, **options):
+        submissions = Submission.objects.filter(deleted=True)
+        if options["ids"]:
+            submissions = submissions.filter(pk__in=options["ids"])
+        ids = list(submissions.order_by("pk").values_list("pk", flat=True))
+
+        for submission_id in ids:
+            if options["queue"]:
+                enqueue("blog.purge_submission", {"submission_id": submission_id, "batch_size": options["batch_size"]})
+                continue
+            votes = comments = 0
+            while True:
+                progress = purge_batch(submission_id, options["batch_size"])
+                votes += progress["votes"]
+                comments += progress["comments"]
+                if progress["done"]:
+                    break
+                self.stdout.write(
+                    "submission {}: {} votes and {} comments left".format(
+                        submission_id, progress["votes_left"], progress["comments_left"]
+                    )
+                )
+            self.stdout.write("submission {}: purged {} votes and {} comments".format(submission_id, votes, comments))
+
+        verb = "Queued" if options["queue"] else "Purged"
+        self.stdout.write(self.style.SUCCESS("{} {} submissions".format(verb, len(ids))))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.counters import reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute Submission.comment_count in batches and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Submission ids per UPDATE.")
+        parser.add_argument("--start-id", type=int, default=0, help="Resume from this submission id.")
+
+    def handle(self, *args, **options):
+        total = 0
+        for last_id, fixed in reconcile_comment_counts(options["batch_size"], options["start_id"]):
+            total += fixed
+            if options["verbosity"] > 1 or fixed:
+                self.stdout.write("up to id {}: fixed {}".format(last_id, fixed))
+        self.stdout.write(self.style.SUCCESS("Fixed comment_count on {} submissions".format(total)))
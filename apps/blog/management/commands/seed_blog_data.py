@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.blog.seed import BATCH_SIZE, BlogSeeder, seed_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with random users, submissions, comment threads and votes, "
+        "written in bulk with consistent scores and counters. For local benchmarks only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Users to create.")
+        parser.add_argument("--submissions", type=int, default=100, help="Submissions to create.")
+        parser.add_argument("--comments", type=float, default=50, help="Mean comments per submission.")
+        parser.add_argument("--max-comments", type=int, default=5000, help="Most comments of one submission.")
+        parser.add_argument("--max-depth", type=int, default=8, help="Deepest reply level.")
+        parser.add_argument("--root-ratio", type=float, default=0.1, help="Share of top level comments.")
+        parser.add_argument("--votes", type=float, default=2.0, help="Mean votes per comment.")
+        parser.add_argument("--upvote-ratio", type=float, default=0.7, help="Share of upvotes.")
+        parser.add_argument("--password", default="seed_password", help="Password of every new user.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per INSERT.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        user_ids = seed_users(options["users"], password=options["password"], batch_size=options["batch_size"])
+        self.stdout.write("{} users in {:.1f}s".format(len(user_ids), time.perf_counter() - start))
+        if not user_ids:
+            return
+
+        seeder = BlogSeeder(
+            user_ids,
+            comments=options["comments"],
+            max_comments=options["max_comments"],
+            max_depth=options["max_depth"],
+            root_ratio=options["root_ratio"],
+            votes=options["votes"],
+            upvote_ratio=options["upvote_ratio"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+        )
+
+        def progress(totals):
+            self.stdout.write(
+                "{submissions} submissions, {comments} comments, {votes} votes".format(**totals)
+                + " in {:.1f}s".format(time.perf_counter() - start)
+            )
+
+        totals = seeder.seed(options["submissions"], progress)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Created {} users, {} submissions, {} comments and {} votes".format(
+                    len(user_ids), totals["submissions"], totals["comments"], totals["votes"]
+                )
+            )
+        )
@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-19 18:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_user_counters(apps, schema_editor):
+    User = apps.get_model("user", "User")
+    Submission = apps.get_model("blog", "Submission")
+    Comment = apps.get_model("blog", "Comment")
+
+    def count_by_author(model):
+        rows = model.objects.filter(author=OuterRef("pk")).order_by().values("author").annotate(n=Count("pk"))
+        return Coalesce(Subquery(rows.values("n")), 0)
+
+    User.objects.update(submission_count=count_by_author(Submission), comment_count=count_by_author(Comment))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0009_submission_updated"),
+        ("user", "0005_activity_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["author", "timestamp", "id"], name="blog_comment_author_ts_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="submission",
+            index=models.Index(fields=["author", "timestamp", "id"], name="blog_submission_author_ts_idx"),
+        ),
+        migrations.RunPython(backfill_user_counters, migrations.RunPython.noop),
+    ]
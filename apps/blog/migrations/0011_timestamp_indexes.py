@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-19 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0010_activity_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="comment",
+            name="timestamp",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="submission",
+            name="timestamp",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-19 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0011_timestamp_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submission",
+            name="deleted",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-19 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0013_notification"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="deleted",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="edited",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from mptt.models import MPTTModel, TreeForeignKey
 from .utils.model_utils import ContentTypeAware, MttpContentTypeAware
+from apps.jobs.queue import enqueue
 from apps.user.models import User
 
 from django.utils import timezone
@@ -15,10 +16,12 @@ class AuthornameField:
     @property
     def author_name(self):
         try:
-            name = self.author.username
+            author = self.author
         except Exception:
-            name = "deleted user"
-        return name
+            author = None
+        if author is None or author.deleted_at:
+            return "deleted user"
+        return author.username
 
     @author_name.setter
     def author_name(self, value):
@@ -29,14 +32,30 @@ class AuthornameField:
         del self._author_name
 
 
+class SubmissionQuerySet(models.QuerySet):
+    def visible(self):
+        """Submissions that are not waiting to be purged, see apps.blog.purge."""
+        return self.filter(deleted=False)
+
+
 class Submission(ContentTypeAware, AuthornameField):
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     title = models.CharField(max_length=250)
     content = models.TextField(blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
     modified = models.BooleanField(default=False)
     updated = models.DateTimeField(null=True, blank=True)
     comment_count = models.IntegerField(default=0)
+    # Hidden everywhere, its comments and votes are being purged in the background.
+    deleted = models.BooleanField(default=False)
+
+    objects = SubmissionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the author's activity feed, newest first.
+            models.Index(fields=["author", "timestamp", "id"], name="blog_submission_author_ts_idx"),
+        ]
 
     @property
     def comments_url(self):
@@ -52,11 +71,20 @@ class Comment(MttpContentTypeAware, AuthornameField):
     parent = TreeForeignKey(
         "self", on_delete=models.SET_NULL, related_name="children", null=True, blank=True, db_index=True
     )
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
     ups = models.IntegerField(default=0)
     downs = models.IntegerField(default=0)
     score = models.IntegerField(default=0)
     content = models.TextField(blank=True)
+    # Set by apps.blog.editing: a deleted comment stays in the tree as an empty tombstone.
+    edited = models.DateTimeField(null=True, blank=True)
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Serves the author's activity feed, newest first.
+            models.Index(fields=["author", "timestamp", "id"], name="blog_comment_author_ts_idx"),
+        ]
 
     class MPTTMeta:
         order_insertion_by = ["-score"]
@@ -65,8 +93,9 @@ class Comment(MttpContentTypeAware, AuthornameField):
     def create(cls, author, content, parent):
         """
         Create a new comment instance. If the parent is submisison
-        update comment_count field and save it.
-        If parent is comment post it as child comment
+        attach the comment to it, if parent is comment post it as
+        child comment. The submission's comment_count is maintained
+        by signals once the comment is saved.
         :param author: User instance
         :type author: User
         :param content: Raw comment text
@@ -80,16 +109,12 @@ class Comment(MttpContentTypeAware, AuthornameField):
         comment = cls(author=author, author_name=author.username, content=content)
 
         if isinstance(parent, Submission):
-            submission = parent
-            comment.submission = submission
+            comment.submission = parent
         elif isinstance(parent, Comment):
-            submission = parent.submission
-            comment.submission = submission
+            comment.submission = parent.submission
             comment.parent = parent
         else:
             return
-        submission.comment_count += 1
-        submission.save()
 
         return comment
 
@@ -97,6 +122,29 @@ class Comment(MttpContentTypeAware, AuthornameField):
         return "<Comment:{}>".format(self.id)
 
 
+class Notification(models.Model):
+    """A reply to one of the recipient's comments or submissions, see apps.blog.notifications."""
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE)  # the reply
+    read = models.BooleanField(default=False)
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Serves the inbox, newest first, paginated by id.
+            models.Index(fields=["recipient", "id"], name="blog_notification_inbox_idx"),
+        ]
+
+    def __unicode__(self):
+        return "<Notification:{}>".format(self.id)
+
+
+def adjust_karma(user_id, delta):
+    """Queue a karma change for the author of a voted comment."""
+    enqueue("user.adjust_karma", {"user_id": user_id, "delta": delta})
+
+
 class Vote(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)  # who voted
     submission = models.ForeignKey(Submission, on_delete=models.CASCADE, null=True)  # under which submission
@@ -108,7 +156,8 @@ class Vote(models.Model):
         """
         Create a new vote object and return it.
         It will also update the ups/downs/score fields in the
-        comment instance and save it.
+        comment instance and save it, the author's karma is
+        updated by a background job.
 
         :param user: User instance
         :type user: User
@@ -130,7 +179,7 @@ class Vote(models.Model):
         submission = comment.submission
         vote.submission = submission
         comment.score += vote_value
-        comment.author.karma += vote_value
+        adjust_karma(comment.author_id, vote_value)
 
         if vote_value == 1:
             comment.ups += 1
@@ -138,7 +187,6 @@ class Vote(models.Model):
             comment.downs += 1
 
         comment.save()
-        comment.author.save()
 
         return vote
 
@@ -164,10 +212,9 @@ class Vote(models.Model):
         else:
             return None
 
-        self.comment.author.karma += vote_diff
+        adjust_karma(self.comment.author_id, vote_diff)
         self.value = new_vote_value
         self.comment.save()
-        self.comment.author.save()
         self.save()
 
         return vote_diff
@@ -184,9 +231,8 @@ class Vote(models.Model):
         else:
             return None
 
-        self.comment.author.karma += vote_diff
+        adjust_karma(self.comment.author_id, vote_diff)
         self.value = 0
         self.save()
         self.comment.save()
-        self.comment.author.save()
         return vote_diff
@@ -0,0 +1,134 @@
+"""
+Reply notifications.
+
+When a comment is posted, the ``blog.notify_replies`` job writes one
+Notification for the author of the comment or submission it replies to
+and bumps their ``unread_notifications`` counter. The counter lives on the
+user row, which every request loads anyway, so the unread badge in
+``base.html`` costs no query. The inbox reads the recipient's
+notifications newest first through their (recipient, id) index, the
+position is carried by the id of the last notification shown.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from apps.perf.objects import invalidate
+from apps.user.models import User
+
+from .models import Comment, Notification
+
+PAGE_SIZE = 20
+
+
+def _adjust_unread(deltas):
+    """Apply {user id: change} to the unread counters, one UPDATE per user."""
+
+    for user_id, delta in deltas.items():
+        if delta:
+            User.objects.filter(pk=user_id).update(
+                unread_notifications=Greatest(F("unread_notifications") + delta, Value(0))
+            )
+            invalidate(User, user_id)
+
+
+def notify_replies(comment_ids):
+    """
+    Notify the authors replied to by the given comments.
+
+    Replies to oneself, to deleted accounts and in deleted submissions
+    notify no one.
+
+    :param comment_ids: IDs of newly posted comments
+    :type comment_ids: list[int]
+    :return: Number of notifications written
+    :rtype: int
+    """
+
+    rows = (
+        Comment.objects.filter(pk__in=comment_ids, submission__deleted=False)
+        .order_by("pk")
+        .values_list(
+            "pk",
+            "author_id",
+            "parent_id",
+            "parent__author_id",
+            "parent__author__deleted_at",
+            "submission__author_id",
+            "submission__author__deleted_at",
+        )
+    )
+    notifications = []
+    for pk, author_id, parent_id, parent_author, parent_gone, submission_author, submission_gone in rows:
+        recipient, gone = (parent_author, parent_gone) if parent_id else (submission_author, submission_gone)
+        if recipient and not gone and recipient != author_id:
+            notifications.append(Notification(recipient_id=recipient, comment_id=pk))
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications)
+        _adjust_unread(Counter(n.recipient_id for n in notifications))
+    return len(notifications)
+
+
+def discard_notifications(comment_ids):
+    """
+    Delete the notifications about comments that are going away, taking
+    the unread ones off their recipients' counters.
+
+    :param comment_ids: IDs of comments about to be deleted
+    :type comment_ids: list[int]
+    """
+
+    unread = Counter(
+        Notification.objects.filter(comment_id__in=comment_ids, read=False).values_list("recipient_id", flat=True)
+    )
+    Notification.objects.filter(comment_id__in=comment_ids)._raw_delete(Notification.objects.db)
+    _adjust_unread({user_id: -count for user_id, count in unread.items()})
+
+
+def inbox_page(user, before=None, limit=PAGE_SIZE):
+    """
+    One page of a user's notifications, newest first.
+
+    :param user: Recipient
+    :type user: User
+    :param before: ID of the last notification on the previous page, None for the first page
+    :type before: int
+    :param limit: Page size
+    :type limit: int
+    :return: Notifications on the page and the ``before`` of the next page (None on the last page)
+    :rtype: tuple[list[Notification], int | None]
+    """
+
+    queryset = Notification.objects.filter(recipient=user)
+    if before is not None:
+        queryset = queryset.filter(pk__lt=before)
+    page = list(queryset.select_related("comment__author", "comment__submission").order_by("-pk")[: limit + 1])
+    if len(page) > limit:
+        return page[:limit], page[limit - 1].pk
+    return page, None
+
+
+def mark_read(user, notifications):
+    """
+    Mark notifications read and take them off the user's unread counter.
+
+    :param user: Recipient of the notifications
+    :type user: User
+    :param notifications: Notifications just shown to the user
+    :type notifications: list[Notification]
+    :return: Number of notifications that were unread
+    :rtype: int
+    """
+
+    unread = [n.pk for n in notifications if not n.read]
+    if not unread:
+        return 0
+    with transaction.atomic():
+        count = Notification.objects.filter(pk__in=unread, recipient=user, read=False).update(read=True)
+        _adjust_unread({user.pk: -count})
+    user.unread_notifications = max(user.unread_notifications - count, 0)
+    return count
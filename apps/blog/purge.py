@@ -0,0 +1,114 @@
+"""
+Deleting submissions without deleting whole threads inside a request.
+
+``Submission.delete()`` makes Django's collector load every comment and
+vote of the thread and delete them row by row, holding locks for as long
+as that takes. Instead a submission is only flagged ``deleted``, which
+hides it at once, and the ``blog.purge_submission`` job removes its votes,
+then its comments (deepest first, so no reply outlives its parent), then
+the submission itself, one bounded batch per transaction.
+
+Every batch re-reads what is left, so a purge that stopped half way (a
+failed job, a dead worker) simply continues when it is queued again, see
+the ``purge_submissions`` command.
+"""
+
+import logging
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+
+from apps.jobs.queue import enqueue
+from apps.perf.objects import invalidate
+from apps.user.models import User
+from apps.user.utils.profile import invalidate_profile
+
+from .models import Comment, Submission, Vote
+from .notifications import discard_notifications
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def soft_delete_submission(submission):
+    """
+    Hide ``submission`` and queue the purge of its thread.
+
+    :param submission: Submission to delete
+    :type submission: Submission
+    """
+
+    hidden = Submission.objects.filter(pk=submission.pk, deleted=False).update(deleted=True)
+    submission.deleted = True
+    if not hidden:
+        return
+    invalidate(Submission, submission.pk)
+    if submission.author_id:
+        User.objects.filter(pk=submission.author_id).update(submission_count=F("submission_count") - 1)
+        invalidate(User, submission.author_id)
+        invalidate_profile(submission.author_id)
+    enqueue("blog.purge_submission", {"submission_id": submission.pk})
+
+
+def purge_batch(submission_id, batch_size=BATCH_SIZE):
+    """
+    Delete one batch of what is left of a soft-deleted submission.
+
+    Votes go first, then comments by descending level, and once both are
+    gone the submission row. Rows are deleted with plain DELETEs, the
+    per-author comment counters are adjusted with one UPDATE per author.
+
+    :param submission_id: ID of a soft-deleted submission
+    :type submission_id: int
+    :param batch_size: Maximum rows deleted in this batch
+    :type batch_size: int
+    :return: Progress: rows deleted now, votes and comments still left, whether the purge is done
+    :rtype: dict
+    """
+
+    progress = {"votes": 0, "comments": 0, "votes_left": 0, "comments_left": 0, "done": False}
+    with transaction.atomic():
+        if not Submission.objects.filter(pk=submission_id, deleted=True).exists():
+            # Already purged or never deleted, nothing to do.
+            progress["done"] = True
+            return progress
+
+        vote_ids = list(Vote.objects.filter(submission_id=submission_id).values_list("pk", flat=True)[:batch_size])
+        if vote_ids:
+            progress["votes"] = Vote.objects.filter(pk__in=vote_ids)._raw_delete(Vote.objects.db)
+
+        room = batch_size - len(vote_ids)
+        if room > 0:
+            rows = list(
+                Comment.objects.filter(submission_id=submission_id)
+                .order_by("-level", "-pk")
+                .values_list("pk", "author_id")[:room]
+            )
+            if rows:
+                Vote.objects.filter(comment_id__in=[pk for pk, _ in rows]).update(comment=None)
+                discard_notifications([pk for pk, _ in rows])
+                progress["comments"] = Comment.objects.filter(pk__in=[pk for pk, _ in rows])._raw_delete(
+                    Comment.objects.db
+                )
+                for author_id, count in Counter(a for _, a in rows if a).items():
+                    User.objects.filter(pk=author_id).update(comment_count=F("comment_count") - count)
+                invalidate(User, *(a for _, a in rows))
+
+        progress["votes_left"] = Vote.objects.filter(submission_id=submission_id).count()
+        progress["comments_left"] = Comment.objects.filter(submission_id=submission_id).count()
+        if not progress["votes_left"] and not progress["comments_left"]:
+            # Nothing left to cascade to, the collector has no rows to load.
+            Submission.objects.filter(pk=submission_id).delete()
+            progress["done"] = True
+
+    logger.info(
+        "purge of submission %s: deleted %s votes and %s comments, %s votes and %s comments left",
+        submission_id,
+        progress["votes"],
+        progress["comments"],
+        progress["votes_left"],
+        progress["comments_left"],
+    )
+    return progress
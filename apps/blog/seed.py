@@ -0,0 +1,246 @@
+"""
+Bulk generation of users, submissions, comments and votes for local
+benchmarks and load tests.
+
+Going through ``Comment.create`` and ``Vote.create`` costs several queries
+per row and rewrites the MPTT columns on every insert. Here every row is
+built in memory, comment trees are numbered by
+:func:`apps.blog.utils.synthetic.number_forest` and everything is written
+with ``bulk_create``, ``batch_size`` rows at a time. Scores, ups and downs,
+``Submission.comment_count`` and the users' karma and counters are computed
+alongside, so the data looks as if it had been posted through the site.
+
+Comments get explicit primary keys, so their parents can be referenced
+before they are saved, and the sequence is reset after every chunk. Do not
+seed a database that is being written to at the same time.
+"""
+
+import random
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Max, Value, When
+
+from apps.perf.objects import invalidate
+from apps.user.models import User
+
+from .models import Comment, Submission, Vote
+from .utils.synthetic import number_forest, random_parents
+
+BATCH_SIZE = 5000
+# Submissions per transaction
+CHUNK_SIZE = 100
+
+WORDS = (
+    "the of and a to in is you that it he was for on are as with his they at be this have from or one had by word but "
+    "not what all were we when your can said there use an each which she do how their if will up other about out many "
+    "then them these so some her would make like him into time has look two more write go see number no way could"
+).split()
+
+
+def _text(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+
+def _increment(model, deltas, batch_size=500):
+    """
+    Add per-row deltas to integer columns with one UPDATE per ``batch_size`` rows.
+
+    :param deltas: {field name: Counter of row id -> delta}
+    :type deltas: dict[str, Counter]
+    """
+
+    ids = sorted({pk for counter in deltas.values() for pk, delta in counter.items() if delta})
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start : start + batch_size]
+        changes = {}
+        for field, counter in deltas.items():
+            whens = [When(pk=pk, then=Value(counter[pk])) for pk in batch if counter[pk]]
+            if whens:
+                changes[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+        model.objects.filter(pk__in=batch).update(**changes)
+        invalidate(model, *batch)
+
+
+def seed_users(count, prefix="seed", password="seed_password", batch_size=BATCH_SIZE):
+    """
+    Create ``count`` users named ``<prefix><n>``, all sharing ``password``.
+
+    The password is hashed once, hashing it per user would take longer than
+    everything else.
+
+    :return: Ids of the new users
+    :rtype: list[int]
+    """
+
+    encoded = make_password(password)
+    first = (User.objects.aggregate(m=Max("pk"))["m"] or 0) + 1
+    ids = []
+    for start in range(0, count, batch_size):
+        users = [
+            User(username="{}{}".format(prefix, first + i), password=encoded)
+            for i in range(start, min(start + batch_size, count))
+        ]
+        ids.extend(user.pk for user in User.objects.bulk_create(users, batch_size=batch_size))
+    return ids
+
+
+class BlogSeeder:
+    """
+    Writes random threads by the given users.
+
+    :param user_ids: Authors and voters to pick from
+    :type user_ids: list[int]
+    :param comments: Mean number of comments per submission, exponentially distributed
+    :param max_comments: Upper bound of comments per submission
+    :param max_depth: Deepest reply level, top level comments being 0
+    :param root_ratio: Share of comments that are top level rather than replies
+    :param votes: Mean number of votes per comment, exponentially distributed
+    :param upvote_ratio: Share of upvotes among the votes
+    :param seed: Seed of the random generator, the same seed gives the same data
+    :param batch_size: Rows per INSERT
+    """
+
+    def __init__(
+        self,
+        user_ids,
+        comments=50,
+        max_comments=5000,
+        max_depth=8,
+        root_ratio=0.1,
+        votes=2.0,
+        upvote_ratio=0.7,
+        seed=0,
+        batch_size=BATCH_SIZE,
+    ):
+        self.user_ids = user_ids
+        self.comments = comments
+        self.max_comments = max_comments
+        self.max_depth = max_depth
+        self.root_ratio = root_ratio
+        self.votes = votes
+        self.upvote_ratio = upvote_ratio
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.totals = Counter()
+
+    def _sample(self, mean, limit):
+        return min(limit, int(self.rng.expovariate(1 / mean))) if mean > 0 else 0
+
+    def seed(self, count, progress=None):
+        """
+        Write ``count`` submissions with their threads, ``CHUNK_SIZE`` submissions per transaction.
+
+        :param progress: Called with the running totals after every chunk
+        :type progress: callable
+        :return: Rows written per model
+        :rtype: Counter
+        """
+
+        for start in range(0, count, CHUNK_SIZE):
+            with transaction.atomic():
+                self._seed_chunk(min(CHUNK_SIZE, count - start))
+            if progress:
+                progress(self.totals)
+        return self.totals
+
+    def seed_thread(self, submission, size):
+        """Write ``size`` comments and their votes under an existing submission."""
+
+        with transaction.atomic():
+            user_deltas = {"comment_count": Counter(), "karma": Counter()}
+            written = self._write_threads([(submission.pk, size)], user_deltas)
+            _increment(Submission, {"comment_count": Counter({submission.pk: written})})
+            _increment(User, user_deltas)
+            self._reset_sequence()
+        submission.comment_count += written
+
+    def _seed_chunk(self, count):
+        rng = self.rng
+        submissions = [
+            Submission(
+                author_id=rng.choice(self.user_ids),
+                title=_text(rng, 3, 12),
+                content=_text(rng, 10, 80),
+                comment_count=self._sample(self.comments, self.max_comments),
+            )
+            for _ in range(count)
+        ]
+        Submission.objects.bulk_create(submissions, batch_size=self.batch_size)
+        self.totals["submissions"] += count
+
+        user_deltas = {
+            "submission_count": Counter(s.author_id for s in submissions),
+            "comment_count": Counter(),
+            "karma": Counter(),
+        }
+        self._write_threads([(s.pk, s.comment_count) for s in submissions], user_deltas)
+        _increment(User, user_deltas)
+        self._reset_sequence()
+
+    def _write_threads(self, threads, user_deltas):
+        """:return: Number of comments written"""
+
+        rng = self.rng
+        next_id = (Comment.objects.aggregate(m=Max("pk"))["m"] or 0) + 1
+        next_tree_id = (Comment.objects.aggregate(m=Max("tree_id"))["m"] or 0) + 1
+        comments, votes = [], []
+        written = 0
+
+        for submission_id, size in threads:
+            parents = random_parents(size, self.max_depth, self.root_ratio, rng)
+            rows = number_forest(parents, first_id=next_id, first_tree_id=next_tree_id)
+            next_id += size
+            next_tree_id += parents.count(None)
+
+            for row in rows:
+                author_id = rng.choice(self.user_ids)
+                ups = downs = 0
+                for voter_id in rng.sample(self.user_ids, self._sample(self.votes, len(self.user_ids))):
+                    if voter_id == author_id:
+                        continue
+                    value = 1 if rng.random() < self.upvote_ratio else -1
+                    if value == 1:
+                        ups += 1
+                    else:
+                        downs += 1
+                    votes.append(Vote(user_id=voter_id, comment_id=row.id, submission_id=submission_id, value=value))
+                comments.append(
+                    Comment(
+                        id=row.id,
+                        parent_id=row.parent_id,
+                        submission_id=submission_id,
+                        tree_id=row.tree_id,
+                        lft=row.lft,
+                        rght=row.rght,
+                        level=row.level,
+                        author_id=author_id,
+                        content=_text(rng, 3, 60),
+                        ups=ups,
+                        downs=downs,
+                        score=ups - downs,
+                    )
+                )
+                user_deltas["comment_count"][author_id] += 1
+                user_deltas["karma"][author_id] += ups - downs
+
+                if len(comments) + len(votes) >= self.batch_size:
+                    written += self._flush(comments, votes)
+                    comments, votes = [], []
+        return written + self._flush(comments, votes)
+
+    def _flush(self, comments, votes):
+        # Comments first, the votes reference them.
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        Vote.objects.bulk_create(votes, batch_size=self.batch_size)
+        self.totals["comments"] += len(comments)
+        self.totals["votes"] += len(votes)
+        return len(comments)
+
+    @staticmethod
+    def _reset_sequence():
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Comment]):
+                cursor.execute(sql)
@@ -0,0 +1,87 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.jobs.queue import enqueue
+from apps.perf.objects import invalidate
+from apps.user.models import User
+
+from .models import Comment, Notification, Submission, Vote
+from .utils.thread import invalidate_thread, invalidate_user_votes
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    """
+    Increment the submission's and the author's comment_count
+    with narrow, atomic UPDATEs.
+    """
+    if not created or raw:
+        return
+    if instance.submission_id:
+        Submission.objects.filter(pk=instance.submission_id).update(comment_count=F("comment_count") + 1)
+        invalidate(Submission, instance.submission_id)
+    if instance.author_id:
+        User.objects.filter(pk=instance.author_id).update(comment_count=F("comment_count") + 1)
+        invalidate(User, instance.author_id)
+    enqueue("blog.notify_replies", {"comment_id": instance.pk}, key="blog.notify_replies:{}".format(instance.pk))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Decrement the submission's and the author's comment_count. The submission
+    is skipped when the comment is removed as part of deleting it, the row is
+    going away anyway.
+    """
+    if instance.author_id:
+        User.objects.filter(pk=instance.author_id).update(comment_count=F("comment_count") - 1)
+        invalidate(User, instance.author_id)
+    if instance.submission_id and not _deleting_submission(origin):
+        Submission.objects.filter(pk=instance.submission_id).update(comment_count=F("comment_count") - 1)
+        invalidate(Submission, instance.submission_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, raw=False, **kwargs):
+    """A new, edited, re-scored or deleted comment changes its thread's HTML."""
+    if not raw and instance.submission_id:
+        invalidate_thread(instance.submission_id)
+
+
+@receiver(post_save, sender=Vote)
+def vote_saved(sender, instance, raw=False, **kwargs):
+    if not raw and instance.user_id and instance.submission_id:
+        invalidate_user_votes(instance.user_id, instance.submission_id)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.read:
+        User.objects.filter(pk=instance.recipient_id, unread_notifications__gt=0).update(
+            unread_notifications=F("unread_notifications") - 1
+        )
+        invalidate(User, instance.recipient_id)
+
+
+@receiver(post_save, sender=Submission)
+def submission_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.author_id:
+        User.objects.filter(pk=instance.author_id).update(submission_count=F("submission_count") + 1)
+        invalidate(User, instance.author_id)
+
+
+@receiver(post_delete, sender=Submission)
+def submission_deleted(sender, instance, **kwargs):
+    # A soft-deleted submission was taken off the author's count when it was hidden.
+    if instance.author_id and not instance.deleted:
+        User.objects.filter(pk=instance.author_id).update(submission_count=F("submission_count") - 1)
+        invalidate(User, instance.author_id)
+
+
+def _deleting_submission(origin):
+    if isinstance(origin, Submission):
+        return True
+    model = getattr(origin, "model", None)
+    return model is Submission
@@ -0,0 +1,118 @@
+"""
+Iterative renderer for comment threads.
+
+mptt's ``{% recursetree %}`` renders a template node per comment and
+recurses once per level, which is slow and stack-deep on big threads.
+``{% comment_tree %}`` walks the nodes once, in tree order, and closes
+the markup of finished subtrees with an explicit stack.
+"""
+from django import template
+from django.conf import settings
+from django.contrib.humanize.templatetags.humanize import naturaltime
+from django.urls import reverse
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+NODE_OPEN = (
+    '<div class="media">'
+    '<div class="media-left">'
+    '<div class="vote comment-votes" data-what-id="{id}">'
+    "{upvote}"
+    '<a class="score"> {score}</a>'
+    "{downvote}"
+    "</div>"
+    "</div>"
+    '<div class="media-body" style="margin-top: 14px" data-parent-id="{id}">'
+    '<h6 class="media-heading"><a href="{author_url}">{author_name}</a> {timestamp}</h6>'
+    "<h5>{content}</h5>"
+    '<div class="reply-container">'
+    '<ul class="buttons">{reply}</ul>'
+    "</div>"
+)
+# Left out of tombstones, which can be neither voted on nor answered.
+UPVOTE = '<div><i class="fa fa-chevron-up{voted}" title="upvote" onclick="vote(this)"></i></div>'
+DOWNVOTE = '<div><i class="fa fa-chevron-down{voted}" title="downvote" onclick="vote(this)"></i></div>'
+REPLY = '<li><a href="javascript:void(0)" name="replyButton">reply</a></li>'
+NODE_CLOSE = "</div></div>"
+CONTINUE_THREAD = '<a class="continue-thread" href="{url}?comment={id}">continue this thread &rarr;</a>'
+
+
+def render_comment_tree(nodes, comment_votes=None, max_depth=None):
+    """
+    Render comments given in depth-first (tree_id, lft) order as nested markup.
+
+    Depth is derived from ``parent_id`` rather than the stored level, so a
+    subthread renders with its first comment at the top. Comments deeper
+    than ``max_depth`` are left out and their parent gets a
+    "continue this thread" link instead.
+
+    :param nodes: Iterable of objects with id, parent_id, submission_id, author_id,
+                  author_name, score, timestamp, edited, content and deleted attributes
+    :param comment_votes: {comment id: vote value} of the current user
+    :type comment_votes: dict
+    :param max_depth: Deepest level rendered, 0 being the top level, None for no limit
+    :type max_depth: int
+    :rtype: SafeString
+    """
+
+    comment_votes = comment_votes or {}
+    # Usernames are restricted to [0-9a-zA-Z_], no quoting needed.
+    profile_url = reverse("apps.user:user_profile", args=["__username__"])
+    thread_url = None
+
+    out = []
+    depths = {}
+    # Stack of [depth, id, continue link emitted] for every open comment.
+    stack = []
+
+    for node in nodes:
+        depth = depths.get(node.parent_id, -1) + 1
+        depths[node.id] = depth
+
+        if max_depth is not None and depth > max_depth:
+            # Hidden subtree: link to it once from its visible ancestor.
+            if stack and stack[-1][0] == max_depth and stack[-1][1] == node.parent_id and not stack[-1][2]:
+                if thread_url is None:
+                    thread_url = reverse("apps.blog:post", args=[node.submission_id])
+                out.append(CONTINUE_THREAD.format(url=thread_url, id=node.parent_id))
+                stack[-1][2] = True
+            continue
+
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+            out.append(NODE_CLOSE)
+
+        vote_value = comment_votes.get(node.id)
+        out.append(
+            NODE_OPEN.format(
+                id=node.id,
+                upvote="" if node.deleted else UPVOTE.format(voted=" upvoted" if vote_value == 1 else ""),
+                downvote="" if node.deleted else DOWNVOTE.format(voted=" downvoted" if vote_value == -1 else ""),
+                score=node.score,
+                author_url=profile_url.replace("__username__", node.author_name) if node.author_id else "#",
+                author_name=conditional_escape(node.author_name),
+                timestamp=naturaltime(node.timestamp) + (" (edited)" if node.edited else ""),
+                # Comment content is rendered unescaped, as in the thread template.
+                content=node.content,
+                reply="" if node.deleted else REPLY,
+            )
+        )
+        stack.append([depth, node.id, False])
+
+    out.append(NODE_CLOSE * len(stack))
+    return mark_safe("".join(out))
+
+
+@register.simple_tag
+def comment_tree(nodes, comment_votes=None, max_depth=None):
+    """
+    Usage::
+
+        {% load comment_tree %}
+        {% comment_tree comments comment_votes max_depth=8 %}
+    """
+    if max_depth is None:
+        max_depth = getattr(settings, "COMMENT_TREE_MAX_DEPTH", None)
+    return render_comment_tree(nodes, comment_votes, max_depth)
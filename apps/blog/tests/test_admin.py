@@ -0,0 +1,90 @@
+"""
+Tests for the blog admin.
+"""
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from apps.blog.models import Submission, Comment, Vote
+from apps.user.models import User
+
+
+@pytest.fixture
+def admin_client():
+    User.objects.create_superuser(username="admin", email="admin@example.com", password="test_password")
+    client = Client()
+    client.login(username="admin", password="test_password")
+    return client
+
+
+@pytest.fixture
+def thread():
+    user = User.objects.create_user(username="test_user", password="test_password")
+    voter = User.objects.create_user(username="test_voter", password="test_password")
+    submission = Submission.objects.create(title="test_submission", content="long " * 500, author=user)
+    comments = []
+    for i in range(15):
+        comment = Comment.create(author=user, content=f"comment {i} " + "x" * 300, parent=submission)
+        comment.save()
+        comments.append(comment)
+    Vote.create(user=voter, comment=comments[0], vote_value=1).save()
+    return submission, comments
+
+
+@pytest.mark.django_db
+class TestBlogAdmin:
+    """Tests for blog ModelAdmins"""
+
+    @pytest.mark.parametrize("model", ["submission", "comment", "vote"])
+    def test_changelist(self, admin_client, thread, model):
+        response = admin_client.get(reverse(f"admin:blog_{model}_changelist"))
+        assert response.status_code == 200
+
+    def test_changelist_shows_preview_only(self, admin_client, thread):
+        response = admin_client.get(reverse("admin:blog_submission_changelist"))
+        content = response.content.decode()
+
+        assert "long " * 10 in content
+        assert "long " * 100 not in content
+
+    def test_submission_change_form_bounds_inline(self, admin_client, thread):
+        submission, comments = thread
+        response = admin_client.get(reverse("admin:blog_submission_change", args=(submission.id,)))
+        formset = response.context["inline_admin_formsets"][0].formset
+        content = response.content.decode()
+
+        assert response.status_code == 200
+        assert formset.initial_form_count() == 10
+        assert [f.instance for f in formset.initial_forms] == comments[::-1][:10]
+        assert 'data-field-name="author"' in content  # autocomplete, not a full <select>
+        assert '<select name="comment_set-0-parent"' not in content
+
+    def test_comment_change_form_uses_raw_ids(self, admin_client, thread):
+        _, comments = thread
+        response = admin_client.get(reverse("admin:blog_comment_change", args=(comments[0].id,)))
+        content = response.content.decode()
+
+        assert response.status_code == 200
+        assert '<select name="parent"' not in content
+        assert '<select name="submission"' not in content
+
+    def test_author_autocomplete(self, admin_client, thread):
+        response = admin_client.get(
+            reverse("admin:autocomplete"),
+            {"term": "test_u", "app_label": "blog", "model_name": "submission", "field_name": "author"},
+        )
+        assert [r["text"] for r in response.json()["results"]] == ["test_user"]
+
+    def test_delete_hides_and_queues_purge(self, admin_client, thread, settings):
+        settings.JOBS_ALWAYS_EAGER = False
+        submission, _ = thread
+        url = reverse("admin:blog_submission_delete", args=(submission.id,))
+
+        assert admin_client.get(url).status_code == 200
+        response = admin_client.post(url, {"post": "yes"})
+
+        assert response.status_code == 302
+        submission.refresh_from_db()
+        assert submission.deleted
+        assert Comment.objects.filter(submission=submission).count() == 15
@@ -154,16 +154,20 @@ class TestCommentsView:
 
         response = client.get(url)
         submission = response.context["submission"]
-        comments = response.context["comments"]
-        comment_votes = response.context["comment_votes"]
+        thread_html = response.context["thread_html"]
 
         assert response.status_code == 200
-        assert comment_votes == {cmt.id: 1}
         assert submission == submissions[0]
-        assert len(comments) == 1
-        assert comments[0] == cmt
+        assert thread_html.count('data-what-id="') == 1
+        assert 'data-what-id="{}"'.format(cmt.id) in thread_html
+        assert ">test_user</a>" in thread_html
+        # The votes are not part of the page, they come from comment_votes.
+        assert "upvoted" not in thread_html
         assert "comments.html" in response.templates[0].name
 
+        response = client.get(reverse("apps.blog:comment_votes", args=[submission_id]))
+        assert json.loads(response.content) == {str(cmt.id): 1}
+
 
 @pytest.mark.django_db
 class TestPostCommentView:
@@ -0,0 +1,97 @@
+"""
+Tests for 'Submission.comment_count' maintenance.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.blog.counters import reconcile_comment_counts
+from apps.blog.utils.objects import submissions
+from apps.blog.models import Submission, Comment
+from apps.user.models import User
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username="test_user", password="test_password")
+
+
+@pytest.fixture
+def submission():
+    return Submission.objects.create(title="test_submission", content="x" * 1000)
+
+
+def post(user, parent):
+    comment = Comment.create(author=user, content="test_content", parent=parent)
+    comment.save()
+    return comment
+
+
+@pytest.mark.django_db
+class TestCommentCount:
+    """Tests for comment_count signals and reconciliation"""
+
+    def test_insert_increments(self, user, submission):
+        root = post(user, submission)
+        post(user, root)
+        submission.refresh_from_db()
+        assert submission.comment_count == 2
+
+    def test_update_does_not_increment(self, user, submission):
+        comment = post(user, submission)
+        comment.content = "edited"
+        comment.save()
+        submission.refresh_from_db()
+        assert submission.comment_count == 1
+
+    def test_increment_is_narrow_update(self, user, submission):
+        comment = Comment.create(author=user, content="test_content", parent=submission)
+        with CaptureQueriesContext(connection) as ctx:
+            comment.save()
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "blog_submission"')]
+
+        assert len(updates) == 1
+        assert '"content"' not in updates[0]
+
+    def test_delete_decrements(self, user, submission):
+        comment = post(user, submission)
+        post(user, submission)
+        comment.delete()
+        submission.refresh_from_db()
+        assert submission.comment_count == 1
+
+    def test_submission_delete_cascades(self, user, submission):
+        post(user, post(user, submission))
+        submission.delete()
+        assert Comment.objects.count() == 0
+
+    def test_reconcile_fixes_drift(self, user, submission):
+        other = Submission.objects.create(title="other")
+        post(user, submission)
+        post(user, submission)
+        Submission.objects.filter(pk=submission.pk).update(comment_count=7)
+        Submission.objects.filter(pk=other.pk).update(comment_count=-1)
+        assert submissions.get(other.pk).comment_count == -1
+
+        fixed = sum(n for _, n in reconcile_comment_counts(batch_size=1))
+        submission.refresh_from_db()
+        other.refresh_from_db()
+
+        assert fixed == 2
+        assert submission.comment_count == 2
+        assert other.comment_count == 0
+        assert submissions.get(other.pk).comment_count == 0
+
+    def test_reconcile_command(self, user, submission):
+        post(user, submission)
+        Submission.objects.filter(pk=submission.pk).update(comment_count=0)
+        out = StringIO()
+        call_command("reconcile_comment_counts", "--batch-size", "10", stdout=out)
+        submission.refresh_from_db()
+
+        assert submission.comment_count == 1
+        assert "Fixed comment_count on 1 submissions" in out.getvalue()
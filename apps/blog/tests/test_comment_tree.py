@@ -0,0 +1,152 @@
+"""
+Tests for the '{% comment_tree %}' renderer.
+"""
+
+import re
+from types import SimpleNamespace
+
+import pytest
+from django.test import Client
+from django.template import engines
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blog.management.commands.bench_comment_tree import RECURSETREE_TEMPLATE
+from apps.blog.models import Submission, Comment, Vote
+from apps.blog.templatetags.comment_tree import render_comment_tree
+from apps.blog.utils.synthetic import synthetic_thread
+from apps.user.models import User
+
+
+def squash(html):
+    return re.sub(r"\s+", "", html)
+
+
+@pytest.fixture
+def thread():
+    """
+    root_a
+      reply_1
+        reply_2
+      reply_3
+    root_b
+    """
+    author = User.objects.create_user(username="test_author", password="test_password")
+    voter = User.objects.create_user(username="test_voter", password="test_password")
+    submission = Submission.objects.create(title="test_submission")
+
+    def post(parent, text):
+        comment = Comment.create(author=author, content=text, parent=parent)
+        comment.save()
+        return comment
+
+    root_a = post(submission, "root_a")
+    reply_1 = post(root_a, "reply_1")
+    reply_2 = post(reply_1, "reply_2")
+    reply_3 = post(root_a, "reply_3")
+    root_b = post(submission, "root_b")
+    Vote.create(user=voter, comment=reply_1, vote_value=1).save()
+    Vote.create(user=voter, comment=root_b, vote_value=-1).save()
+    return SimpleNamespace(
+        submission=submission,
+        voter=voter,
+        root_a=root_a,
+        reply_1=reply_1,
+        reply_2=reply_2,
+        reply_3=reply_3,
+        root_b=root_b,
+    )
+
+
+def chain(depth):
+    now = timezone.now()
+    return [
+        SimpleNamespace(
+            id=i + 1,
+            parent_id=i or None,
+            submission_id=1,
+            author_id=1,
+            author_name="deep",
+            score=0,
+            timestamp=now,
+            content=f"level {i}",
+            edited=None,
+            deleted=False,
+        )
+        for i in range(depth)
+    ]
+
+
+@pytest.mark.django_db
+class TestCommentTree:
+    """Tests for render_comment_tree"""
+
+    def test_matches_recursetree_markup(self, thread):
+        comments = list(Comment.objects.filter(submission=thread.submission).select_related("author"))
+        votes = {thread.reply_1.id: 1, thread.root_b.id: -1}
+        legacy = (
+            engines["django"].from_string(RECURSETREE_TEMPLATE).render({"comments": comments, "comment_votes": votes})
+        )
+
+        assert squash(render_comment_tree(comments, votes)) == squash(legacy)
+
+    def test_max_depth_collapses_subthreads(self, thread):
+        comments = Comment.objects.filter(submission=thread.submission).select_related("author")
+        html = render_comment_tree(comments, max_depth=1)
+
+        assert "reply_1" in html
+        assert "reply_2" not in html
+        assert html.count("continue this thread") == 1
+        assert f"?comment={thread.reply_1.id}" in html
+        # The sibling after the collapsed subthread is still shown, in its place.
+        assert html.index("reply_1") < html.index("reply_3") < html.index("root_b")
+        assert f"?comment={thread.reply_3.id}" not in html
+
+    def test_deep_thread_is_not_recursive(self):
+        html = render_comment_tree(chain(5000))
+        assert html.count('<div class="media">') == 5000
+        assert html.endswith("</div></div>" * 5000)
+
+    def test_escapes_author_name(self):
+        node = chain(1)[0]
+        node.author_name = "<b>"
+        assert "&lt;b&gt;" in render_comment_tree([node])
+
+    def test_continue_link_view(self, thread):
+        client = Client()
+        client.login(username="test_voter", password="test_password")
+        url = reverse("apps.blog:post", kwargs={"thread_id": thread.submission.id})
+
+        response = client.get(url, {"comment": thread.reply_1.id})
+        content = response.content.decode()
+        assert response.status_code == 200
+        assert "reply_2" in content
+        assert "root_a" not in content
+        assert "root_b" not in content
+
+        assert client.get(url, {"comment": "abc"}).status_code == 404
+        other = Submission.objects.create(title="other")
+        other_url = reverse("apps.blog:post", kwargs={"thread_id": other.id})
+        assert client.get(other_url, {"comment": thread.reply_1.id}).status_code == 404
+
+
+class TestSyntheticThread:
+    """Tests for in-memory MPTT numbering"""
+
+    def test_numbering_is_consistent(self):
+        rows = synthetic_thread(500, max_depth=4)
+        by_id = {row.id: row for row in rows}
+
+        assert len(rows) == 500
+        assert max(row.level for row in rows) <= 4
+        for row in rows:
+            assert row.lft < row.rght
+            if row.parent_id:
+                parent = by_id[row.parent_id]
+                assert parent.tree_id == row.tree_id
+                assert parent.lft < row.lft < row.rght < parent.rght
+                assert row.level == parent.level + 1
+            else:
+                assert row.lft == 1
+                assert row.rght == 2 * sum(1 for r in rows if r.tree_id == row.tree_id)
+        assert [(r.tree_id, r.lft) for r in rows] == sorted((r.tree_id, r.lft) for r in rows)
@@ -0,0 +1,169 @@
+"""
+Tests for editing and deleting comments.
+"""
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from apps.blog.editing import delete_comment, edit_comment
+from apps.blog.models import Submission, Comment, Notification, Vote
+from apps.blog.utils.thread import thread_html
+from apps.blog.votes import NOT_FOUND, apply_votes
+from apps.user.models import User
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username="test_author", password="test_password")
+
+
+@pytest.fixture
+def replier():
+    return User.objects.create_user(username="test_replier", password="test_password")
+
+
+@pytest.fixture
+def submission(author):
+    return Submission.objects.create(title="test_submission", author=author)
+
+
+def reply(author, parent, content="reply"):
+    comment = Comment.create(author=author, content=content, parent=parent)
+    comment.save()
+    return comment
+
+
+def tree(submission):
+    return list(
+        Comment.objects.filter(submission=submission).order_by("pk").values_list("pk", "tree_id", "lft", "rght")
+    )
+
+
+@pytest.fixture
+def thread(submission, author, replier):
+    top = reply(replier, submission, "top comment")
+    middle = reply(author, top, "middle comment")
+    bottom = reply(replier, middle, "bottom comment")
+    return top, middle, bottom
+
+
+@pytest.mark.django_db
+class TestDeleteComment:
+    """Tests for delete_comment"""
+
+    def test_tombstone_keeps_tree(self, submission, author, thread, django_capture_on_commit_callbacks):
+        top, middle, bottom = thread
+        before = tree(submission)
+        assert thread_html(submission).count("comment</h5>") == 3
+
+        with django_capture_on_commit_callbacks(execute=True):
+            delete_comment(middle)
+
+        assert tree(submission) == before
+        middle.refresh_from_db()
+        assert middle.deleted and middle.content == "" and middle.author_id is None
+
+        html = thread_html(submission)
+        assert "middle comment" not in html
+        assert "<h5>[deleted]</h5>" in html
+        assert "top comment" in html and "bottom comment" in html
+        # No vote arrows or reply button on the tombstone.
+        assert html.count('title="upvote"') == html.count('name="replyButton"') == 2
+        assert 'data-what-id="{}"><a class="score">'.format(middle.id) in html
+
+    def test_counters_and_notifications(self, submission, author, replier, thread):
+        top, middle, bottom = thread
+        author.refresh_from_db()
+        comment_count = author.comment_count
+        assert Notification.objects.filter(comment=middle).exists()
+
+        delete_comment(middle)
+        delete_comment(middle)
+
+        author.refresh_from_db()
+        replier.refresh_from_db()
+        assert author.comment_count == comment_count - 1
+        assert not Notification.objects.filter(comment=middle).exists()
+        assert replier.unread_notifications == 0
+
+
+@pytest.mark.django_db
+class TestEditComment:
+    """Tests for edit_comment"""
+
+    def test_edit(self, submission, thread, django_capture_on_commit_callbacks):
+        top, middle, bottom = thread
+        before = tree(submission)
+        thread_html(submission)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            edit_comment(middle, "changed comment")
+
+        assert tree(submission) == before
+        middle.refresh_from_db()
+        assert middle.content == "changed comment"
+        assert middle.edited is not None
+
+        html = thread_html(submission)
+        assert "changed comment" in html and "middle comment" not in html
+        assert html.count("(edited)") == 1
+
+    def test_deleted_meanwhile(self, submission, thread):
+        top, middle, bottom = thread
+        stale = Comment.objects.get(pk=middle.pk)
+        delete_comment(middle)
+
+        assert not edit_comment(stale, "changed comment")
+        middle.refresh_from_db()
+        assert middle.deleted and middle.content == "" and middle.edited is None
+
+
+@pytest.mark.django_db
+class TestViews:
+    """Tests for the edit and delete endpoints"""
+
+    def test_author_only(self, thread, replier):
+        top, middle, bottom = thread
+        client = Client()
+        edit_url = reverse("apps.blog:edit_comment", args=[middle.id])
+        delete_url = reverse("apps.blog:delete_comment", args=[middle.id])
+
+        assert client.post(edit_url, {"content": "x"}).status_code == 403
+        client.force_login(replier)
+        assert client.post(edit_url, {"content": "x"}).status_code == 403
+        assert client.post(delete_url).status_code == 403
+        assert client.get(reverse("apps.blog:comment_source", args=[middle.id])).status_code == 403
+        assert client.get(delete_url).status_code == 405
+        middle.refresh_from_db()
+        assert middle.content == "middle comment" and not middle.deleted
+
+    def test_edit_and_delete(self, thread, author, replier):
+        top, middle, bottom = thread
+        client = Client()
+        client.force_login(author)
+        edit_url = reverse("apps.blog:edit_comment", args=[middle.id])
+        source_url = reverse("apps.blog:comment_source", args=[middle.id])
+
+        assert client.post(edit_url, {"content": ""}).json() == {"msg": "You have to write something."}
+        assert client.post(edit_url, {"content": "<b>changed</b>"}).status_code == 200
+        middle.refresh_from_db()
+        assert middle.content == "<b>changed</b>"
+        assert client.get(source_url).json() == {"content": "<b>changed</b>"}
+
+        assert client.post(reverse("apps.blog:delete_comment", args=[middle.id])).status_code == 200
+        middle.refresh_from_db()
+        assert middle.deleted
+
+        # Tombstones can be neither edited, answered nor voted on.
+        assert client.post(edit_url, {"content": "again"}).status_code == 400
+        assert client.get(source_url).status_code == 400
+        client.force_login(replier)
+        assert client.post(reverse("apps.blog:vote"), {"what_id": middle.id, "vote_value": 1}).status_code == 400
+        assert apply_votes(replier, [(middle.id, 1)])[0]["error"] == NOT_FOUND
+        assert not Vote.objects.filter(comment=middle).exists()
+        response = client.post(
+            reverse("apps.blog:post_comment"),
+            {"parentType": "comment", "parentId": middle.id, "commentContent": "reply"},
+        )
+        assert response.status_code == 400
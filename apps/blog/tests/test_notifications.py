@@ -0,0 +1,153 @@
+"""
+Tests for reply notifications and the inbox.
+"""
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from apps.blog.models import Submission, Comment, Notification
+from apps.blog.notifications import inbox_page, mark_read
+from apps.blog.purge import purge_batch, soft_delete_submission
+from apps.jobs import queue
+from apps.user.models import User
+
+
+@pytest.fixture
+def deferred(settings):
+    settings.JOBS_ALWAYS_EAGER = False
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username="test_author", password="test_password")
+
+
+@pytest.fixture
+def replier():
+    return User.objects.create_user(username="test_replier", password="test_password")
+
+
+@pytest.fixture
+def submission(author):
+    return Submission.objects.create(title="test_submission", author=author)
+
+
+def reply(author, parent, content="reply"):
+    comment = Comment.create(author=author, content=content, parent=parent)
+    comment.save()
+    return comment
+
+
+def unread(user):
+    user.refresh_from_db()
+    return user.unread_notifications
+
+
+@pytest.mark.django_db
+class TestNotifyReplies:
+    """Tests for writing notifications"""
+
+    def test_reply_to_submission_and_comment(self, submission, author, replier):
+        top = reply(replier, submission)
+        answer = reply(author, top)
+
+        assert list(Notification.objects.filter(recipient=author).values_list("comment_id", flat=True)) == [top.id]
+        assert list(Notification.objects.filter(recipient=replier).values_list("comment_id", flat=True)) == [answer.id]
+        assert unread(author) == 1
+        assert unread(replier) == 1
+
+    def test_no_notification(self, submission, author, replier):
+        own = reply(author, submission)
+        reply(author, own)
+        assert not Notification.objects.exists()
+
+        author.mark_deleted()
+        reply(replier, submission)
+        assert not Notification.objects.exists()
+
+    def test_background_fan_out(self, deferred, submission, author, replier):
+        for i in range(3):
+            reply(replier, submission, str(i))
+        assert unread(author) == 0
+
+        queue.run_pending()
+
+        assert unread(author) == 3
+        assert Notification.objects.filter(recipient=author).count() == 3
+
+
+@pytest.mark.django_db
+class TestInbox:
+    """Tests for the inbox"""
+
+    def test_cursor_pages(self, submission, author, replier):
+        comments = [reply(replier, submission, str(i)) for i in range(5)]
+
+        first, before = inbox_page(author, limit=2)
+        second, before = inbox_page(author, before=before, limit=2)
+        third, before = inbox_page(author, before=before, limit=2)
+
+        assert [n.comment_id for n in first + second + third] == [c.id for c in reversed(comments)]
+        assert before is None
+
+    def test_mark_read(self, submission, author, replier):
+        for i in range(3):
+            reply(replier, submission, str(i))
+        page, _ = inbox_page(author, limit=2)
+        assert unread(author) == 3
+
+        assert mark_read(author, page) == 2
+        assert author.unread_notifications == 1
+        assert unread(author) == 1
+        assert mark_read(author, page) == 0
+
+    def test_view(self, submission, author, replier, django_assert_max_num_queries):
+        for i in range(5):
+            reply(replier, submission, "hello there")
+        client = Client()
+        client.force_login(author)
+
+        response = client.get(reverse("frontpage"))
+        assert b'badge-primary">5</span>' in response.content
+
+        # No query per notification.
+        with django_assert_max_num_queries(9):
+            response = client.get(reverse("apps.blog:inbox"))
+        assert b"hello there" in response.content
+        assert b"<strong>new</strong>" in response.content
+        assert unread(author) == 0
+
+        response = client.get(reverse("apps.blog:inbox"))
+        assert b"<strong>new</strong>" not in response.content
+        assert b"badge-primary" not in response.content
+
+    def test_view_bad_cursor(self, author):
+        client = Client()
+        client.force_login(author)
+        assert client.get(reverse("apps.blog:inbox"), {"before": "x"}).status_code == 404
+
+    def test_login_required(self):
+        assert Client().get(reverse("apps.blog:inbox")).status_code == 302
+
+
+@pytest.mark.django_db
+class TestDiscard:
+    """Tests for notifications of deleted comments"""
+
+    def test_purge_removes_notifications(self, submission, author, replier):
+        reply(replier, submission)
+        soft_delete_submission(submission)
+
+        while not purge_batch(submission.id)["done"]:
+            pass
+
+        assert not Notification.objects.exists()
+        assert unread(author) == 0
+
+    def test_deleted_comment(self, submission, author, replier):
+        comment = reply(replier, submission)
+        comment.delete()
+
+        assert not Notification.objects.exists()
+        assert unread(author) == 0
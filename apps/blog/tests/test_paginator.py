@@ -0,0 +1,76 @@
+"""
+Tests for 'EstimatedCountPaginator'.
+"""
+
+import pytest
+from django.db import connection
+
+from apps.blog.models import Submission
+from apps.blog.utils.paginator import EstimatedCountPaginator, estimate_query_rows, estimate_table_rows
+
+
+@pytest.fixture
+def submissions():
+    Submission.objects.bulk_create([Submission(title=f"Submission {i}", modified=i % 2 == 0) for i in range(40)])
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE blog_submission")
+
+
+@pytest.fixture
+def low_threshold(monkeypatch):
+    monkeypatch.setattr(EstimatedCountPaginator, "threshold", 10)
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    """Tests for estimated and cached counts"""
+
+    def test_small_table_counts_exactly(self, submissions):
+        paginator = EstimatedCountPaginator(Submission.objects.all(), 5)
+        assert paginator.count == 40
+        assert not paginator.estimated
+
+    def test_table_statistics(self, submissions):
+        assert estimate_table_rows(Submission) == 40
+
+    def test_unfiltered_uses_table_statistics(self, submissions, low_threshold, django_assert_num_queries):
+        Submission.objects.all()[:1].get().delete()
+        paginator = EstimatedCountPaginator(Submission.objects.all(), 5)
+        with django_assert_num_queries(1):
+            assert paginator.count == 40  # statistics, not the live count
+        assert paginator.estimated
+
+    def test_filtered_uses_query_plan(self, submissions, low_threshold):
+        queryset = Submission.objects.filter(modified=True)
+        estimate = estimate_query_rows(queryset)
+        paginator = EstimatedCountPaginator(queryset, 5)
+
+        assert estimate > 10
+        assert paginator.count == estimate
+        assert paginator.estimated
+
+    def test_exact_count_is_cached(self, submissions):
+        queryset = Submission.objects.filter(modified=True)
+        assert EstimatedCountPaginator(queryset, 5).count == 20
+
+        Submission.objects.filter(modified=True)[:1].get().delete()
+        paginator = EstimatedCountPaginator(Submission.objects.filter(modified=True), 5)
+        assert paginator.count == 20
+
+    def test_no_cache_timeout_counts_every_time(self, submissions, monkeypatch):
+        monkeypatch.setattr(EstimatedCountPaginator, "cache_timeout", 0)
+        assert EstimatedCountPaginator(Submission.objects.filter(modified=True), 5).count == 20
+        Submission.objects.filter(modified=True)[:1].get().delete()
+        assert EstimatedCountPaginator(Submission.objects.filter(modified=True), 5).count == 19
+
+    def test_other_databases_fall_back_to_exact_count(self, submissions, low_threshold, monkeypatch):
+        monkeypatch.setattr(connection, "vendor", "sqlite")
+        paginator = EstimatedCountPaginator(Submission.objects.filter(modified=True), 5)
+
+        assert estimate_query_rows(Submission.objects.all()) is None
+        assert estimate_table_rows(Submission) is None
+        assert paginator.count == 20
+        assert not paginator.estimated
+
+    def test_lists_are_counted(self):
+        assert EstimatedCountPaginator(list(range(7)), 5).count == 7
@@ -0,0 +1,139 @@
+"""
+Tests for soft deletion and the batched purge of submissions.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.blog.models import Submission, Comment, Vote
+from apps.blog.purge import purge_batch, soft_delete_submission
+from apps.jobs import queue
+from apps.jobs.models import Job
+from apps.user.models import User
+
+
+@pytest.fixture
+def deferred(settings):
+    settings.JOBS_ALWAYS_EAGER = False
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username="test_author", password="test_password")
+
+
+@pytest.fixture
+def voter():
+    return User.objects.create_user(username="test_voter", password="test_password")
+
+
+@pytest.fixture
+def thread(author, voter):
+    """A submission with 3 roots, each with a reply and a reply to that, and a vote on every root."""
+    submission = Submission.objects.create(title="test_submission", author=author)
+    for i in range(3):
+        parent = submission
+        for depth in range(3):
+            parent = Comment.create(author=author if depth != 1 else voter, content="c", parent=parent)
+            parent.save()
+            if depth == 0:
+                Vote.create(user=voter, comment=parent, vote_value=1).save()
+    return submission
+
+
+@pytest.mark.django_db
+class TestSoftDelete:
+    """Tests for hiding a submission before its purge"""
+
+    def test_hidden_immediately(self, deferred, thread, author):
+        client = Client()
+        client.force_login(author)
+
+        response = client.post(reverse("apps.blog:delete_post", args=[thread.id]))
+
+        assert response.status_code == 302
+        thread.refresh_from_db()
+        assert thread.deleted
+        assert Comment.objects.filter(submission=thread).count() == 9
+        assert client.get(reverse("apps.blog:post", args=[thread.id])).status_code == 404
+        assert thread not in client.get(reverse("frontpage")).context["submissions"]
+        assert Job.objects.filter(name="blog.purge_submission", status=Job.QUEUED).count() == 1
+        author.refresh_from_db()
+        assert author.submission_count == 0
+
+    def test_second_delete_is_noop(self, deferred, thread, author):
+        soft_delete_submission(thread)
+        soft_delete_submission(thread)
+
+        assert Job.objects.filter(name="blog.purge_submission").count() == 1
+        author.refresh_from_db()
+        assert author.submission_count == 0
+
+
+@pytest.mark.django_db
+class TestPurge:
+    """Tests for purge_batch and the purge job"""
+
+    def test_batches_votes_then_deepest_comments(self, deferred, thread, author, voter):
+        soft_delete_submission(thread)
+
+        first = purge_batch(thread.id, batch_size=4)
+        assert (first["votes"], first["comments"]) == (3, 1)
+        assert Comment.objects.filter(submission=thread, level=2).count() == 2
+
+        second = purge_batch(thread.id, batch_size=4)
+        assert second["comments"] == 4
+        assert not Comment.objects.filter(submission=thread, level=2).exists()
+        assert Comment.objects.filter(submission=thread, level=1).count() == 1
+        assert (second["comments_left"], second["done"]) == (4, False)
+
+        assert purge_batch(thread.id, batch_size=4)["done"]
+        assert not Submission.objects.filter(pk=thread.id).exists()
+        author.refresh_from_db()
+        voter.refresh_from_db()
+        assert (author.comment_count, author.submission_count) == (0, 0)
+        assert voter.comment_count == 0
+
+    def test_job_requeues_itself_until_done(self, deferred, thread):
+        soft_delete_submission(thread)
+        Job.objects.update(payload={"submission_id": thread.id, "batch_size": 5})
+
+        runs = 0
+        while queue.run_pending():
+            runs += 1
+
+        assert runs == 3
+        assert not Submission.objects.filter(pk=thread.id).exists()
+        assert not Vote.objects.exists()
+
+    def test_queries_do_not_grow_with_batch(self, deferred, thread):
+        soft_delete_submission(thread)
+        purge_batch(thread.id, batch_size=3)  # the votes
+
+        with CaptureQueriesContext(connection) as small:
+            purge_batch(thread.id, batch_size=2)  # two replies, one author
+        with CaptureQueriesContext(connection) as large:
+            purge_batch(thread.id, batch_size=6)  # six comments, two authors
+
+        assert len(large) == len(small) + 1  # one more UPDATE for the second author
+
+    def test_visible_submission_untouched(self, thread):
+        assert purge_batch(thread.id)["done"]
+        assert Comment.objects.filter(submission=thread).count() == 9
+
+    def test_command_resumes(self, deferred, thread):
+        soft_delete_submission(thread)
+        purge_batch(thread.id, batch_size=4)
+        out = StringIO()
+
+        call_command("purge_submissions", "--batch-size", "2", stdout=out)
+
+        assert not Submission.objects.filter(pk=thread.id).exists()
+        assert "purged 0 votes and 8 comments" in out.getvalue()
+        assert "Purged 1 submissions" in out.getvalue()
@@ -0,0 +1,80 @@
+"""
+Tests for bulk generated blog data.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count, F, Q, Sum
+
+from apps.blog.counters import actual_comment_count
+from apps.blog.models import Submission, Comment, Vote
+from apps.blog.seed import BlogSeeder, seed_users
+from apps.blog.trees import corrupted_trees
+from apps.user.models import User
+
+
+@pytest.fixture
+def seeded():
+    user_ids = seed_users(20)
+    seeder = BlogSeeder(user_ids, comments=30, max_depth=4, votes=3, seed=1, batch_size=50)
+    totals = seeder.seed(5)
+    return user_ids, totals
+
+
+@pytest.mark.django_db
+class TestSeed:
+    """Tests for seed_users and BlogSeeder"""
+
+    def test_totals(self, seeded):
+        user_ids, totals = seeded
+        assert User.objects.filter(pk__in=user_ids).count() == 20
+        assert totals["submissions"] == Submission.objects.count() == 5
+        assert totals["comments"] == Comment.objects.count() > 0
+        assert totals["votes"] == Vote.objects.count() > 0
+
+    def test_valid_trees(self, seeded):
+        tree_ids = set(Comment.objects.values_list("tree_id", flat=True))
+        assert corrupted_trees(tree_ids) == []
+        assert Comment.objects.filter(level__gt=4).count() == 0
+
+    def test_consistent_counters(self, seeded):
+        assert not Submission.objects.exclude(comment_count=actual_comment_count()).exists()
+
+        for comment in Comment.objects.annotate(
+            up_votes=Count("vote", filter=Q(vote__value=1)), down_votes=Count("vote", filter=Q(vote__value=-1))
+        ):
+            assert (comment.ups, comment.downs, comment.score) == (
+                comment.up_votes,
+                comment.down_votes,
+                comment.up_votes - comment.down_votes,
+            )
+        assert not Vote.objects.filter(user_id=F("comment__author_id")).exists()
+
+        for user in User.objects.all():
+            assert user.comment_count == Comment.objects.filter(author=user).count()
+            assert user.submission_count == Submission.objects.filter(author=user).count()
+            assert user.karma == (Comment.objects.filter(author=user).aggregate(s=Sum("score"))["s"] or 0)
+
+    def test_site_writes_continue(self, seeded):
+        user = User.objects.get(pk=seeded[0][0])
+        parent = Comment.objects.order_by("pk").last()
+        comment = Comment.create(author=user, content="reply", parent=parent)
+        comment.save()
+
+        assert comment.pk > parent.pk
+        assert corrupted_trees([parent.tree_id]) == []
+
+
+@pytest.mark.django_db
+class TestCommand:
+    """Tests for the seed_blog_data command"""
+
+    def test_command(self):
+        out = StringIO()
+        call_command("seed_blog_data", "--users", "5", "--submissions", "3", "--comments", "10", stdout=out)
+
+        assert User.objects.count() == 5
+        assert Submission.objects.count() == 3
+        assert "Created 5 users, 3 submissions" in out.getvalue()
@@ -0,0 +1,173 @@
+"""
+Tests for the lightweight thread read path.
+"""
+
+import json
+import tracemalloc
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blog.models import Submission, Comment, Vote
+from apps.blog.utils.thread import CommentNode, thread_html, thread_nodes, user_votes, COLUMNS
+from apps.blog.votes import apply_votes
+from apps.user.models import User
+
+
+def allocated(build):
+    """:return: Bytes still allocated by ``build()`` once it returned, and its result"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename")), result
+
+
+@pytest.fixture
+def rows():
+    now = timezone.now()
+    return [(i, i - 1 or None, 1, 1, "author", 0, now, "content", None, False) for i in range(1, 10001)]
+
+
+@pytest.mark.django_db
+class TestThreadNodes:
+    """Tests for thread_nodes"""
+
+    def test_single_query_in_tree_order(self, django_assert_num_queries):
+        author = User.objects.create_user(username="test_user", password="test_password")
+        submission = Submission.objects.create(title="test_submission")
+        root = Comment.create(author=author, content="root", parent=submission)
+        root.save()
+        reply = Comment.create(author=author, content="reply", parent=root)
+        reply.save()
+        Comment.create(author=author, content="second root", parent=submission).save()
+        User.objects.filter(pk=author.pk).delete()
+
+        with django_assert_num_queries(1):
+            nodes = thread_nodes(Comment.objects.filter(submission=submission))
+
+        assert [n.content for n in nodes] == ["root", "reply", "second root"]
+        assert nodes[1].parent_id == root.id
+        assert nodes[0].author_name == "deleted user"
+
+
+class TestMemoryFootprint:
+    """Memory used per 10k comments"""
+
+    def test_nodes_have_no_instance_dict(self):
+        node = CommentNode(*range(10))
+        assert not hasattr(node, "__dict__")
+
+    def test_10k_nodes_footprint(self, rows):
+        node_bytes, nodes = allocated(lambda: [CommentNode(*row) for row in rows])
+        model_bytes, models = allocated(
+            lambda: [
+                Comment.from_db("default", ["id", "parent_id", "submission_id", "author_id"], row[:4]) for row in rows
+            ]
+        )
+
+        assert len(nodes) == len(models) == 10000
+        # Around 100 bytes per node, list included.
+        assert node_bytes < 1.5 * 1024 * 1024
+        # Model instances with only four loaded columns already cost several times more.
+        assert node_bytes * 4 < model_bytes
+
+    def test_columns_match_node_fields(self):
+        assert len(COLUMNS) == len(CommentNode.__slots__)
+
+
+@pytest.fixture
+def thread():
+    author = User.objects.create_user(username="test_author", password="test_password")
+    submission = Submission.objects.create(title="test_submission", author=author)
+    root = Comment.create(author=author, content="root", parent=submission)
+    root.save()
+    return submission, root
+
+
+@pytest.fixture
+def voter():
+    return User.objects.create_user(username="test_voter", password="test_password")
+
+
+@pytest.mark.django_db
+class TestThreadHtml:
+    """Tests for the shared thread HTML cache"""
+
+    def test_cached(self, thread, django_assert_num_queries):
+        submission, root = thread
+        html = thread_html(submission)
+
+        with django_assert_num_queries(0):
+            assert thread_html(submission) == html
+
+    def test_new_comment_replaces_html(self, thread, django_capture_on_commit_callbacks):
+        submission, root = thread
+        thread_html(submission)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Comment.create(author=root.author, content="fresh reply", parent=root).save()
+
+        assert "fresh reply" in thread_html(submission)
+
+    def test_votes_replace_html(self, thread, voter, django_capture_on_commit_callbacks):
+        submission, root = thread
+        assert "> 0</a>" in thread_html(submission)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            apply_votes(voter, [(root.id, 1)])
+
+        assert "> 1</a>" in thread_html(submission)
+
+    def test_focus_cached_separately(self, thread):
+        submission, root = thread
+        reply = Comment.create(author=root.author, content="reply", parent=root)
+        reply.save()
+
+        assert "root" not in thread_html(submission, reply)
+        assert "root" in thread_html(submission)
+
+
+@pytest.mark.django_db
+class TestUserVotes:
+    """Tests for user_votes and the comment_votes view"""
+
+    def test_single_query_then_cached(self, thread, voter, django_assert_num_queries):
+        submission, root = thread
+        Vote.create(user=voter, comment=root, vote_value=-1).save()
+
+        with django_assert_num_queries(1):
+            assert user_votes(voter.pk, submission.pk) == {root.id: -1}
+        with django_assert_num_queries(0):
+            assert user_votes(voter.pk, submission.pk) == {root.id: -1}
+
+    def test_voting_drops_cached_votes(self, thread, voter, django_capture_on_commit_callbacks):
+        submission, root = thread
+        assert user_votes(voter.pk, submission.pk) == {}
+        client = Client()
+        client.force_login(voter)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(reverse("apps.blog:vote"), {"what_id": root.id, "vote_value": 1})
+        assert user_votes(voter.pk, submission.pk) == {root.id: 1}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            apply_votes(voter, [(root.id, 1)])
+        # A cancelled vote is no vote.
+        assert user_votes(voter.pk, submission.pk) == {}
+
+    def test_view(self, thread, voter):
+        submission, root = thread
+        Vote.create(user=voter, comment=root, vote_value=1).save()
+        url = reverse("apps.blog:comment_votes", args=[submission.id])
+
+        assert Client().get(url).status_code == 403
+
+        client = Client()
+        client.force_login(voter)
+        response = client.get(url)
+        assert json.loads(response.content) == {str(root.id): 1}
+        assert "private" in response["Cache-Control"]
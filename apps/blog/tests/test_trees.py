@@ -0,0 +1,131 @@
+"""
+Tests for checking and rebuilding comment trees.
+"""
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from apps.blog.models import Submission, Comment
+from apps.blog.trees import check_trees, corrupted_trees, rebuild_tree
+from apps.user.models import User
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username="test_user", password="test_password")
+
+
+@pytest.fixture
+def submission():
+    return Submission.objects.create(title="test_submission")
+
+
+def post(user, parent):
+    comment = Comment.create(author=user, content="test_content", parent=parent)
+    comment.save()
+    return comment
+
+
+def columns(tree_id=None):
+    comments = Comment.objects.order_by("pk")
+    if tree_id is not None:
+        comments = comments.filter(tree_id=tree_id)
+    return list(comments.values_list("pk", "parent_id", "tree_id", "lft", "rght", "level"))
+
+
+@pytest.fixture
+def forest(user, submission):
+    """Two trees of a submission: a root with two replies, one of which has a reply, and a lone root."""
+    root = post(user, submission)
+    first = post(user, root)
+    post(user, first)
+    post(user, root)
+    lone = post(user, submission)
+    return root.tree_id, lone.tree_id
+
+
+@pytest.mark.django_db
+class TestCorruptedTrees:
+    """Tests for corrupted_trees"""
+
+    def test_valid(self, forest):
+        assert corrupted_trees(forest) == []
+        assert list(check_trees(batch_size=1)) == [(0, []), (1, []), (2, [])]
+
+    @pytest.mark.parametrize(
+        "damage",
+        [
+            {"rght": 7},  # overlaps its sibling
+            {"level": 3},
+            {"lft": 9, "rght": 10},  # outside its parent
+            {"parent": None},  # a second root
+        ],
+    )
+    def test_detects(self, forest, damage):
+        tree_id, lone_tree_id = forest
+        child = Comment.objects.filter(tree_id=tree_id, level=1).order_by("lft").first()
+        Comment.objects.filter(pk=child.pk).update(**damage)
+
+        assert corrupted_trees(forest) == [tree_id]
+        assert [ids for _, ids in check_trees()] == [[tree_id]]
+
+    def test_node_in_wrong_tree(self, forest):
+        tree_id, lone_tree_id = forest
+        Comment.objects.filter(tree_id=tree_id, level=2).update(tree_id=lone_tree_id)
+        assert corrupted_trees([lone_tree_id]) == [tree_id, lone_tree_id]
+
+
+@pytest.mark.django_db
+class TestRebuildTree:
+    """Tests for rebuild_tree"""
+
+    def test_restores_only_the_damaged_rows(self, forest, django_assert_max_num_queries):
+        tree_id, lone_tree_id = forest
+        expected = columns()
+        deep = Comment.objects.get(tree_id=tree_id, level=2)
+        Comment.objects.filter(pk=deep.pk).update(lft=100, rght=50, level=7)
+
+        with django_assert_max_num_queries(5):
+            assert rebuild_tree(tree_id) == 1
+        assert columns() == expected
+        assert rebuild_tree(tree_id) == 0
+
+    def test_moved_node_and_second_root(self, forest):
+        tree_id, lone_tree_id = forest
+        expected = columns()
+        Comment.objects.filter(tree_id=tree_id, level=2).update(tree_id=lone_tree_id)
+
+        rebuild_tree(tree_id)
+        rebuild_tree(lone_tree_id)
+        assert columns() == expected
+
+        child = Comment.objects.filter(tree_id=tree_id, level=1).order_by("lft").last()
+        Comment.objects.filter(pk=child.pk).update(parent=None)
+        rebuild_tree(tree_id)
+
+        child.refresh_from_db()
+        assert (child.lft, child.rght, child.level) == (1, 2, 0)
+        assert child.tree_id not in forest
+        assert corrupted_trees(list(forest) + [child.tree_id]) == []
+
+
+@pytest.mark.django_db
+class TestCommand:
+    """Tests for the check_comment_trees command"""
+
+    def test_dry_run_then_repair(self, forest, submission):
+        tree_id, lone_tree_id = forest
+        expected = columns()
+        Comment.objects.filter(tree_id=tree_id, level=1).update(level=5)
+
+        out = StringIO()
+        call_command("check_comment_trees", "--dry-run", stdout=out)
+        assert "Found 1 corrupted trees, rebuilt 0" in out.getvalue()
+        assert columns() != expected
+
+        out = StringIO()
+        call_command("check_comment_trees", "--submission", str(submission.pk), stdout=out)
+        assert "tree {}: rebuilt, 2 comments moved".format(tree_id) in out.getvalue()
+        assert columns() == expected
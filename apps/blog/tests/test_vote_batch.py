@@ -0,0 +1,136 @@
+"""
+Tests for the batched vote endpoint.
+"""
+
+import json
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.blog.models import Submission, Comment, Vote
+from apps.blog.purge import soft_delete_submission
+from apps.blog.votes import MAX_BATCH, NOT_FOUND, OWN_COMMENT, apply_votes
+from apps.user.models import User
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username="test_author", password="test_password")
+
+
+@pytest.fixture
+def voter():
+    return User.objects.create_user(username="test_voter", password="test_password")
+
+
+@pytest.fixture
+def comments(author):
+    submission = Submission.objects.create(title="test_submission", author=author)
+    created = []
+    for _ in range(5):
+        comment = Comment.create(author=author, content="c", parent=submission)
+        comment.save()
+        created.append(comment)
+    return created
+
+
+def post(client, votes):
+    return client.post(reverse("apps.blog:vote_batch"), json.dumps({"votes": votes}), content_type="application/json")
+
+
+@pytest.mark.django_db
+class TestApplyVotes:
+    """Tests for apply_votes"""
+
+    def test_same_transitions_as_single_votes(self, comments, voter, author):
+        first, second = comments[:2]
+        results = apply_votes(voter, [(first.id, 1), (second.id, -1), (first.id, -1), (second.id, -1)])
+
+        assert [r["voteDiff"] for r in results] == [1, -1, -2, 1]
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert (first.score, first.ups, first.downs) == (-1, 0, 1)
+        assert (second.score, second.ups, second.downs) == (0, 0, 0)
+        assert Vote.objects.get(user=voter, comment=first).value == -1
+        assert Vote.objects.get(user=voter, comment=second).value == 0
+        assert Vote.objects.get(user=voter, comment=first).submission_id == first.submission_id
+        author.refresh_from_db()
+        assert author.karma == -1
+
+    def test_existing_votes_are_updated(self, comments, voter):
+        comment = comments[0]
+        Vote.create(user=voter, comment=comment, vote_value=1).save()
+
+        results = apply_votes(voter, [(comment.id, -1)])
+
+        assert results == [{"id": comment.id, "voteDiff": -2, "error": None}]
+        assert Vote.objects.filter(user=voter, comment=comment).count() == 1
+        comment.refresh_from_db()
+        assert (comment.score, comment.ups, comment.downs) == (-1, 0, 1)
+
+    def test_errors_per_item(self, comments, voter, author):
+        submission = Submission.objects.create(title="deleted", author=author)
+        hidden = Comment.create(author=author, content="c", parent=submission)
+        hidden.save()
+        soft_delete_submission(submission)
+        own = Comment.create(author=voter, content="c", parent=comments[0])
+        own.save()
+
+        results = apply_votes(voter, [(own.id, 1), (hidden.id, 1), (0, 1), (comments[0].id, 1)])
+
+        assert [r["error"] for r in results] == [OWN_COMMENT, NOT_FOUND, NOT_FOUND, None]
+        assert Vote.objects.filter(user=voter).count() == 1
+
+    def test_constant_queries(self, comments, voter):
+        def count(operations):
+            with CaptureQueriesContext(connection) as ctx:
+                apply_votes(voter, operations)
+            return len(ctx.captured_queries)
+
+        one = count([(comments[0].id, 1)])
+        Vote.objects.all().delete()
+        many = count([(c.id, 1) for c in comments])
+        assert one == many
+
+        # Updating existing votes instead of creating them is just as flat.
+        assert count([(c.id, -1) for c in comments]) <= many
+
+
+@pytest.mark.django_db
+class TestVoteBatchView:
+    """Tests for vote_batch view"""
+
+    def test_not_authenticated(self, comments):
+        assert post(Client(), [{"id": comments[0].id, "value": 1}]).status_code == 403
+
+    def test_GET_request(self, voter):
+        client = Client()
+        client.force_login(voter)
+        assert client.get(reverse("apps.blog:vote_batch")).status_code == 405
+
+    def test_invalid_body(self, voter, comments):
+        client = Client()
+        client.force_login(voter)
+
+        assert post(client, [{"id": comments[0].id}]).status_code == 400
+        assert post(client, [{"id": "x", "value": 1}]).status_code == 400
+        assert post(client, []).status_code == 400
+        assert post(client, [{"id": comments[0].id, "value": 1}] * (MAX_BATCH + 1)).status_code == 400
+        response = client.post(reverse("apps.blog:vote_batch"), "not json", content_type="application/json")
+        assert response.status_code == 400
+
+    def test_results_in_order(self, voter, comments):
+        client = Client()
+        client.force_login(voter)
+
+        response = post(client, [{"id": c.id, "value": 1} for c in comments] + [{"id": comments[0].id, "value": 2}])
+
+        content = json.loads(response.content)
+        assert content["error"] is None
+        assert [r["id"] for r in content["results"]] == [c.id for c in comments] + [comments[0].id]
+        assert [r["voteDiff"] for r in content["results"]] == [1] * 5 + [0]
+        assert content["results"][-1]["error"] is not None
+        assert Vote.objects.filter(user=voter, value=1).count() == 5
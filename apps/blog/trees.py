@@ -0,0 +1,183 @@
+"""
+Checking and repairing the MPTT columns of comment trees one tree at a time.
+
+mptt's ``rebuild()`` rewrites every row of the Comment table in one go.
+Every top level comment roots its own tree (``tree_id``), so damage is
+local: :func:`corrupted_trees` finds the broken trees of a ``tree_id``
+range with two set-based queries, and :func:`rebuild_tree` recomputes
+``lft``/``rght``/``level``/``tree_id`` of one tree from its ``parent``
+links, writing only the rows whose values change.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+
+from .models import Comment
+from .utils.thread import invalidate_thread
+
+BATCH_SIZE = 1000
+
+
+def _span():
+    """:return: Expression counting the nodes inside the outer node's (lft, rght) interval, the node included."""
+    nodes = (
+        Comment.objects.filter(tree_id=OuterRef("tree_id"), lft__gte=OuterRef("lft"), lft__lt=OuterRef("rght"))
+        .order_by()
+        .values("tree_id")
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    return Subquery(nodes)
+
+
+def corrupted_trees(tree_ids):
+    """
+    Find the trees whose MPTT columns do not match their parent links.
+
+    A tree is valid when it has a single root spanning ``1 .. 2 * size``,
+    no two nodes share a bound, every node lies strictly inside its parent, one level below it and in
+    the same tree, and every node's interval holds exactly its subtree,
+    i.e. ``(rght - lft + 1) / 2`` nodes.
+
+    :param tree_ids: Range or collection of tree ids to check
+    :type tree_ids: range | Iterable[int]
+    :return: Sorted ids of the corrupted trees
+    :rtype: list[int]
+    """
+
+    if isinstance(tree_ids, range):
+        comments = Comment.objects.filter(tree_id__gte=tree_ids.start, tree_id__lt=tree_ids.stop)
+    else:
+        comments = Comment.objects.filter(tree_id__in=list(tree_ids))
+    comments = comments.order_by()
+
+    bad_trees = (
+        comments.values("tree_id")
+        .annotate(
+            size=Count("pk"),
+            roots=Count("pk", filter=Q(parent__isnull=True)),
+            lefts=Count("lft", distinct=True),
+            rights=Count("rght", distinct=True),
+            right=Max("rght"),
+        )
+        .filter(~Q(roots=1) | ~Q(lefts=F("size")) | ~Q(rights=F("size")) | ~Q(right=F("size") * 2))
+        .values_list("tree_id", flat=True)
+    )
+
+    bad_root = Q(parent__isnull=True) & (~Q(lft=1) | ~Q(level=0))
+    bad_child = Q(parent__isnull=False) & (
+        ~Q(parent__tree_id=F("tree_id"))
+        | Q(lft__lte=F("parent__lft"))
+        | Q(rght__gte=F("parent__rght"))
+        | ~Q(level=F("parent__level") + 1)
+    )
+    bad_nodes = (
+        comments.annotate(span=_span())
+        .filter(Q(lft__gte=F("rght")) | ~Q(rght=F("lft") + F("span") * 2 - 1) | bad_root | bad_child)
+        .values_list("tree_id", "parent__tree_id")
+    )
+
+    corrupted = set(bad_trees)
+    for tree_id, parent_tree_id in bad_nodes:
+        # A node filed under another tree than its parent breaks both.
+        corrupted.add(tree_id)
+        if parent_tree_id is not None:
+            corrupted.add(parent_tree_id)
+    return sorted(corrupted)
+
+
+def _layout(root_id, tree_id, children, updates):
+    """Assign nested set values to the subtree of ``root_id`` iteratively, depth first."""
+    counter = 1
+    lft = {root_id: counter}
+    stack = [(root_id, 0, iter(children[root_id]))]
+    while stack:
+        node_id, level, remaining = stack[-1]
+        child = next(remaining, None)
+        counter += 1
+        if child is None:
+            stack.pop()
+            updates[node_id] = (lft[node_id], counter, level, tree_id)
+        else:
+            lft[child] = counter
+            stack.append((child, level + 1, iter(children[child])))
+
+
+def rebuild_tree(tree_id, batch_size=BATCH_SIZE):
+    """
+    Recompute the MPTT columns of one tree from its parent links.
+
+    Siblings are ordered by descending score, as on insertion. The
+    comments of the tree's submission are locked while the tree is
+    rewritten, so no reply lands in it half way. A tree with more than one
+    root keeps its id for the oldest root, the others get new trees.
+
+    :param tree_id: Tree to rebuild
+    :type tree_id: int
+    :param batch_size: Rows per UPDATE
+    :type batch_size: int
+    :return: Number of comments whose columns changed
+    :rtype: int
+    """
+
+    with transaction.atomic():
+        roots = list(
+            Comment.objects.filter(tree_id=tree_id, parent__isnull=True)
+            .order_by("pk")
+            .values_list("pk", "submission_id")
+        )
+        if not roots:
+            return 0
+        submission_ids = {submission_id for _, submission_id in roots}
+        rows = list(
+            Comment.objects.select_for_update()
+            .filter(Q(tree_id=tree_id) | Q(submission_id__in=submission_ids - {None}))
+            .order_by("-score", "pk")
+            .values_list("pk", "parent_id", "lft", "rght", "level", "tree_id")
+        )
+
+        children = defaultdict(list)
+        current = {}
+        for pk, parent_id, *columns in rows:
+            children[parent_id].append(pk)
+            current[pk] = tuple(columns)
+
+        updates = {}
+        _layout(roots[0][0], tree_id, children, updates)
+        if len(roots) > 1:
+            next_tree_id = Comment.objects._get_next_tree_id()
+            for index, (root_id, _) in enumerate(roots[1:]):
+                _layout(root_id, next_tree_id + index, children, updates)
+
+        changed = [
+            Comment(pk=pk, lft=lft, rght=rght, level=level, tree_id=new_tree_id)
+            for pk, (lft, rght, level, new_tree_id) in updates.items()
+            if current[pk] != (lft, rght, level, new_tree_id)
+        ]
+        Comment.objects.bulk_update(changed, ["lft", "rght", "level", "tree_id"], batch_size=batch_size)
+
+    for submission_id in submission_ids - {None}:
+        invalidate_thread(submission_id)
+    return len(changed)
+
+
+def check_trees(batch_size=BATCH_SIZE, start_id=0):
+    """
+    Find corrupted trees across the whole table, ``batch_size`` tree ids at a time.
+
+    :param batch_size: Number of tree ids checked per query
+    :type batch_size: int
+    :param start_id: Tree id to start from, to resume an interrupted run
+    :type start_id: int
+    :return: Yields (last tree id of the range, corrupted tree ids) after every batch
+    :rtype: Iterator[tuple[int, list[int]]]
+    """
+
+    max_id = Comment.objects.aggregate(m=Max("tree_id"))["m"] or 0
+    low = start_id
+    while low <= max_id:
+        high = low + batch_size
+        yield high - 1, corrupted_trees(range(low, high))
+        low = high
@@ -5,10 +5,16 @@ from . import views
 app_name = "apps.blog"
 urlpatterns = [
     re_path(r"^comments/(?P<thread_id>[0-9]+)$", views.comments, name="post"),
+    re_path(r"^comments/(?P<thread_id>[0-9]+)/votes/$", views.comment_votes, name="comment_votes"),
     re_path(r"^comments/(?P<thread_id>[0-9]+)/edit/$", views.update_submission, name="update_post"),
     re_path(r"^comments/(?P<thread_id>[0-9]+)/delete/$", views.delete_submission, name="delete_post"),
     re_path(r"^submit/$", views.submit, name="submit"),
     re_path(r"^post/comment/$", views.post_comment, name="post_comment"),
+    re_path(r"^comment/(?P<comment_id>[0-9]+)/source/$", views.comment_source, name="comment_source"),
+    re_path(r"^comment/(?P<comment_id>[0-9]+)/edit/$", views.update_comment, name="edit_comment"),
+    re_path(r"^comment/(?P<comment_id>[0-9]+)/delete/$", views.remove_comment, name="delete_comment"),
     re_path(r"^vote/$", views.vote, name="vote"),
+    re_path(r"^vote/batch/$", views.vote_batch, name="vote_batch"),
+    re_path(r"^inbox/$", views.inbox, name="inbox"),
     path("about/", views.about, name="about"),
 ]
@@ -0,0 +1,29 @@
+"""
+Submissions served from the object cache, see apps.perf.objects.
+"""
+
+from apps.blog.models import Submission
+from apps.perf.objects import ObjectCache
+from apps.user.utils.objects import users
+
+submissions = ObjectCache(Submission)
+
+
+def get_submission(pk):
+    """
+    The visible submission ``pk`` with its author, both from the object
+    cache. The author is looked up on its own rather than cached with
+    the submission, changes to the account need not drop its submissions.
+
+    :param pk: Submission ID
+    :type pk: int
+    :return: The submission, None if there is none or it is deleted
+    :rtype: Submission | None
+    """
+
+    submission = submissions.get(pk)
+    if submission is None or submission.deleted:
+        return None
+    if submission.author_id:
+        Submission.author.field.set_cached_value(submission, users.get(submission.author_id))
+    return submission
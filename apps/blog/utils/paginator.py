@@ -0,0 +1,94 @@
+"""
+Pagination over tables too large for an exact COUNT(*) on every request.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_table_rows(model, using="default"):
+    """
+    Row count of the model's table according to the Postgres planner
+    statistics, without scanning the table.
+
+    :return: Estimated number of rows, None if unavailable (other databases
+             or a table that has never been analysed)
+    :rtype: int | None
+    """
+
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    if not row or row[0] < 0:
+        return None
+    return row[0]
+
+
+def estimate_query_rows(queryset):
+    """
+    Number of rows the Postgres planner expects ``queryset`` to return,
+    read from EXPLAIN without executing the query.
+
+    :return: Estimated number of rows, None on other databases
+    :rtype: int | None
+    """
+
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids exact COUNT(*) queries on large tables.
+
+    Unfiltered querysets are sized from the table statistics, filtered ones
+    from the query plan. Once the estimate is above ``threshold`` it is used
+    as the count; below it the exact count is run and cached for
+    ``cache_timeout`` seconds. On databases without planner estimates
+    (SQLite) it degrades to a cached exact count.
+    """
+
+    threshold = getattr(settings, "PAGINATOR_ESTIMATE_THRESHOLD", 10000)
+    cache_timeout = getattr(settings, "PAGINATOR_COUNT_CACHE_TIMEOUT", 60)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        estimate = self.estimate(queryset)
+        if estimate is not None and estimate > self.threshold:
+            self.estimated = True
+            return estimate
+        return self.cached_count(queryset)
+
+    def estimate(self, queryset):
+        if not queryset.query.where:
+            return estimate_table_rows(queryset.model, queryset.db)
+        return estimate_query_rows(queryset)
+
+    def cached_count(self, queryset):
+        if not self.cache_timeout:
+            return queryset.count()
+        key = "paginator-count:" + hashlib.md5(str(queryset.order_by().query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.cache_timeout)
+        return count
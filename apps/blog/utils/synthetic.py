@@ -0,0 +1,92 @@
+"""
+In-memory comment trees with valid MPTT numbering, for benchmarks and
+data generation without going through Comment.create one node at a time.
+"""
+import random
+from collections import namedtuple
+
+TreeRow = namedtuple("TreeRow", ["id", "parent_id", "tree_id", "lft", "rght", "level"])
+
+
+def random_parents(size, max_depth=8, root_ratio=0.1, rng=None):
+    """
+    Pick a parent for each of ``size`` nodes; node ``i`` can only hang off
+    an earlier node, so the result is always a forest.
+
+    :param size: Number of nodes
+    :param max_depth: Deepest level a node may be placed at (roots are level 0)
+    :param root_ratio: Probability that a node starts a new top-level thread
+    :param rng: random.Random instance, for reproducible shapes
+    :return: Parent index (or None for roots) per node
+    :rtype: list[int | None]
+    """
+
+    rng = rng or random.Random(0)
+    parents = []
+    levels = []
+    eligible = []  # nodes that may still receive children
+    for i in range(size):
+        if not eligible or rng.random() < root_ratio:
+            parent, level = None, 0
+        else:
+            parent = eligible[rng.randrange(len(eligible))]
+            level = levels[parent] + 1
+        parents.append(parent)
+        levels.append(level)
+        if level < max_depth:
+            eligible.append(i)
+    return parents
+
+
+def number_forest(parents, first_id=1, first_tree_id=1):
+    """
+    Compute MPTT columns for a forest given as a parent index per node.
+
+    The traversal is iterative, so arbitrarily deep chains are fine.
+
+    :param parents: Parent index (or None for roots) per node, parents before children
+    :param first_id: Primary key assigned to node 0, the others follow consecutively
+    :param first_tree_id: tree_id of the first root
+    :return: Rows in depth-first (tree_id, lft) order
+    :rtype: list[TreeRow]
+    """
+
+    children = [[] for _ in parents]
+    roots = []
+    for i, parent in enumerate(parents):
+        (roots if parent is None else children[parent]).append(i)
+
+    rows = []
+    for tree_offset, root in enumerate(roots):
+        tree_id = first_tree_id + tree_offset
+        counter = 1
+        # Stack of (node, level, position of its row in ``rows``)
+        stack = [(root, 0, None)]
+        while stack:
+            node, level, index = stack.pop()
+            if index is not None:
+                row = rows[index]
+                rows[index] = row._replace(rght=counter)
+                counter += 1
+                continue
+            parent = parents[node]
+            rows.append(
+                TreeRow(
+                    id=first_id + node,
+                    parent_id=None if parent is None else first_id + parent,
+                    tree_id=tree_id,
+                    lft=counter,
+                    rght=None,
+                    level=level,
+                )
+            )
+            counter += 1
+            stack.append((node, level, len(rows) - 1))
+            for child in reversed(children[node]):
+                stack.append((child, level + 1, None))
+    return rows
+
+
+def synthetic_thread(size, max_depth=8, root_ratio=0.1, seed=0):
+    """:return: MPTT rows of a random comment forest of ``size`` nodes"""
+    return number_forest(random_parents(size, max_depth, root_ratio, random.Random(seed)))
@@ -0,0 +1,168 @@
+"""
+Read path for rendering comment threads.
+
+A full Comment instance carries a model state, every MPTT column and the
+mixins' machinery; the renderer only needs a handful of columns. Threads
+are therefore read with ``values_list`` into compact ``__slots__`` records.
+
+The rendered thread is the same for every reader, so its HTML is cached
+per submission under a version that is replaced whenever a comment of the
+submission is saved or deleted. A reader's own votes, which only colour
+the arrows, are served separately by ``user_votes``, also cached.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, CharField, F, Q, When
+
+from apps.blog.models import Comment, Vote
+from apps.blog.templatetags.comment_tree import render_comment_tree
+
+# Authors whose account is being deleted (see apps.user.deletion) read as no author at once.
+_LIVE_AUTHOR = Q(author__deleted_at__isnull=True)
+ANNOTATIONS = {
+    "live_author_id": Case(When(_LIVE_AUTHOR, then=F("author_id")), output_field=BigIntegerField()),
+    "live_author_name": Case(When(_LIVE_AUTHOR, then=F("author__username")), output_field=CharField()),
+}
+
+COLUMNS = (
+    "id",
+    "parent_id",
+    "submission_id",
+    "live_author_id",
+    "live_author_name",
+    "score",
+    "timestamp",
+    "content",
+    "edited",
+    "deleted",
+)
+
+DELETED_CONTENT = "[deleted]"
+
+
+class CommentNode:
+    """A comment as needed by the thread templates, linked to its parent by id."""
+
+    __slots__ = (
+        "id",
+        "parent_id",
+        "submission_id",
+        "author_id",
+        "author_name",
+        "score",
+        "timestamp",
+        "content",
+        "edited",
+        "deleted",
+    )
+
+    def __init__(
+        self, id, parent_id, submission_id, author_id, author_name, score, timestamp, content, edited, deleted
+    ):
+        self.id = id
+        self.parent_id = parent_id
+        self.submission_id = submission_id
+        self.author_id = author_id
+        # Same fallback as AuthornameField.author_name
+        self.author_name = author_name if author_id else "deleted user"
+        self.score = score
+        self.timestamp = timestamp
+        # Deleted comments stay in the tree as tombstones, see apps.blog.editing.
+        self.content = DELETED_CONTENT if deleted else content
+        self.edited = edited
+        self.deleted = deleted
+
+    def __repr__(self):
+        return "<CommentNode:{}>".format(self.id)
+
+
+def thread_nodes(queryset):
+    """
+    Fetch the comments of ``queryset`` in tree order as CommentNode records.
+
+    :param queryset: Comment queryset, e.g. filtered by submission or a subtree
+    :type queryset: QuerySet
+    :return: Nodes in depth-first (tree_id, lft) order
+    :rtype: list[CommentNode]
+    """
+
+    rows = queryset.annotate(**ANNOTATIONS).order_by("tree_id", "lft").values_list(*COLUMNS)
+    return [CommentNode(*row) for row in rows]
+
+
+def _version_key(submission_id):
+    return "thread-version:{}".format(submission_id)
+
+
+def _votes_key(user_id, submission_id):
+    return "thread-votes:{}:{}".format(user_id, submission_id)
+
+
+def thread_version(submission_id):
+    """:return: Current version of the submission's cached thread HTML"""
+
+    key = _version_key(submission_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh version even after eviction, so no stale HTML is picked up again.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_thread(submission_id):
+    """Retire the cached thread HTML of a submission once the transaction commits."""
+
+    transaction.on_commit(lambda: cache.set(_version_key(submission_id), time.time_ns(), None))
+
+
+def thread_html(submission, focus=None):
+    """
+    Render the submission's comment thread, or the subthread starting at
+    ``focus``, without any reader specific state.
+
+    :param submission: Submission whose comments are rendered
+    :type submission: Submission
+    :param focus: Comment whose subthread is rendered instead of the whole thread
+    :type focus: Comment
+    :rtype: SafeString
+    """
+
+    max_depth = getattr(settings, "COMMENT_TREE_MAX_DEPTH", None)
+    key = "thread-html:{}:{}:{}:{}".format(
+        submission.pk, thread_version(submission.pk), focus.pk if focus else "", max_depth
+    )
+    html = cache.get(key)
+    if html is None:
+        queryset = focus.get_descendants(include_self=True) if focus else Comment.objects.filter(submission=submission)
+        html = render_comment_tree(thread_nodes(queryset), max_depth=max_depth)
+        cache.set(key, html, settings.THREAD_CACHE_TIMEOUT)
+    return html
+
+
+def user_votes(user_id, submission_id):
+    """
+    :return: {comment id: vote value} of the user's votes in the submission's thread
+    :rtype: dict
+    """
+
+    key = _votes_key(user_id, submission_id)
+    votes = cache.get(key)
+    if votes is None:
+        votes = dict(
+            Vote.objects.filter(user_id=user_id, submission_id=submission_id, comment__isnull=False)
+            .exclude(value=0)
+            .values_list("comment_id", "value")
+        )
+        cache.set(key, votes, settings.THREAD_VOTES_CACHE_TIMEOUT)
+    return votes
+
+
+def invalidate_user_votes(user_id, submission_id):
+    """Drop the cached votes of a user in a thread once the transaction commits."""
+
+    transaction.on_commit(lambda: cache.delete(_votes_key(user_id, submission_id)))
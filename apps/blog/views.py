@@ -1,16 +1,24 @@
+import json
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.http import JsonResponse, HttpResponseBadRequest, Http404, HttpResponseForbidden, HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404, reverse
 from django.template.defaulttags import register
 from django.utils import timezone
+from django.views.decorators.cache import cache_control
 
+from .editing import delete_comment, edit_comment
 from .forms import SubmissionForm
 from .models import Submission, Comment, Vote
+from .notifications import inbox_page, mark_read
+from .purge import soft_delete_submission
+from .utils.objects import get_submission
+from .utils.paginator import EstimatedCountPaginator
+from .utils.thread import thread_html, user_votes
+from .votes import MAX_BATCH, apply_votes
 from apps.user.utils.helpers import post_only
-from apps.user.models import User
 
 
 @register.filter
@@ -36,11 +44,13 @@ def get_obj_attr(obj, attr):
 def frontpage(request):
     """
     Serves frontpage and all additional submission listings
-    with maximum of 25 submissions per page.
+    with maximum of 25 submissions per page. The number of pages
+    comes from an estimated or cached count, never a COUNT(*)
+    per request.
     """
 
-    all_submissions = Submission.objects.order_by("-timestamp").all()
-    paginator = Paginator(all_submissions, 25)
+    all_submissions = Submission.objects.visible().order_by("-timestamp")
+    paginator = EstimatedCountPaginator(all_submissions, 25)
 
     page = request.GET.get("page", 1)
     try:
@@ -65,54 +75,53 @@ def about(request):
 def comments(request, thread_id):
     """
     Handles comment view when user opens the thread.
-    On top of serving all comments in the thread it will
-    also return all votes user made in that thread
-    so that we can easily update comments in template
-    and display via css whether user voted or not.
+    The thread itself is rendered from the shared cache, the
+    user's votes are fetched by the page from ``comment_votes``.
+
+    With the ``comment`` GET parameter only that comment and
+    its replies are served ("continue this thread" links).
 
     :param thread_id: Thread ID as it's stored in database
     :type thread_id: int
     """
 
-    this_submission = get_object_or_404(Submission, id=thread_id)
-    thread_comments = Comment.objects.filter(submission=this_submission)
-    print(
-        f"\n\nthis_submission.modified = {this_submission.modified}\n\nthis_submission.updated = {this_submission.updated}\n\n"
-    )
-    if request.user.is_authenticated:
-        try:
-            user = request.user
-        except User.DoesNotExist:
-            user = None
-    else:
-        user = None
-
-    if user:
-        if request.method == "POST" and this_submission.author == user:
-            pass
-
-    comment_votes = {}
-
-    if user:
-        try:
-            user_thread_votes = Vote.objects.filter(user=user, submission=this_submission)
+    this_submission = get_submission(thread_id)
+    if this_submission is None:
+        raise Http404
 
-            for vote in user_thread_votes:
-                comment_votes[vote.comment.id] = vote.value  # according to vote value, we change the color of arrows
-        except:
-            pass
+    focus = request.GET.get("comment")
+    focus_comment = None
+    if focus:
+        if not focus.isdigit():
+            raise Http404
+        focus_comment = get_object_or_404(Comment, id=focus, submission=this_submission)
 
     return render(
         request,
         "comments.html",
         {
             "submission": this_submission,
-            "comments": thread_comments,
-            "comment_votes": comment_votes,
+            "thread_html": thread_html(this_submission, focus_comment),
+            "focus": focus,
         },
     )
 
 
+@cache_control(private=True, max_age=0)
+def comment_votes(request, thread_id):
+    """
+    The user's votes in a thread as ``{comment id: value}``, kept out of
+    the thread HTML so that it is the same for every reader.
+
+    :param thread_id: Thread ID as it's stored in database
+    :type thread_id: int
+    """
+
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden()
+    return JsonResponse(user_votes(request.user.pk, int(thread_id)))
+
+
 @post_only
 def post_comment(request):
     if not request.user.is_authenticated:
@@ -131,9 +140,12 @@ def post_comment(request):
     parent_object = None
     try:  # try and get comment or submission we're voting on
         if parent_type == "comment":
-            parent_object = Comment.objects.get(id=parent_id)
+            # Not cached: inserting the reply needs the parent's current tree columns.
+            parent_object = Comment.objects.get(id=parent_id, deleted=False, submission__deleted=False)
         elif parent_type == "submission":
-            parent_object = Submission.objects.get(id=parent_id)
+            parent_object = get_submission(int(parent_id))
+            if parent_object is None:
+                raise Submission.DoesNotExist
 
     except (Comment.DoesNotExist, Submission.DoesNotExist):
         return HttpResponseBadRequest()
@@ -144,6 +156,68 @@ def post_comment(request):
     return JsonResponse({"msg": "Your comment has been posted."})
 
 
+def _own_comment(request, comment_id):
+    """
+    :return: The live comment with id ``comment_id`` if the current user wrote it,
+             otherwise the response to send instead
+    """
+
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden()
+    comment = Comment.objects.filter(id=comment_id, deleted=False, submission__deleted=False).first()
+    if comment is None:
+        return HttpResponseBadRequest()
+    if comment.author_id != request.user.id:
+        return HttpResponseForbidden()
+    return comment
+
+
+@cache_control(private=True, max_age=0)
+def comment_source(request, comment_id):
+    """
+    The raw content of the user's own comment as ``{"content"}``, to fill
+    the edit form: the thread HTML only has it rendered.
+    """
+
+    comment = _own_comment(request, comment_id)
+    if isinstance(comment, HttpResponse):
+        return comment
+    return JsonResponse({"content": comment.content})
+
+
+@post_only
+def update_comment(request, comment_id):
+    """
+    Handles editing of a comment by its author.
+    """
+
+    comment = _own_comment(request, comment_id)
+    if isinstance(comment, HttpResponse):
+        return comment
+
+    content = request.POST.get("content", None)
+    if not content:
+        return JsonResponse({"msg": "You have to write something."})
+
+    if not edit_comment(comment, content):
+        return HttpResponseBadRequest()
+    return JsonResponse({"msg": "Your comment has been edited."})
+
+
+@post_only
+def remove_comment(request, comment_id):
+    """
+    Handles deletion of a comment by its author, its replies stay.
+    """
+
+    comment = _own_comment(request, comment_id)
+    if isinstance(comment, HttpResponse):
+        return comment
+
+    delete_comment(comment)
+    return JsonResponse({"msg": "Your comment has been deleted."})
+
+
 @post_only
 def vote(request):
     vote_object_id = request.POST.get("what_id", None)
@@ -165,7 +239,10 @@ def vote(request):
     if not all([vote_object_id, new_vote_value]):
         return HttpResponseBadRequest("Not all values were provided!")
 
-    comment = Comment.objects.get(id=vote_object_id)
+    # Tombstones can not be voted on.
+    comment = Comment.objects.filter(id=vote_object_id, deleted=False).first() if vote_object_id.isdigit() else None
+    if comment is None:
+        return HttpResponseBadRequest("No such comment!")
     if request.user == comment.author:
         return JsonResponse({"error": "error"})  # Can't vote on your own comment
 
@@ -184,11 +261,11 @@ def vote(request):
 
     # Try and get the existing vote for this object, if it exists.
     try:
-        vote = Vote.objects.get(comment=Comment.objects.get(id=vote_object_id), user=user)
+        vote = Vote.objects.get(comment=comment, user=user)
 
     except Vote.DoesNotExist:
         # Create a new vote and that's it.
-        vote = Vote.create(user=user, comment=Comment.objects.get(id=vote_object_id), vote_value=new_vote_value)
+        vote = Vote.create(user=user, comment=comment, vote_value=new_vote_value)
         vote.save()
         vote_diff = new_vote_value
         return JsonResponse({"error": None, "voteDiff": vote_diff})
@@ -209,6 +286,53 @@ def vote(request):
     return JsonResponse({"error": None, "voteDiff": vote_diff})
 
 
+@post_only
+def vote_batch(request):
+    """
+    Applies a batch of votes sent as JSON: ``{"votes": [{"id": <comment id>, "value": 1 or -1}, ...]}``.
+
+    Votes are applied in order, so the same comment may appear more than once
+    (a vote and its cancellation). Answers with one ``{"id", "voteDiff", "error"}``
+    per vote, in the same order.
+    """
+
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden()
+
+    try:
+        votes = json.loads(request.body)["votes"]
+        operations = [(int(item["id"]), int(item["value"])) for item in votes]
+    except (ValueError, KeyError, TypeError):
+        return HttpResponseBadRequest("Votes must be a list of objects with an id and a value!")
+    if not operations or len(operations) > MAX_BATCH:
+        return HttpResponseBadRequest("Between 1 and {} votes can be sent at once!".format(MAX_BATCH))
+
+    return JsonResponse({"error": None, "results": apply_votes(request.user, operations)})
+
+
+@login_required(login_url="/login/")
+def inbox(request):
+    """
+    Replies to the user's comments and submissions, newest first, paginated
+    with the ``before`` GET parameter. Shown notifications are marked read.
+    """
+
+    before = request.GET.get("before")
+    if before is not None and not before.isdigit():
+        raise Http404
+
+    notifications, next_before = inbox_page(request.user, before=int(before) if before else None)
+    # Rendered as they were, so the new ones still stand out on this visit.
+    unread = {n.pk for n in notifications if not n.read}
+    mark_read(request.user, notifications)
+
+    return render(
+        request,
+        "inbox.html",
+        {"notifications": notifications, "unread": unread, "next_before": next_before},
+    )
+
+
 @login_required(login_url="/login/")
 def submit(request):
     """
@@ -239,7 +363,9 @@ def update_submission(request, thread_id):
     Handles update of submission.
     """
 
-    submission = get_object_or_404(Submission, id=thread_id)
+    submission = get_submission(thread_id)
+    if submission is None:
+        raise Http404
 
     if request.user != submission.author:
         return HttpResponseForbidden()
@@ -252,7 +378,9 @@ def update_submission(request, thread_id):
             submission = submission_form.save(commit=False)
             submission.modified = True
             submission.updated = timezone.now()
-            submission.save()
+            # The instance comes from the object cache and may be stale: counters and
+            # the deleted flag written since must not be overwritten.
+            submission.save(update_fields=["title", "content", "modified", "updated"])
             messages.success(request, "Submission updated")
             return redirect("/blog/comments/{}".format(submission.id))
 
@@ -265,7 +393,9 @@ def delete_submission(request, thread_id):
     Handles deletion of submission.
     """
 
-    submission = get_object_or_404(Submission, id=thread_id)
+    submission = get_submission(thread_id)
+    if submission is None:
+        raise Http404
 
     if not request.user.is_authenticated:
         return redirect("/login/?next=" + reverse("apps.blog:delete_post", args=(thread_id,)))
@@ -273,6 +403,7 @@ def delete_submission(request, thread_id):
     if request.user != submission.author:
         return HttpResponseForbidden()
 
-    submission.delete()
+    # Hidden now, the thread is purged in batches by a background job.
+    soft_delete_submission(submission)
     messages.success(request, "Submission deleted")
     return redirect("frontpage")
@@ -0,0 +1,119 @@
+"""
+Set-based application of a batch of votes by one user.
+
+Clicking the same arrow twice cancels the vote, clicking the other arrow
+flips it, exactly as with the single ``vote`` view. A batch is applied
+with a fixed number of queries whatever its size: one SELECT each for
+the comments and the user's existing votes, one INSERT for new votes,
+one UPDATE for changed votes and one for the comments' counters. Karma
+is queued for the batch ``user.adjust_karma`` job.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from apps.jobs.queue import enqueue_many
+from apps.perf.metrics import registry
+
+from .models import Comment, Vote
+from .utils.thread import invalidate_thread, invalidate_user_votes
+
+MAX_BATCH = 100
+
+NOT_FOUND = "not found"
+OWN_COMMENT = "own comment"
+BAD_VALUE = "bad value"
+
+
+def next_value(old, value):
+    """:return: The vote after clicking ``value`` (1 or -1) on a vote of ``old``"""
+
+    return 0 if old == value else value
+
+
+def _case(deltas, field):
+    """``field`` plus the delta of each comment id in ``deltas``."""
+
+    whens = [When(pk=pk, then=Value(delta)) for pk, delta in deltas.items() if delta]
+    return F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+
+
+def apply_votes(user, operations):
+    """
+    Apply ``(comment id, value)`` operations in order, in one transaction.
+
+    :param user: Voting user
+    :type user: User
+    :param operations: Comment ids and vote values (1 or -1), a comment may appear more than once
+    :type operations: list[tuple[int, int]]
+    :return: One ``{"id", "voteDiff", "error"}`` dict per operation, in order
+    :rtype: list[dict]
+    """
+
+    ids = {pk for pk, _ in operations}
+    with transaction.atomic():
+        # Locking the comments serialises concurrent batches of the same user on a comment, so
+        # no vote row is created twice. Comment rows before user rows, the order posting a
+        # comment takes them in (tree columns, then the author's counter): no deadlock.
+        comments, submissions = {}, {}
+        for pk, author_id, submission_id in (
+            Comment.objects.select_for_update(of=("self",))
+            .filter(pk__in=ids, deleted=False, submission__deleted=False)
+            .order_by("pk")
+            .values_list("pk", "author_id", "submission_id")
+        ):
+            comments[pk] = author_id
+            submissions[pk] = submission_id
+        votes = {}
+        for vote in Vote.objects.filter(user=user, comment_id__in=comments).order_by("pk"):
+            votes.setdefault(vote.comment_id, vote)
+
+        current = {pk: vote.value for pk, vote in votes.items()}
+        score, ups, downs, karma = Counter(), Counter(), Counter(), Counter()
+        results = []
+        for pk, value in operations:
+            if value not in (1, -1):
+                results.append({"id": pk, "voteDiff": 0, "error": BAD_VALUE})
+                continue
+            if pk not in comments:
+                results.append({"id": pk, "voteDiff": 0, "error": NOT_FOUND})
+                continue
+            if comments[pk] == user.pk:
+                results.append({"id": pk, "voteDiff": 0, "error": OWN_COMMENT})
+                continue
+            old = current.get(pk, 0)
+            new = next_value(old, value)
+            current[pk] = new
+            score[pk] += new - old
+            ups[pk] += (new == 1) - (old == 1)
+            downs[pk] += (new == -1) - (old == -1)
+            if comments[pk]:
+                karma[comments[pk]] += new - old
+            results.append({"id": pk, "voteDiff": new - old, "error": None})
+
+        # A vote cancelled again within the batch still leaves a row, as with two single clicks.
+        changed = [pk for pk in current if pk not in votes or votes[pk].value != current[pk]]
+        if not changed:
+            return results
+
+        created = [pk for pk in changed if pk not in votes]
+        Vote.objects.bulk_create(
+            [Vote(user=user, comment_id=pk, submission_id=submissions[pk], value=current[pk]) for pk in created]
+        )
+        updated = {votes[pk].pk: current[pk] for pk in changed if pk in votes}
+        if updated:
+            Vote.objects.filter(pk__in=updated).update(
+                value=Case(*[When(pk=pk, then=Value(v)) for pk, v in updated.items()], output_field=IntegerField())
+            )
+        Comment.objects.filter(pk__in=changed).update(
+            score=_case(score, "score"), ups=_case(ups, "ups"), downs=_case(downs, "downs")
+        )
+        for submission_id in {submissions[pk] for pk in changed}:
+            invalidate_thread(submission_id)
+            invalidate_user_votes(user.pk, submission_id)
+        enqueue_many("user.adjust_karma", [{"user_id": pk, "delta": d} for pk, d in karma.items() if d])
+        registry.inc("blog_writes_total", len(created) + len(updated), model="vote")
+
+    return results
@@ -0,0 +1,14 @@
+import pytest
+from django.core.cache import cache
+
+from apps.perf.objects import clear_local
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached counts and fragments must not leak from one test into the next."""
+    cache.clear()
+    clear_local()
+    yield
+    cache.clear()
+    clear_local()
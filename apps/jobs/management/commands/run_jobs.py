@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs import queue
+
+
+class Command(BaseCommand):
+    help = "Run the background job worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Jobs claimed per transaction.")
+        parser.add_argument("--idle-timeout", type=int, default=5, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--burst", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument(
+            "--prune-days", type=int, default=None, help="Delete done and failed jobs older than this many days first."
+        )
+
+    def handle(self, *args, **options):
+        if options["prune_days"] is not None:
+            deleted = queue.prune(timedelta(days=options["prune_days"]))
+            self.stdout.write("Pruned {} finished jobs".format(deleted))
+
+        self.stdout.write("Worker started")
+        try:
+            queue.work(
+                batch_size=options["batch_size"],
+                idle_timeout=options["idle_timeout"],
+                burst=options["burst"],
+            )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write("Worker stopped")
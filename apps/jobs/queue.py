@@ -0,0 +1,187 @@
+import logging
+import traceback
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_handler
+from .transports import get_transport
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(name, payload=None, key=None, delay=0):
+    """
+    Queue a job to be run by the worker after the current transaction commits.
+
+    :param name: Name of a registered job handler
+    :type name: str
+    :param payload: JSON serialisable arguments for the handler
+    :type payload: dict
+    :param key: Optional idempotency key, enqueueing the same key twice is a no-op
+    :type key: str
+    :param delay: Seconds to wait before the job becomes due
+    :type delay: int
+    """
+
+    enqueue_many(name, [payload or {}], keys=[key], delay=delay)
+
+
+def enqueue_many(name, payloads, keys=None, delay=0):
+    """
+    Queue many jobs of the same kind with a single INSERT.
+
+    :param name: Name of a registered job handler
+    :type name: str
+    :param payloads: List of JSON serialisable payloads
+    :type payloads: list[dict]
+    :param keys: Optional idempotency keys, one per payload
+    :type keys: list[str | None]
+    :param delay: Seconds to wait before the jobs become due
+    :type delay: int
+    """
+
+    handler = get_handler(name)
+    keys = keys or [None] * len(payloads)
+
+    if getattr(settings, "JOBS_ALWAYS_EAGER", False):
+        # Development and tests: no worker, run the handler right away.
+        if handler.batch:
+            handler.func(list(payloads))
+        else:
+            for payload in payloads:
+                handler.func(payload)
+        return
+
+    run_at = timezone.now() + timedelta(seconds=delay)
+    Job.objects.bulk_create(
+        [
+            Job(name=name, payload=payload, key=key, run_at=run_at, max_attempts=handler.max_attempts)
+            for payload, key in zip(payloads, keys)
+        ],
+        ignore_conflicts=any(keys),
+    )
+    transaction.on_commit(get_transport().notify)
+
+
+def run_pending(batch_size=100):
+    """
+    Claim up to ``batch_size`` due jobs and run them.
+
+    Jobs are claimed with SKIP LOCKED in a short transaction of their own,
+    which counts the attempt and moves ``run_at`` past ``JOBS_LEASE``: other
+    workers skip them from then on, and the jobs of a worker that dies
+    mid-batch become due again once the lease runs out. Each handler call
+    then runs in its own transaction, its side effects and the job's status
+    change commit together, so no lock is held across the whole batch.
+
+    :return: Number of jobs processed
+    :rtype: int
+    """
+
+    jobs = _claim(batch_size)
+    jobs.sort(key=lambda j: j.name)
+
+    for name, group in groupby(jobs, key=lambda j: j.name):
+        group = list(group)
+        try:
+            handler = get_handler(name)
+        except LookupError as e:
+            with transaction.atomic():
+                _fail(group, e, retry=False)
+            continue
+
+        if handler.batch:
+            _execute(handler.func, [j.payload for j in group], group)
+        else:
+            for j in group:
+                _execute(handler.func, j.payload, [j])
+
+    return len(jobs)
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by("run_at", "id")[:batch_size]
+        )
+        run_at = now + timedelta(seconds=getattr(settings, "JOBS_LEASE", 300))
+        Job.objects.filter(pk__in=[j.pk for j in jobs]).update(attempts=F("attempts") + 1, run_at=run_at)
+    for j in jobs:
+        j.attempts += 1
+        j.run_at = run_at
+    return jobs
+
+
+def _save(jobs):
+    Job.objects.bulk_update(jobs, ["status", "run_at", "finished", "last_error"])
+
+
+def _execute(func, arg, jobs):
+    try:
+        with transaction.atomic():
+            func(arg)
+            now = timezone.now()
+            for j in jobs:
+                j.status = Job.DONE
+                j.finished = now
+                j.last_error = ""
+            _save(jobs)
+    except Exception as e:
+        logger.exception("Job %s failed", jobs[0].name)
+        with transaction.atomic():
+            _fail(jobs, e)
+
+
+def _fail(jobs, exc, retry=True):
+    now = timezone.now()
+    backoff = getattr(settings, "JOBS_RETRY_BACKOFF", 10)
+    error = "".join(traceback.format_exception_only(type(exc), exc))
+    for j in jobs:
+        j.last_error = error
+        if retry and j.attempts < j.max_attempts:
+            j.run_at = now + timedelta(seconds=backoff * 2 ** (j.attempts - 1))
+        else:
+            j.status = Job.FAILED
+            j.finished = now
+    _save(jobs)
+
+
+def prune(older_than):
+    """
+    Delete finished jobs, done or failed, older than ``older_than``. Their
+    idempotency keys become reusable afterwards: a job that failed for good
+    can be enqueued again then.
+
+    :type older_than: timedelta
+    :return: Number of jobs deleted
+    :rtype: int
+    """
+
+    cutoff = timezone.now() - older_than
+    deleted, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished__lt=cutoff).delete()
+    return deleted
+
+
+def work(batch_size=100, idle_timeout=5, burst=False):
+    """
+    Worker loop: run due jobs until there are none left, then wait on the
+    configured transport. With ``burst`` the loop exits once the queue is empty.
+    """
+
+    transport = get_transport()
+    while True:
+        processed = run_pending(batch_size)
+        if processed:
+            continue
+        if burst:
+            return
+        transport.wait(idle_timeout)
@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass(frozen=True)
+class Handler:
+    name: str
+    func: Callable
+    batch: bool = False
+    max_attempts: int = 5
+
+
+_handlers: dict[str, Handler] = {}
+
+
+def job(name, batch=False, max_attempts=5):
+    """
+    Register the decorated function as the handler for jobs called ``name``.
+
+    Batch handlers receive a list with the payloads of every due job of
+    that name claimed by the worker in one go, other handlers are called
+    once per job with its payload.
+
+    :param name: Unique job name, conventionally "<app>.<action>"
+    :type name: str
+    :param batch: Whether the handler accepts a list of payloads
+    :type batch: bool
+    :param max_attempts: How many times a failing job is tried before it is marked failed
+    :type max_attempts: int
+    """
+
+    def decorator(func):
+        if name in _handlers and _handlers[name].func is not func:
+            raise ValueError("Job {} is already registered".format(name))
+        _handlers[name] = Handler(name=name, func=func, batch=batch, max_attempts=max_attempts)
+        return func
+
+    return decorator
+
+
+def get_handler(name):
+    try:
+        return _handlers[name]
+    except KeyError:
+        raise LookupError("No handler registered for job {}".format(name)) from None
@@ -0,0 +1,174 @@
+"""
+Tests for the background job queue.
+"""
+
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.utils import timezone
+
+from apps.blog.models import Submission, Comment, Vote
+from apps.jobs import queue
+from apps.jobs.models import Job
+from apps.jobs.registry import job
+from apps.user.models import User
+
+calls = []
+
+
+@job("tests.record")
+def record(payload):
+    calls.append(payload)
+
+
+@job("tests.record_batch", batch=True)
+def record_batch(payloads):
+    calls.append(payloads)
+
+
+@job("tests.explode", max_attempts=2)
+def explode(payload):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def deferred(settings):
+    settings.JOBS_ALWAYS_EAGER = False
+    calls.clear()
+    yield
+    calls.clear()
+
+
+@pytest.mark.django_db
+class TestQueue:
+    """Tests for enqueueing and running jobs"""
+
+    def test_eager_runs_inline(self, settings):
+        settings.JOBS_ALWAYS_EAGER = True
+        calls.clear()
+        queue.enqueue("tests.record", {"a": 1})
+
+        assert calls == [{"a": 1}]
+        assert Job.objects.count() == 0
+
+    def test_enqueue_and_run(self, deferred):
+        queue.enqueue("tests.record", {"a": 1})
+        assert calls == []
+        assert Job.objects.filter(status=Job.QUEUED).count() == 1
+
+        assert queue.run_pending() == 1
+        assert calls == [{"a": 1}]
+        assert Job.objects.get().status == Job.DONE
+
+    def test_delayed_job_not_due(self, deferred):
+        queue.enqueue("tests.record", {"a": 1}, delay=60)
+        assert queue.run_pending() == 0
+        assert calls == []
+
+    def test_idempotency_key(self, deferred):
+        queue.enqueue("tests.record", {"a": 1}, key="once")
+        queue.enqueue("tests.record", {"a": 2}, key="once")
+        queue.run_pending()
+        queue.enqueue("tests.record", {"a": 3}, key="once")
+
+        assert Job.objects.count() == 1
+        assert queue.run_pending() == 0
+        assert calls == [{"a": 1}]
+
+    def test_batch_handler_gets_all_payloads(self, deferred):
+        queue.enqueue_many("tests.record_batch", [{"n": i} for i in range(3)])
+        queue.run_pending()
+
+        assert calls == [[{"n": 0}, {"n": 1}, {"n": 2}]]
+
+    def test_retry_then_fail(self, deferred):
+        queue.enqueue("tests.explode")
+        queue.run_pending()
+        failed = Job.objects.get()
+        assert failed.status == Job.QUEUED
+        assert failed.attempts == 1
+        assert "boom" in failed.last_error
+        assert failed.run_at > timezone.now()
+
+        Job.objects.update(run_at=timezone.now())
+        queue.run_pending()
+        failed.refresh_from_db()
+        assert failed.status == Job.FAILED
+        assert failed.attempts == 2
+
+    def test_failure_does_not_block_other_jobs(self, deferred):
+        queue.enqueue("tests.explode")
+        queue.enqueue("tests.record", {"a": 1})
+        queue.run_pending()
+
+        assert calls == [{"a": 1}]
+        assert Job.objects.filter(status=Job.DONE).count() == 1
+
+    def test_claimed_job_runs_again_after_lease(self, deferred, settings):
+        settings.JOBS_LEASE = 60
+        queue.enqueue("tests.record", {"a": 1})
+        # A worker that died after claiming the job.
+        queue._claim(10)
+
+        assert queue.run_pending() == 0
+        assert Job.objects.get().run_at > timezone.now() + timedelta(seconds=50)
+
+        Job.objects.update(run_at=timezone.now())
+        assert queue.run_pending() == 1
+        assert calls == [{"a": 1}]
+        assert Job.objects.values_list("status", "attempts").get() == (Job.DONE, 2)
+
+    def test_prune(self, deferred):
+        queue.enqueue("tests.record", {"a": 1})
+        queue.enqueue("tests.explode", key="explode")
+        queue.run_pending()
+        Job.objects.filter(name="tests.explode").update(run_at=timezone.now())
+        queue.run_pending()
+        queue.enqueue("tests.record", {"a": 2}, delay=60)
+        Job.objects.exclude(status=Job.QUEUED).update(finished=timezone.now() - timedelta(days=10))
+
+        assert queue.prune(timedelta(days=7)) == 2
+        assert Job.objects.get().status == Job.QUEUED
+        # The failed job's key is free again.
+        queue.enqueue("tests.explode", key="explode")
+        assert Job.objects.filter(key="explode").exists()
+
+
+@pytest.mark.django_db
+class TestDeferredSideEffects:
+    """Tests for blog and user work moved onto the queue"""
+
+    def test_comment_count_reconciliation_chains_ranges(self, deferred):
+        submissions = [Submission.objects.create(title=f"Submission {i}") for i in range(3)]
+        Submission.objects.update(comment_count=5)
+        queue.enqueue("blog.reconcile_comment_counts", {"batch_size": 1, "start_id": submissions[0].pk})
+
+        while queue.run_pending():
+            pass
+
+        assert not Submission.objects.exclude(comment_count=0).exists()
+
+    def test_karma_is_deferred_and_batched(self, deferred):
+        author = User.objects.create_user(username="test_author", password="test_password")
+        voters = [User.objects.create_user(username=f"voter_{i}", password="test_password") for i in range(3)]
+        submission = Submission.objects.create(title="test_submission")
+        cmt = Comment.create(author=author, content="test_content", parent=submission)
+        cmt.save()
+        for voter in voters:
+            Vote.create(user=voter, comment=cmt, vote_value=1).save()
+
+        author.refresh_from_db()
+        assert author.karma == 0
+        queue.run_pending()
+        author.refresh_from_db()
+        assert author.karma == 3
+
+    def test_welcome_mail_is_deferred(self, client, deferred):
+        data = {"username": "testuser", "email": "testuser@example.com", "password": "testpassword"}
+        client.post("/register/", data)
+
+        assert len(mail.outbox) == 0
+        queue.run_pending()
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ["testuser@example.com"]
@@ -0,0 +1,59 @@
+"""
+Transports decide how an idle worker learns about new jobs. The database
+is always the source of truth; a transport only shortens the wait.
+"""
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class DatabaseTransport:
+    """Poll the jobs table, no extra infrastructure required."""
+
+    def notify(self):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+
+class RedisTransport:
+    """
+    Wake idle workers through a redis list as soon as a job is committed.
+    Uses the connection of the django-redis ``default`` cache.
+    """
+
+    wakeup_key = "jobs:wakeup"
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self.redis = get_redis_connection("default")
+
+    def notify(self):
+        pipe = self.redis.pipeline()
+        pipe.lpush(self.wakeup_key, 1)
+        # A single pending token is enough to wake a worker up.
+        pipe.ltrim(self.wakeup_key, 0, 0)
+        pipe.execute()
+
+    def wait(self, timeout):
+        self.redis.blpop([self.wakeup_key], timeout=max(1, int(timeout)))
+
+
+TRANSPORTS = {
+    "database": DatabaseTransport,
+    "redis": RedisTransport,
+}
+
+_transport = None
+
+
+def get_transport():
+    global _transport
+    if _transport is None:
+        name = getattr(settings, "JOBS_TRANSPORT", "database")
+        transport_class = TRANSPORTS[name] if name in TRANSPORTS else import_string(name)
+        _transport = transport_class()
+    return _transport
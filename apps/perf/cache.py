@@ -0,0 +1,89 @@
+"""
+Cache backends adding the time of every cache call to the request's timings
+and counting lookups as hits or misses per key namespace (the part of the
+key before the first colon, e.g. "paginator-count").
+
+Configure them in CACHES in place of the backend they extend, e.g.
+``apps.perf.cache.RedisCache`` for ``django_redis.cache.RedisCache``.
+"""
+
+import threading
+
+from django.core.cache.backends import locmem
+from django_redis import cache as redis_cache
+
+from apps.perf.metrics import registry
+from apps.perf.timing import track
+
+# get and get_many are wrapped by TimedCacheMixin itself to count hits and misses.
+TIMED_METHODS = (
+    "add",
+    "set",
+    "touch",
+    "delete",
+    "get_or_set",
+    "has_key",
+    "incr",
+    "decr",
+    "set_many",
+    "delete_many",
+    "clear",
+)
+
+
+def _timed(name):
+    def method(self, *args, **kwargs):
+        with track("cache"):
+            return getattr(super(TimedCacheMixin, self), name)(*args, **kwargs)
+
+    method.__name__ = name
+    return method
+
+
+_MISS = object()
+
+# Set while get_many runs, backends implementing it with get() must not count lookups twice.
+_state = threading.local()
+
+
+def namespace(key):
+    """:return: The part of ``key`` before the first colon, the metrics label of the lookup"""
+    return key.split(":", 1)[0] if isinstance(key, str) and ":" in key else "other"
+
+
+class TimedCacheMixin:
+    """
+    Wraps the public methods of the cache backend it is mixed into with
+    ``track("cache")``, lookups are also counted as hits or misses.
+    """
+
+    def get(self, key, default=None, version=None):
+        with track("cache"):
+            value = super().get(key, _MISS, version=version)
+        if not getattr(_state, "many", False):
+            registry.inc("cache_requests_total", cache=namespace(key), result="miss" if value is _MISS else "hit")
+        return default if value is _MISS else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        _state.many = True
+        try:
+            with track("cache"):
+                found = super().get_many(keys, version=version)
+        finally:
+            _state.many = False
+        for key in keys:
+            registry.inc("cache_requests_total", cache=namespace(key), result="hit" if key in found else "miss")
+        return found
+
+
+for _name in TIMED_METHODS:
+    setattr(TimedCacheMixin, _name, _timed(_name))
+
+
+class LocMemCache(TimedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class RedisCache(TimedCacheMixin, redis_cache.RedisCache):
+    pass
@@ -0,0 +1,124 @@
+"""
+Compression of dynamic responses and whitespace stripping of rendered HTML.
+
+WhiteNoise serves static files precompressed, everything Django renders
+goes out as is. HTML and JSON are compressed with brotli when the client
+accepts it and the ``brotli`` package is installed, gzip otherwise.
+Streaming responses are compressed chunk by chunk and flushed after every
+chunk, so the client still gets them progressively.
+
+Compressing a page that reflects request data next to a secret lets an
+attacker guess the secret from the compressed size (BREACH). Django
+already masks the CSRF token differently in every response against it,
+so pages with the token, every page a logged in user sees, are
+compressed too. ``COMPRESSION_SKIP_CSRF`` sends them uncompressed instead.
+
+``CompressionMiddleware`` in ``apps.perf.middleware`` compresses the
+responses. ``minify`` is applied to rendered templates by the template
+backend when ``HTML_MINIFY`` is on, see ``apps.perf.backends``.
+"""
+
+import re
+import zlib
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+GZIP_LEVEL = 6
+# Brotli's higher qualities are too slow for per-request compression.
+BROTLI_QUALITY = 5
+
+# Elements whose content is whitespace sensitive, left exactly as rendered.
+PRESERVE = re.compile(r"(<(pre|textarea|script)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+NEWLINES = re.compile(r"[ \t\r\f\v]*\n\s*")
+SPACES = re.compile(r"[ \t\r\f\v]{2,}")
+
+
+def _collapse(text):
+    # Indentation and trailing blanks go, line breaks stay: browsers render the
+    # result the same under ``white-space: normal`` and ``pre-line``.
+    text = NEWLINES.sub(lambda match: "\n" * match.group().count("\n"), text)
+    return SPACES.sub(" ", text)
+
+
+def minify(html):
+    """
+    Strip the whitespace rendered HTML does not need.
+
+    Runs of spaces become one space, indentation and trailing spaces around
+    line breaks are removed. ``<pre>``, ``<textarea>`` and ``<script>``
+    elements are kept verbatim; elements styled ``white-space: pre`` or
+    ``pre-wrap`` by CSS are not detected.
+
+    :param html: Rendered HTML
+    :type html: str
+    :return: The same document with less whitespace
+    :rtype: str
+    """
+
+    parts = PRESERVE.split(html)
+    # re.split with two groups yields [text, element, tag name, text, ...]
+    return "".join(_collapse(part) if i % 3 == 0 else part for i, part in enumerate(parts) if i % 3 != 2)
+
+
+def accepted_encoding(header):
+    """
+    :param header: ``Accept-Encoding`` request header
+    :type header: str
+    :return: "br", "gzip" or None, the best supported encoding the client accepts
+    :rtype: str | None
+    """
+
+    accepted = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding):
+    """:return: ``data`` compressed with ``encoding`` ("br" or "gzip") in one go"""
+
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+class Compressor:
+    """Incremental compressor for one streamed response body."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 31: zlib's deflate with a gzip header and trailer.
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        """:return: ``data`` compressed and flushed, so it can be sent right away"""
+
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
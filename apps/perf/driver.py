@@ -0,0 +1,432 @@
+"""
+Scenario load driver: simulated users browsing, voting, commenting and
+logging in, against ``config.wsgi.application`` in this process or a
+running server over HTTP.
+
+Every visit runs one scenario, picked by weight from the mix, as one of
+the test users: the first visit of a user logs in and the session, with
+its cookies and CSRF token, is kept for the following ones. Visits either
+arrive at a fixed mean rate (open loop, exponential gaps, so the load does
+not back off when the site slows down) or run back to back (closed loop).
+They are served by ``threads`` threads in each of ``processes`` forked
+processes.
+
+Scenarios write comments and votes, run it against a local database
+filled by ``seed_blog_data``. ``python manage.py load_driver``.
+"""
+
+import json
+import multiprocessing
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+from http.cookiejar import CookieJar
+from http.cookies import SimpleCookie
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import reverse
+
+from apps.blog.models import Comment, Submission
+from apps.blog.seed import seed_users
+from apps.user.models import User
+
+from .loadtest import CLIENT_ADDR, ensure_submission, percentile, request_host
+
+Sample = namedtuple("Sample", ["endpoint", "status", "seconds"])
+Stats = namedtuple("Stats", ["endpoint", "requests", "errors", "throughput", "p50", "p95", "p99"])
+Report = namedtuple("Report", ["stats", "visits", "wall", "lag_p99"])
+# What the scenarios work on, picklable for the forked processes.
+Target = namedtuple("Target", ["credentials", "threads", "comments"])
+
+DEFAULT_MIX = {"browse": 70, "vote": 20, "comment": 5, "login": 5}
+USER_PREFIX = "loaduser"
+USER_PASSWORD = "load_password"
+
+# The WSGI application built in the parent, inherited by the forked processes.
+_application = None
+
+
+class Session:
+    """One browser: keeps the session and CSRF cookies, records a Sample per request."""
+
+    def __init__(self):
+        self.samples = []
+
+    def get(self, endpoint, path):
+        return self.request(endpoint, "GET", path)
+
+    def post(self, endpoint, path, data=None, json_body=None):
+        return self.request(endpoint, "POST", path, data, json_body)
+
+    def request(self, endpoint, method, path, data=None, json_body=None):
+        """:return: Status code (0 for a failed connection) and body"""
+        start = time.perf_counter()
+        try:
+            status, body = self.send(method, path, data, json_body)
+        except (URLError, OSError):
+            status, body = 0, b""
+        self.samples.append(Sample(endpoint, status, time.perf_counter() - start))
+        return status, body
+
+    def send(self, method, path, data, json_body):
+        raise NotImplementedError
+
+
+class WSGISession(Session):
+    """Requests handed straight to a WSGI application, as in apps.perf.loadtest."""
+
+    def __init__(self, application, host):
+        super().__init__()
+        self.application = application
+        self.host = host
+        self.cookies = SimpleCookie()
+        self.factory = RequestFactory()
+
+    def send(self, method, path, data, json_body):
+        extra = {"HTTP_HOST": self.host, "REMOTE_ADDR": CLIENT_ADDR}
+        if self.cookies:
+            extra["HTTP_COOKIE"] = self.cookie_header()
+        if method == "GET":
+            environ = self.factory.get(path, **extra).environ
+        else:
+            if "csrftoken" in self.cookies:
+                extra["HTTP_X_CSRFTOKEN"] = self.cookies["csrftoken"].value
+            if json_body is not None:
+                environ = self.factory.post(path, json.dumps(json_body), "application/json", **extra).environ
+            else:
+                environ = self.factory.post(path, data or {}, **extra).environ
+
+        status, headers = [], []
+
+        def start_response(status_line, response_headers, exc_info=None):
+            status.append(int(status_line.split(" ", 1)[0]))
+            headers.extend(response_headers)
+
+        response = self.application(environ, start_response)
+        try:
+            body = b"".join(response)
+        finally:
+            response.close()
+        for name, value in headers:
+            if name.lower() == "set-cookie":
+                cookie = SimpleCookie(value)
+                for key, morsel in cookie.items():
+                    if morsel["max-age"] == "0":
+                        self.cookies.pop(key, None)
+                    else:
+                        self.cookies[key] = morsel
+        return status[0], body
+
+    def cookie_header(self):
+        """:return: Value of the Cookie header sending the session's cookies"""
+
+        return "; ".join("{}={}".format(k, m.value) for k, m in self.cookies.items())
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPSession(Session):
+    """Requests to a running server, redirects are not followed."""
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.jar = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.jar), _NoRedirect)
+
+    def send(self, method, path, data, json_body):
+        headers = {"Referer": self.base_url + "/"}
+        body = None
+        if method == "POST":
+            token = next((c.value for c in self.jar if c.name == "csrftoken"), None)
+            if token:
+                headers["X-CSRFToken"] = token
+            if json_body is not None:
+                body, headers["Content-Type"] = json.dumps(json_body).encode(), "application/json"
+            else:
+                body = urlencode(data or {}).encode()
+        try:
+            with self.opener.open(Request(self.base_url + path, body, headers, method=method), timeout=30) as response:
+                return response.status, response.read()
+        except HTTPError as error:
+            return error.code, error.read()
+
+
+def ensure_users(count, prefix=USER_PREFIX, password=USER_PASSWORD):
+    """:return: ``count`` (username, password) pairs of test users, created if missing"""
+
+    existing = User.objects.filter(username__startswith=prefix, is_active=True).count()
+    if existing < count:
+        seed_users(count - existing, prefix=prefix, password=password)
+    usernames = User.objects.filter(username__startswith=prefix, is_active=True).order_by("pk")[:count]
+    return [(username, password) for username in usernames.values_list("username", flat=True)]
+
+
+def prepare_target(users=50, threads=20, comments_per_thread=200, password=USER_PASSWORD):
+    """
+    Collect the test users, the newest threads and some of their comments.
+
+    :rtype: Target
+    """
+
+    credentials = ensure_users(users, password=password)
+    thread_ids = list(Submission.objects.visible().order_by("-timestamp").values_list("pk", flat=True)[:threads])
+    if not thread_ids:
+        thread_ids = [ensure_submission().pk]
+    comments = {}
+    for thread_id in thread_ids:
+        comments[thread_id] = list(
+            Comment.objects.filter(submission_id=thread_id, deleted=False)
+            .order_by("tree_id", "lft")
+            .values_list("pk", flat=True)[:comments_per_thread]
+        )
+    return Target(credentials, thread_ids, comments)
+
+
+# Scenarios: each gets a logged in session, the target and a random generator.
+
+
+def browse(session, target, rng):
+    session.get("frontpage", reverse("frontpage"))
+    thread_id = rng.choice(target.threads)
+    session.get("comments", reverse("apps.blog:post", args=[thread_id]))
+    session.get("comment_votes", reverse("apps.blog:comment_votes", args=[thread_id]))
+
+
+def vote(session, target, rng):
+    thread_id = rng.choice(target.threads)
+    session.get("comments", reverse("apps.blog:post", args=[thread_id]))
+    session.get("comment_votes", reverse("apps.blog:comment_votes", args=[thread_id]))
+    comments = target.comments[thread_id]
+    if comments:
+        picked = rng.sample(comments, min(len(comments), rng.randint(1, 5)))
+        votes = [{"id": pk, "value": rng.choice((1, 1, 1, -1))} for pk in picked]
+        session.post("vote_batch", reverse("apps.blog:vote_batch"), json_body={"votes": votes})
+
+
+def comment(session, target, rng):
+    thread_id = rng.choice(target.threads)
+    session.get("comments", reverse("apps.blog:post", args=[thread_id]))
+    comments = target.comments[thread_id]
+    if comments and rng.random() < 0.7:
+        parent_type, parent_id = "comment", rng.choice(comments)
+    else:
+        parent_type, parent_id = "submission", thread_id
+    session.post(
+        "post_comment",
+        reverse("apps.blog:post_comment"),
+        {"parentType": parent_type, "parentId": parent_id, "commentContent": "Load test reply"},
+    )
+
+
+def login(session, target, rng):
+    # A fresh session, see _run_visit, logged in by the visit itself.
+    session.get("frontpage", reverse("frontpage"))
+
+
+SCENARIOS = {"browse": browse, "vote": vote, "comment": comment, "login": login}
+
+
+def log_in(session, username, password):
+    """:return: Whether the login succeeded"""
+
+    session.get("login_page", reverse("login"))
+    status, _ = session.post("login", reverse("login"), {"username": username, "password": password})
+    return status == 302
+
+
+def _new_session(base_url, host):
+    return HTTPSession(base_url) if base_url else WSGISession(_application, host)
+
+
+def _serve(visits, target, base_url, host, seed, samples, lags):
+    """Body of one thread: run visits from the queue until it yields None."""
+
+    rng = random.Random(seed)
+    sessions = {}
+    try:
+        while True:
+            visit = visits.get()
+            if visit is None:
+                return
+            due, scenario, user = visit
+            if due is not None:
+                lags.append(max(0.0, time.perf_counter() - due))
+            session = sessions.get(user)
+            if session is None or scenario == "login":
+                session = _new_session(base_url, host)
+                if not log_in(session, *target.credentials[user]):
+                    samples.extend(session.samples)
+                    continue
+                sessions[user] = session
+            SCENARIOS[scenario](session, target, rng)
+            samples.extend(session.samples)
+            session.samples = []
+    finally:
+        connections.close_all()
+
+
+def _drive(target, mix, visits, rate, threads, base_url, host, seed):
+    """
+    Body of one process: schedule ``visits`` visits, at ``rate`` per second
+    or back to back, over ``threads`` threads.
+
+    :return: Samples and visit start lags in seconds
+    """
+
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    pending = queue.Queue()
+    samples, lags = [], []
+    workers = [
+        threading.Thread(target=_serve, args=(pending, target, base_url, host, seed * 1000 + i, samples, lags))
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+
+    due = time.perf_counter()
+    for _ in range(visits):
+        if rate:
+            due += rng.expovariate(rate)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        pending.put((due if rate else None, rng.choices(names, weights)[0], rng.randrange(len(target.credentials))))
+    for _ in workers:
+        pending.put(None)
+    for worker in workers:
+        worker.join()
+    return samples, lags
+
+
+def summarise(samples, wall):
+    """:return: Stats per endpoint, by name, followed by the total"""
+
+    stats = []
+    for endpoint in sorted({s.endpoint for s in samples}) + [None]:
+        selected = [s for s in samples if endpoint is None or s.endpoint == endpoint]
+        latencies = [s.seconds for s in selected]
+        stats.append(
+            Stats(
+                endpoint=endpoint or "all",
+                requests=len(selected),
+                errors=sum(1 for s in selected if not 0 < s.status < 400),
+                throughput=len(selected) / wall if wall else 0.0,
+                p50=percentile(latencies, 50),
+                p95=percentile(latencies, 95),
+                p99=percentile(latencies, 99),
+            )
+        )
+    return stats
+
+
+def run(target, visits, mix=None, rate=None, processes=1, threads=4, base_url=None, seed=0):
+    """
+    Run a load test.
+
+    :param target: Users and threads the scenarios work on, see prepare_target
+    :type target: Target
+    :param visits: Total number of visits
+    :type visits: int
+    :param mix: {scenario name: weight}, defaults to DEFAULT_MIX
+    :type mix: dict
+    :param rate: Mean visits per second over all processes, None to run them back to back
+    :type rate: float
+    :param processes: Forked processes, each serving an equal share of the visits
+    :type processes: int
+    :param threads: Threads per process
+    :type threads: int
+    :param base_url: URL of a running server, None to call config.wsgi.application in process
+    :type base_url: str
+    :param seed: Seed of the random choices
+    :type seed: int
+    :rtype: Report
+    """
+
+    global _application
+
+    mix = {name: weight for name, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        raise ValueError("Unknown scenarios: {}".format(", ".join(sorted(unknown))))
+
+    host = request_host()
+    if base_url is None and _application is None:
+        from config.wsgi import application
+
+        _application = application
+    connections.close_all()
+
+    shares = [
+        (
+            target,
+            mix,
+            visits // processes + (i < visits % processes),
+            rate and rate / processes,
+            threads,
+            base_url,
+            host,
+            seed + i,
+        )
+        for i in range(processes)
+    ]
+    start = time.perf_counter()
+    if processes == 1:
+        results = [_drive(*shares[0])]
+    else:
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            results = pool.starmap(_drive, shares)
+    wall = time.perf_counter() - start
+
+    samples = [s for rows, _ in results for s in rows]
+    lags = [lag for _, rows in results for lag in rows]
+    return Report(summarise(samples, wall), visits, wall, percentile(lags, 99))
+
+
+def check_slos(stats, slos):
+    """
+    Compare results with service level objectives. An endpoint with an
+    objective but no requests misses it.
+
+    :param stats: Result of summarise
+    :type stats: list[Stats]
+    :param slos: {endpoint or "all": {"p50" / "p95" / "p99": milliseconds, "error_rate": fraction}}
+    :type slos: dict
+    :return: One message per missed objective
+    :rtype: list[str]
+    """
+
+    by_endpoint = {s.endpoint: s for s in stats}
+    missed = []
+    for endpoint, objectives in slos.items():
+        result = by_endpoint.get(endpoint)
+        if result is None or not result.requests:
+            # A misspelt endpoint or a scenario that never ran must not pass the gate.
+            missed.append("no requests recorded for {}".format(endpoint))
+            continue
+        for metric, limit in objectives.items():
+            if metric == "error_rate":
+                value = result.errors / result.requests
+                shown = "{:.2%}".format(value), "{:.2%}".format(limit)
+            else:
+                value = getattr(result, metric) * 1000
+                shown = "{:.1f}ms".format(value), "{}ms".format(limit)
+            if value > limit:
+                missed.append("{} {} is {}, objective {}".format(endpoint, metric, *shown))
+    return missed
+
+
+def default_slos():
+    """:return: A copy of the LOADTEST_SLOS setting"""
+    return {endpoint: dict(objectives) for endpoint, objectives in getattr(settings, "LOADTEST_SLOS", {}).items()}
@@ -0,0 +1,251 @@
+"""
+In-process load test of the WSGI application, one run per gunicorn worker class.
+
+The HTTP layer is left out on purpose: requests are WSGI environs handed
+straight to Django's handler, so the numbers compare how each concurrency
+model spreads the Django and database work, not socket handling. A mode
+is emulated the way gunicorn runs it:
+
+* ``sync``: ``workers`` forked processes serving one request at a time.
+* ``gthread``: ``workers`` forked processes with ``threads`` threads each.
+* ``gevent``: ``workers`` forked processes with ``threads`` greenlets each,
+  after monkey patching. Skipped when gevent is not installed.
+
+Like gunicorn with ``preload_app`` the handler is built and warmed up in the
+parent before forking, and every process opens its own database connection.
+Requests are sent as a logged in user, the comments page is login-only, and
+only 2xx answers count as served.
+"""
+
+import multiprocessing
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import reverse
+
+from apps.blog.models import Submission
+from apps.blog.seed import BlogSeeder
+from apps.user.models import User
+
+MODES = ("sync", "gthread", "gevent")
+
+LOADTEST_TITLE = "Load test thread"
+
+# A documentation address (RFC 5737), outside INTERNAL_IPS so the debug toolbar stays off.
+CLIENT_ADDR = "192.0.2.1"
+
+Result = namedtuple("Result", ["mode", "endpoint", "requests", "errors", "throughput", "p50", "p99"])
+
+# The handler built in the parent, inherited by the forked workers.
+_application = None
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile.
+
+    :param values: Measurements, in any order
+    :type values: list[float]
+    :param pct: Percentile between 0 and 100
+    :type pct: float
+    :return: The percentile, None for no values
+    :rtype: float | None
+    """
+
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def ensure_submission(comments=200, seed=0):
+    """
+    Get or create the submission the ``comments`` endpoint is tested against.
+
+    :param comments: Number of comments to give a newly created thread
+    :type comments: int
+    :param seed: Seed for the shape of a newly created thread
+    :type seed: int
+    :return: The load test submission
+    :rtype: Submission
+    """
+
+    submission = Submission.objects.filter(title=LOADTEST_TITLE).order_by("id").first()
+    if submission is not None:
+        return submission
+
+    author, _ = User.objects.get_or_create(username="loadtest", defaults={"email": "loadtest@example.com"})
+    submission = Submission.objects.create(title=LOADTEST_TITLE, author=author)
+    # A single author, so no votes: nobody votes on their own comments.
+    BlogSeeder([author.pk], root_ratio=0.2, votes=0, seed=seed).seed_thread(submission, comments)
+    return submission
+
+
+def default_targets(submission):
+    """:return: ``(endpoint, path)`` pairs for the frontpage and the submission's comments"""
+
+    return [
+        ("frontpage", reverse("frontpage")),
+        ("comments", reverse("apps.blog:post", args=[submission.id])),
+    ]
+
+
+def request_host():
+    """:return: A host name the ALLOWED_HOSTS setting accepts"""
+
+    hosts = [h for h in settings.ALLOWED_HOSTS if h and "*" not in h]
+    return hosts[0].lstrip(".") if hosts else "localhost"
+
+
+def log_in(application, host):
+    """
+    Log a load test user in through the login view.
+
+    :return: Value of the Cookie header sending its session and CSRF cookies
+    :rtype: str
+    :raises RuntimeError: if the login failed
+    """
+
+    # Imported here, the driver builds on this module.
+    from .driver import WSGISession, ensure_users
+    from .driver import log_in as log_in_session
+
+    [(username, password)] = ensure_users(1)
+    session = WSGISession(application, host)
+    if not log_in_session(session, username, password):
+        raise RuntimeError("Could not log {} in".format(username))
+    return session.cookie_header()
+
+
+def request(application, path, host, cookie=None):
+    """
+    Serve one GET request through the WSGI application.
+
+    :param cookie: Value of the Cookie header, see :func:`log_in`
+    :type cookie: str
+    :return: Status code and seconds taken, response body included
+    :rtype: tuple[int, float]
+    """
+
+    extra = {"HTTP_HOST": host, "REMOTE_ADDR": CLIENT_ADDR}
+    if cookie:
+        extra["HTTP_COOKIE"] = cookie
+    environ = RequestFactory().get(path, **extra).environ
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split(" ", 1)[0]))
+
+    start = time.perf_counter()
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return status[0], time.perf_counter() - start
+
+
+def _serve(plan, host, cookie):
+    """Serve ``plan`` back to back, :return: ``(endpoint, status, seconds)`` per request"""
+
+    try:
+        return [(endpoint,) + request(_application, path, host, cookie) for endpoint, path in plan]
+    finally:
+        # Connections are per thread (per greenlet under gevent).
+        connections.close_all()
+
+
+def _work(mode, plan, concurrency, host, cookie):
+    """Body of one worker process: serve ``plan`` with ``concurrency`` threads or greenlets."""
+
+    slices = [plan[i::concurrency] for i in range(concurrency)]
+    if mode == "gevent":
+        from gevent import monkey
+
+        monkey.patch_all()
+        import gevent
+
+        greenlets = [gevent.spawn(_serve, s, host, cookie) for s in slices]
+        gevent.joinall(greenlets, raise_error=True)
+        return [row for g in greenlets for row in g.value]
+    if concurrency == 1:
+        return _serve(plan, host, cookie)
+    with ThreadPoolExecutor(concurrency) as pool:
+        served = pool.map(_serve, slices, [host] * concurrency, [cookie] * concurrency)
+        return [row for rows in served for row in rows]
+
+
+def mode_available(mode):
+    """:return: Whether the worker class can be emulated in this environment"""
+
+    if mode != "gevent":
+        return True
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def run_mode(mode, targets, requests, workers, concurrency):
+    """
+    Run one load test.
+
+    :param mode: One of MODES
+    :type mode: str
+    :param targets: ``(endpoint, path)`` pairs, requested round robin
+    :type targets: list[tuple[str, str]]
+    :param requests: Total number of requests
+    :type requests: int
+    :param workers: Number of worker processes
+    :type workers: int
+    :param concurrency: Threads or greenlets per worker, forced to 1 for sync
+    :type concurrency: int
+    :return: One result per endpoint followed by the total
+    :rtype: list[Result]
+    """
+
+    global _application
+
+    if mode == "sync":
+        concurrency = 1
+    host = request_host()
+    if _application is None:
+        _application = WSGIHandler()
+    cookie = log_in(_application, host)
+    # Compile templates and fill caches before forking, like a preloaded master.
+    for _, path in targets:
+        request(_application, path, host, cookie)
+    connections.close_all()
+
+    plan = [targets[i % len(targets)] for i in range(requests)]
+    shares = [(mode, plan[i::workers], concurrency, host, cookie) for i in range(workers)]
+    start = time.perf_counter()
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        rows = [row for rows in pool.starmap(_work, shares) for row in rows]
+    wall = time.perf_counter() - start
+
+    results = []
+    for endpoint in [name for name, _ in targets] + [None]:
+        selected = [r for r in rows if endpoint is None or r[0] == endpoint]
+        latencies = [r[2] for r in selected]
+        results.append(
+            Result(
+                mode=mode,
+                endpoint=endpoint or "all",
+                requests=len(selected),
+                # A redirect is an error too, e.g. to the login page: the page was not served.
+                errors=sum(1 for r in selected if not 200 <= r[1] < 300),
+                throughput=len(selected) / wall,
+                p50=percentile(latencies, 50),
+                p99=percentile(latencies, 99),
+            )
+        )
+    return results
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.perf.driver import DEFAULT_MIX, SCENARIOS, USER_PASSWORD, check_slos, default_slos, prepare_target, run
+
+
+def weight(value):
+    name, _, amount = value.partition("=")
+    if name not in SCENARIOS or not amount:
+        raise ValueError(value)
+    return name, float(amount)
+
+
+def objective(value):
+    endpoint, _, rest = value.partition(":")
+    metric, _, limit = rest.partition("=")
+    if metric not in ("p50", "p95", "p99", "error_rate") or not limit:
+        raise ValueError(value)
+    return endpoint, metric, float(limit)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a mix of simulated users (browse, vote, comment, login) against the application, "
+        "in process or against --url, report throughput and latency per endpoint and fail on missed SLOs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--visits", type=int, default=500, help="Total visits, a few requests each.")
+        parser.add_argument("--rate", type=float, help="Mean visits per second, back to back when not given.")
+        parser.add_argument("--processes", type=int, default=1, help="Forked processes.")
+        parser.add_argument("--threads", type=int, default=4, help="Threads per process.")
+        parser.add_argument(
+            "--mix",
+            nargs="+",
+            type=weight,
+            default=[],
+            metavar="SCENARIO=WEIGHT",
+            help="Scenario weights, default {}.".format(" ".join("{}={}".format(*i) for i in DEFAULT_MIX.items())),
+        )
+        parser.add_argument(
+            "--slo",
+            nargs="+",
+            type=objective,
+            default=[],
+            metavar="ENDPOINT:METRIC=LIMIT",
+            help="Add or override objectives of LOADTEST_SLOS, e.g. comments:p95=250 all:error_rate=0.001.",
+        )
+        parser.add_argument("--url", help="Base URL of a running server instead of the in-process application.")
+        parser.add_argument("--users", type=int, default=50, help="Test users, created when missing.")
+        parser.add_argument("--password", default=USER_PASSWORD, help="Password of the test users.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if settings.DEBUG and not options["url"]:
+            self.stderr.write("DEBUG is on, numbers include debug-only overhead such as query logging.")
+
+        slos = default_slos()
+        for endpoint, metric, limit in options["slo"]:
+            slos.setdefault(endpoint, {})[metric] = limit
+
+        target = prepare_target(users=options["users"], password=options["password"])
+        report = run(
+            target,
+            options["visits"],
+            mix=dict(DEFAULT_MIX, **dict(options["mix"])),
+            rate=options["rate"],
+            processes=options["processes"],
+            threads=options["threads"],
+            base_url=options["url"],
+            seed=options["seed"],
+        )
+
+        self.stdout.write(
+            "{:>14} {:>7} {:>7} {:>8} {:>8} {:>8} {:>8}".format(
+                "endpoint", "reqs", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms"
+            )
+        )
+        for stats in report.stats:
+            self.stdout.write(
+                "{:>14} {:>7} {:>7} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f}".format(
+                    stats.endpoint,
+                    stats.requests,
+                    stats.errors,
+                    stats.throughput,
+                    stats.p50 * 1000,
+                    stats.p95 * 1000,
+                    stats.p99 * 1000,
+                )
+            )
+        self.stdout.write("{} visits in {:.1f}s".format(report.visits, report.wall))
+        if report.lag_p99 is not None:
+            # Visits starting late means the threads could not keep up with the arrival rate.
+            self.stdout.write("p99 visit start lag {:.1f}ms".format(report.lag_p99 * 1000))
+
+        missed = check_slos(report.stats, slos)
+        if missed:
+            raise CommandError("Missed objectives:\n" + "\n".join(missed))
+        self.stdout.write(self.style.SUCCESS("All objectives met"))
@@ -0,0 +1,55 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.perf.loadtest import MODES, default_targets, ensure_submission, mode_available, run_mode
+from config.gunicorn import default_threads, default_workers
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and latency of the frontpage and comments endpoints "
+        "under gunicorn's sync, gthread and gevent worker classes, in process against the local database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per mode, split over the endpoints.")
+        parser.add_argument("--workers", type=int, help="Worker processes, defaults to the config/gunicorn.py sizing.")
+        parser.add_argument("--concurrency", type=int, help="Threads (gthread) or greenlets (gevent) per worker.")
+        parser.add_argument("--comments", type=int, default=200, help="Comments in a newly created test thread.")
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write("DEBUG is on, numbers include debug-only overhead such as query logging.")
+
+        targets = default_targets(ensure_submission(options["comments"]))
+        cores = multiprocessing.cpu_count()
+
+        self.stdout.write(
+            "{:>8} {:>10} {:>8} {:>8} {:>7} {:>7} {:>8} {:>8}".format(
+                "mode", "endpoint", "workers", "threads", "reqs", "errors", "req/s", "p99 ms"
+            )
+        )
+        for mode in options["modes"]:
+            if not mode_available(mode):
+                self.stdout.write("{:>8} skipped, gevent is not installed".format(mode))
+                continue
+            workers = options["workers"] or default_workers(mode, cores)
+            concurrency = options["concurrency"] or default_threads(mode if mode != "gevent" else "gthread")
+            if mode == "sync":
+                concurrency = 1
+            for result in run_mode(mode, targets, options["requests"], workers, concurrency):
+                self.stdout.write(
+                    "{:>8} {:>10} {:>8} {:>8} {:>7} {:>7} {:>8.1f} {:>8.1f}".format(
+                        result.mode,
+                        result.endpoint,
+                        workers,
+                        concurrency,
+                        result.requests,
+                        result.errors,
+                        result.throughput,
+                        result.p99 * 1000,
+                    )
+                )
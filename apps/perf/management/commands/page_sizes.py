@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from apps.perf.compression import brotli, compress
+from apps.perf.loadtest import CLIENT_ADDR, default_targets, ensure_submission, request_host
+
+
+def fetch(client, path, minified, accept="identity"):
+    """:return: Response to a GET of ``path``, with or without HTML_MINIFY"""
+
+    with override_settings(HTML_MINIFY=minified):
+        return client.get(path, HTTP_ACCEPT_ENCODING=accept)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the frontpage and comments pages as rendered, minified and compressed with gzip "
+        "and brotli, and what CompressionMiddleware actually sends, to see what HTML_MINIFY and compression save."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--comments", type=int, default=200, help="Comments in a newly created test thread.")
+
+    def handle(self, *args, **options):
+        submission = ensure_submission(options["comments"])
+        client = Client(HTTP_HOST=request_host(), REMOTE_ADDR=CLIENT_ADDR)
+        # The comments page needs a login.
+        client.force_login(submission.author)
+        encodings = ["gzip"] + (["br"] if brotli is not None else [])
+
+        self.stdout.write(
+            "{:>10} {:>10} {:>10}".format("endpoint", "rendered", "minified")
+            + "".join(" {:>10}".format(e) for e in encodings)
+            + " {:>10} {:>7}".format("sent", "saved")
+        )
+        for endpoint, path in default_targets(submission):
+            rendered = len(fetch(client, path, False).content)
+            minified = fetch(client, path, True).content
+            sizes = [len(compress(minified, encoding)) for encoding in encodings]
+            response = fetch(client, path, True, accept=", ".join(encodings))
+            sent = len(response.content)
+            self.stdout.write(
+                "{:>10} {:>10} {:>10}".format(endpoint, rendered, len(minified))
+                + "".join(" {:>10}".format(size) for size in sizes)
+                + " {:>10} {:>6.1f}%".format(sent, 100 * (1 - sent / rendered))
+            )
+            if not response.has_header("Content-Encoding"):
+                self.stdout.write("{:>10} sent uncompressed, see COMPRESSION_SKIP_CSRF".format(""))
+        if brotli is None:
+            self.stdout.write("brotli is not installed, only gzip was measured.")
@@ -0,0 +1,236 @@
+"""
+Process-local metrics, aggregated across gunicorn workers at scrape time.
+
+Every process records counters and histograms in its own ``Registry``.
+With ``METRICS_DIR`` set, the registry is written to ``<pid>.json`` in that
+directory at most every ``METRICS_FLUSH_INTERVAL`` seconds, and the
+``/metrics`` view sums the files of all workers. Files of workers that
+exited (e.g. recycled by ``max_requests``) are folded into
+``archive.json`` so their counts are kept. Without ``METRICS_DIR`` only
+the serving process is reported, fine for a single process.
+
+Gauges are computed when scraped, see ``apps.perf.views``.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTERS = {
+    "http_requests_total": "Requests served, by view, method and status.",
+    "db_queries_total": "Database queries made, by view.",
+    "db_query_seconds_total": "Seconds spent in database queries, by view.",
+    "db_connections_created_total": "Database connections opened.",
+    "cache_requests_total": "Cache lookups, by key namespace and result (hit or miss).",
+    "object_cache_requests_total": "Object cache lookups, by model and answering tier (local, shared or database).",
+    "username_checks_total": "Username availability checks, by what answered them (filter or database).",
+    "blog_writes_total": "Rows written, by model (submission, comment or vote).",
+    "http_response_bytes_total": (
+        "Compressed response bodies, by view, encoding and stage (rendered or sent) in bytes."
+    ),
+    "html_bytes_total": "Rendered HTML, by template and stage (rendered or minified) in characters.",
+}
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Time to serve a request, by view.", DURATION_BUCKETS),
+}
+
+ARCHIVE = "archive.json"
+
+
+def _key(labels):
+    return json.dumps(sorted(labels.items()))
+
+
+class Registry:
+    """Counters and histograms of one process, keyed by metric name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed = 0.0
+
+    def _fork_check(self):
+        # A forked worker starts from scratch, whatever the master recorded is the master's.
+        if self.pid != os.getpid():
+            self.reset()
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self._fork_check()
+            series = self.counters.setdefault(name, {})
+            key = _key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            self._fork_check()
+            series = self.histograms.setdefault(name, {})
+            # Per-bucket (not cumulative) counts, then +Inf, sum and count.
+            data = series.setdefault(_key(labels), [0] * (len(buckets) + 3))
+            data[bisect_left(buckets, value)] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def snapshot(self):
+        with self.lock:
+            self._fork_check()
+            return {
+                "counters": {name: dict(series) for name, series in self.counters.items()},
+                "histograms": {
+                    name: {k: list(v) for k, v in series.items()} for name, series in self.histograms.items()
+                },
+            }
+
+    def maybe_flush(self):
+        """Write the registry to METRICS_DIR if the flush interval has passed."""
+
+        directory = settings.METRICS_DIR
+        if not directory or time.monotonic() - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flush(directory)
+
+    def flush(self, directory):
+        self.flushed = time.monotonic()
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        tmp = path / "{}.json.tmp".format(self.pid)
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path / "{}.json".format(self.pid))
+
+
+registry = Registry()
+
+
+def merge(into, snapshot):
+    """Add ``snapshot`` to ``into``, both in the ``Registry.snapshot`` format."""
+
+    for name, series in snapshot.get("counters", {}).items():
+        target = into["counters"].setdefault(name, {})
+        for key, value in series.items():
+            target[key] = target.get(key, 0) + value
+    for name, series in snapshot.get("histograms", {}).items():
+        target = into["histograms"].setdefault(name, {})
+        for key, data in series.items():
+            if key in target:
+                target[key] = [a + b for a, b in zip(target[key], data)]
+            else:
+                target[key] = list(data)
+    return into
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def collect():
+    """
+    :return: Metrics of every worker, this one's live, summed into one snapshot
+    :rtype: dict
+    """
+
+    total = merge({"counters": {}, "histograms": {}}, registry.snapshot())
+    directory = settings.METRICS_DIR
+    if not directory:
+        return total
+
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / "lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = _read(path / ARCHIVE) or {"counters": {}, "histograms": {}}
+        archived = False
+        for worker in path.glob("*.json"):
+            if not worker.stem.isdigit() or int(worker.stem) == registry.pid:
+                continue
+            data = _read(worker)
+            if _alive(int(worker.stem)):
+                merge(total, data)
+            else:
+                merge(archive, data)
+                worker.unlink()
+                archived = True
+        if archived:
+            tmp = path / (ARCHIVE + ".tmp")
+            tmp.write_text(json.dumps(archive))
+            os.replace(tmp, path / ARCHIVE)
+    return merge(total, archive)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(k, _escape(v)) for k, v in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+def render(snapshot, gauges=()):
+    """
+    Format metrics in the Prometheus text exposition format.
+
+    :param snapshot: Summed metrics as returned by ``collect``
+    :type snapshot: dict
+    :param gauges: ``(name, help, [(labels, value)])`` computed at scrape time
+    :type gauges: iterable
+    :return: Exposition text
+    :rtype: str
+    """
+
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += ["# HELP {} {}".format(name, help_text), "# TYPE {} counter".format(name)]
+        for key, value in sorted(snapshot["counters"].get(name, {}).items()):
+            lines.append("{}{} {}".format(name, _labels(json.loads(key)), _number(value)))
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += ["# HELP {} {}".format(name, help_text), "# TYPE {} histogram".format(name)]
+        for key, data in sorted(snapshot["histograms"].get(name, {}).items()):
+            pairs = json.loads(key)
+            cumulative = 0
+            for bound, count in zip([_number(b) for b in buckets] + ["+Inf"], data[:-2]):
+                cumulative += count
+                lines.append("{}_bucket{} {}".format(name, _labels(pairs + [["le", bound]]), cumulative))
+            lines.append("{}_sum{} {}".format(name, _labels(pairs), _number(data[-2])))
+            lines.append("{}_count{} {}".format(name, _labels(pairs), data[-1]))
+
+    for name, help_text, samples in gauges:
+        lines += ["# HELP {} {}".format(name, help_text), "# TYPE {} gauge".format(name)]
+        for labels, value in samples:
+            lines.append("{}{} {}".format(name, _labels(sorted(labels.items())), _number(value)))
+    return "\n".join(lines) + "\n"
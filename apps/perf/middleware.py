@@ -0,0 +1,261 @@
+import itertools
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+
+from apps.perf import profiling, timing
+from apps.perf.compression import Compressor, accepted_encoding, compress
+from apps.perf.metrics import registry
+
+logger = logging.getLogger("apps.perf.requests")
+
+# Order and labels of the Server-Timing metrics.
+SERVER_TIMING = (
+    ("db", "database"),
+    ("cache", "cache"),
+    ("template", "template render"),
+    ("view", "view"),
+)
+
+
+def view_name(request):
+    """:return: The request's view name as a metrics label"""
+
+    match = request.resolver_match
+    # Unresolved paths share one label, arbitrary URLs must not create new series.
+    return match.view_name if match else "unresolved"
+
+
+class TimingMiddleware:
+    """
+    Time every request and what it spends in the database, the cache,
+    templates and the view.
+
+    Staff users get the timings in a ``Server-Timing`` header, visible in
+    the browser's network panel. Every request is logged as one structured
+    line on the ``apps.perf.requests`` logger and counted in the metrics
+    served on ``/metrics``. Keep this middleware first so the total
+    includes the other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = timing.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing.query_wrapper))
+                response = self.get_response(request)
+            timings = timing.current()
+            view_started = getattr(request, "_timing_view_started", None)
+            if view_started is not None:
+                timings.add("view", time.perf_counter() - view_started)
+            total = timings.elapsed()
+        finally:
+            timing.stop(token)
+
+        if self.show_header(request):
+            response["Server-Timing"] = self.server_timing(timings, total)
+        self.log(request, response, timings, total)
+        self.record(request, response, timings, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_view_started = time.perf_counter()
+
+    @staticmethod
+    def show_header(request):
+        user = getattr(request, "user", None)
+        return user is not None and user.is_staff
+
+    @staticmethod
+    def server_timing(timings, total):
+        """:return: ``Server-Timing`` header value, durations in ms"""
+
+        metrics = []
+        for kind, label in SERVER_TIMING:
+            if kind in timings.seconds:
+                desc = label
+                if kind == "db":
+                    desc = "{} ({} queries)".format(label, timings.calls[kind])
+                metrics.append('{};dur={:.1f};desc="{}"'.format(kind, timings.seconds[kind] * 1000, desc))
+        metrics.append("total;dur={:.1f}".format(total * 1000))
+        return ", ".join(metrics)
+
+    @staticmethod
+    def log(request, response, timings, total):
+        match = request.resolver_match
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 2),
+            "db_queries": timings.calls.get("db", 0),
+            "cache_calls": timings.calls.get("cache", 0),
+        }
+        fields.update({kind + "_ms": ms for kind, ms in timings.as_ms().items()})
+        logger.info("%s %s %s", request.method, request.path, response.status_code, extra={"fields": fields})
+
+    @staticmethod
+    def record(request, response, timings, total):
+        view = view_name(request)
+        registry.inc("http_requests_total", view=view, method=request.method, status=response.status_code)
+        registry.observe("http_request_duration_seconds", total, view=view)
+        registry.inc("db_queries_total", timings.calls.get("db", 0), view=view)
+        registry.inc("db_query_seconds_total", timings.seconds.get("db", 0.0), view=view)
+        registry.maybe_flush()
+
+
+def record_bytes(view, encoding, rendered, sent):
+    """Count a response body's size before and after compression."""
+
+    registry.inc("http_response_bytes_total", rendered, view=view, encoding=encoding, stage="rendered")
+    registry.inc("http_response_bytes_total", sent, view=view, encoding=encoding, stage="sent")
+
+
+class CompressionMiddleware:
+    """
+    Compress responses of the types in ``COMPRESSION_TYPES`` with brotli or
+    gzip. Bodies shorter than ``COMPRESSION_MIN_SIZE`` bytes are not worth
+    it, with ``COMPRESSION_SKIP_CSRF`` on responses that used the CSRF
+    token are skipped (see ``apps.perf.compression``). Rendered and sent
+    sizes are counted per view in ``http_response_bytes_total`` on
+    ``/metrics``.
+
+    Place it after WhiteNoise, whose responses are already compressed, and
+    before any middleware that changes the body.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.eligible(request, response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = accepted_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.compress_async(request, response.streaming_content, encoding)
+            else:
+                response.streaming_content = self.compress_stream(request, response.streaming_content, encoding)
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            record_bytes(view_name(request), encoding, len(response.content), len(compressed))
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The compressed body differs byte for byte, a strong ETag must not be shared.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def eligible(request, response):
+        if response.has_header("Content-Encoding") or "no-transform" in response.get("Cache-Control", ""):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type not in settings.COMPRESSION_TYPES:
+            return False
+        # get_token() sets the key, CsrfViewMiddleware resets it to False but leaves it in place.
+        if settings.COMPRESSION_SKIP_CSRF and "CSRF_COOKIE_NEEDS_UPDATE" in request.META:
+            return False
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return False
+        return True
+
+    @staticmethod
+    def compress_stream(request, content, encoding):
+        compressor = Compressor(encoding)
+        rendered = sent = 0
+        for data in content:
+            rendered += len(data)
+            data = compressor.chunk(data)
+            sent += len(data)
+            yield data
+        data = compressor.finish()
+        record_bytes(view_name(request), encoding, rendered, sent + len(data))
+        yield data
+
+    @staticmethod
+    async def compress_async(request, content, encoding):
+        compressor = Compressor(encoding)
+        rendered = sent = 0
+        async for data in content:
+            rendered += len(data)
+            data = compressor.chunk(data)
+            sent += len(data)
+            yield data
+        data = compressor.finish()
+        record_bytes(view_name(request), encoding, rendered, sent + len(data))
+        yield data
+
+
+class ProfilingMiddleware:
+    """
+    Profile single requests, see apps.perf.profiling.
+
+    Staff users profile a request by adding ``?profile`` (or sending an
+    ``X-Profile`` header) with ``sample`` or ``cprofile``, any other value
+    samples; the response links the stored report in ``X-Profile-Report``.
+    With ``PROFILING_SAMPLE_RATE`` set to N, every Nth request of a process
+    is sampled into the same store, whoever sent it.
+
+    Not loaded at all when both are off. Place it after
+    AuthenticationMiddleware, the middleware above it is not profiled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ON_DEMAND and not settings.PROFILING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.requests = itertools.count(1)
+
+    def __call__(self, request):
+        kind = self.requested(request)
+        on_demand = kind is not None
+        rate = settings.PROFILING_SAMPLE_RATE
+        if not on_demand and rate and next(self.requests) % rate == 0:
+            kind = "sample"
+        if kind is None:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response, report = profiling.profile(
+            self.get_response, request, kind, root=ProfilingMiddleware.__call__.__code__
+        )
+        name = profiling.store(kind, view_name(request), time.perf_counter() - start, report)
+        if on_demand:
+            response["X-Profile-Report"] = reverse("profile_report", args=[name])
+        return response
+
+    @staticmethod
+    def requested(request):
+        """:return: The profiler a staff user asked for, None otherwise"""
+
+        if not settings.PROFILING_ON_DEMAND:
+            return None
+        kind = request.GET.get("profile", request.headers.get("X-Profile"))
+        # The user is only loaded once profiling was asked for.
+        if kind is None or not request.user.is_staff:
+            return None
+        return kind if kind in profiling.PROFILERS else "sample"
@@ -0,0 +1,203 @@
+"""
+Read-through cache of single model rows, for the rows nearly every page
+reads again and again: the thread's submission, the profile's user.
+
+Two tiers answer before the database: a small LRU in each process, in
+front of the shared (redis) cache. Entries are dropped when their row is
+saved or deleted through the ORM, by signals, and by :func:`invalidate`
+wherever a row is changed with a narrow ``update()`` instead, e.g. the
+denormalised counters. Other processes cannot be told, so the entries of
+their LRUs are only trusted for ``OBJECT_CACHE_LOCAL_TIMEOUT`` seconds:
+that is how long another worker may still serve a changed row.
+
+Rows are kept pickled in both tiers, every lookup returns its own
+instance. It may be stale, so code writing a row re-reads it or saves
+only the fields it changes with ``update_fields``.
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from apps.perf.metrics import registry
+
+# Model -> its ObjectCache, for invalidate().
+_caches = {}
+
+
+class LRU:
+    """
+    Thread-safe mapping of at most ``size`` entries, the least recently
+    used goes first. Entries also expire ``timeout`` seconds after they
+    were set.
+
+    :param size: Maximum number of entries
+    :type size: int
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """:return: The value of ``key``, None if it is missing or expired"""
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ObjectCache:
+    """
+    Rows of ``model`` by primary key, and optionally by another unique
+    field. Connects the invalidating signals of the model, create one
+    instance per model when the app is loaded.
+
+    :param model: Model whose rows are cached
+    :type model: type[Model]
+    :param alias: Unique field the rows are also looked up by, e.g. "username"
+    :type alias: str
+    """
+
+    def __init__(self, model, alias=None):
+        self.model = model
+        self.alias = alias
+        self.name = model._meta.label_lower
+        self.local = LRU(settings.OBJECT_CACHE_LOCAL_SIZE)
+        _caches[model] = self
+        uid = "object-cache:{}".format(self.name)
+        post_save.connect(self._changed, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(self._changed, sender=model, weak=False, dispatch_uid=uid)
+
+    def _key(self, pk):
+        return "object:{}:{}".format(self.name, pk)
+
+    def _alias_key(self, value):
+        return "object:{}:{}:{}".format(self.name, self.alias, value)
+
+    def _store(self, instance):
+        data = pickle.dumps(instance, pickle.HIGHEST_PROTOCOL)
+        key = self._key(instance.pk)
+        cache.set(key, data, settings.OBJECT_CACHE_TIMEOUT)
+        self.local.set(key, data, settings.OBJECT_CACHE_LOCAL_TIMEOUT)
+
+    def get(self, pk):
+        """
+        :param pk: Primary key of the row
+        :return: The row, None if there is none
+        :rtype: Model | None
+        """
+
+        key = self._key(pk)
+        data = self.local.get(key)
+        if data is not None:
+            tier = "local"
+        else:
+            data = cache.get(key)
+            if data is not None:
+                tier = "shared"
+                self.local.set(key, data, settings.OBJECT_CACHE_LOCAL_TIMEOUT)
+            else:
+                registry.inc("object_cache_requests_total", model=self.name, tier="database")
+                instance = self.model._default_manager.filter(pk=pk).first()
+                if instance is not None:
+                    self._store(instance)
+                return instance
+        registry.inc("object_cache_requests_total", model=self.name, tier=tier)
+        return pickle.loads(data)
+
+    def get_by(self, value):
+        """
+        :param value: Value of the ``alias`` field
+        :return: The row, None if there is none
+        :rtype: Model | None
+        """
+
+        key = self._alias_key(value)
+        pk = self.local.get(key)
+        if pk is None:
+            pk = cache.get(key)
+        if pk is not None:
+            instance = self.get(pk)
+            # The row may be gone or renamed since, then the mapping is stale.
+            if instance is not None and getattr(instance, self.alias) == value:
+                self.local.set(key, pk, settings.OBJECT_CACHE_LOCAL_TIMEOUT)
+                return instance
+
+        registry.inc("object_cache_requests_total", model=self.name, tier="database")
+        instance = self.model._default_manager.filter(**{self.alias: value}).first()
+        if instance is not None:
+            self._store(instance)
+            cache.set(key, instance.pk, settings.OBJECT_CACHE_TIMEOUT)
+            self.local.set(key, instance.pk, settings.OBJECT_CACHE_LOCAL_TIMEOUT)
+        return instance
+
+    def invalidate(self, *pks):
+        """
+        Drop rows from this process's LRU and the shared cache, now and
+        again once the transaction commits: a reader may have cached the
+        old row in between.
+        """
+
+        keys = [self._key(pk) for pk in pks if pk is not None]
+        if not keys:
+            return
+        for key in keys:
+            self.local.delete(key)
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: self._forget(keys))
+
+    def _forget(self, keys):
+        for key in keys:
+            self.local.delete(key)
+        cache.delete_many(keys)
+
+    def _changed(self, sender, instance, **kwargs):
+        self.invalidate(instance.pk)
+
+
+def invalidate(model, *pks):
+    """Drop rows of ``model`` from its object cache, if it has one."""
+
+    object_cache = _caches.get(model)
+    if object_cache is not None:
+        object_cache.invalidate(*pks)
+
+
+def clear_local():
+    """Empty the LRUs of this process."""
+
+    for object_cache in _caches.values():
+        object_cache.local.clear()
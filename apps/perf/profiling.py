@@ -0,0 +1,187 @@
+"""
+Profiles of single requests, on demand for staff and sampled for everyone.
+
+Two profilers are available:
+
+* ``sample``: a thread reads the request thread's stack every
+  ``PROFILING_INTERVAL`` seconds. Cheap enough to leave on for a share of
+  the traffic, the result is in the collapsed ("folded") format read by
+  flamegraph.pl, speedscope and inferno: one ``frame;frame;frame count``
+  line per distinct stack.
+* ``cprofile``: cProfile's deterministic profile of every call, precise
+  but slow, stored as a pstats dump for snakeviz, flameprof or ``pstats``.
+
+Reports go to ``PROFILING_DIR``, one file each, named after the time, the
+profiler, the view and the duration. Only the newest ``PROFILING_KEEP`` are
+kept. The folded reports of one view add up to a profile of the view, see
+:func:`aggregate`.
+"""
+
+import cProfile
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+PROFILERS = ("sample", "cprofile")
+EXTENSIONS = {"sample": "folded", "cprofile": "prof"}
+
+_NAME = re.compile(r"^(?P<time>\d+)-(?P<kind>\w+)-(?P<view>[\w.-]+)-(?P<ms>\d+)\.(?:folded|prof)$")
+
+
+class Sampler:
+    """
+    Collects the stacks of the thread that entered it, below ``root``.
+
+    :param interval: Seconds between samples
+    :type interval: float
+    :param root: Code object of the outermost frame to keep, everything above it is the server
+    :type root: types.CodeType
+    """
+
+    def __init__(self, interval, root=None):
+        self.interval = interval
+        self.root = root
+        self.stacks = Counter()
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("{} ({}:{})".format(code.co_name, code.co_filename, code.co_firstlineno))
+                if code is self.root:
+                    break
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        """:return: The stacks in the collapsed format"""
+        return "".join("{} {}\n".format(stack, count) for stack, count in self.stacks.most_common())
+
+
+def profile(get_response, request, kind, root=None):
+    """
+    Serve ``request`` under a profiler.
+
+    :param kind: One of PROFILERS
+    :return: The response and the report, text for ``sample``, bytes for ``cprofile``
+    :rtype: tuple[HttpResponse, str | bytes]
+    """
+
+    if kind == "cprofile":
+        profiler = cProfile.Profile()
+        response = profiler.runcall(get_response, request)
+        profiler.create_stats()
+        return response, marshal.dumps(profiler.stats)
+
+    with Sampler(settings.PROFILING_INTERVAL, root) as sampler:
+        response = get_response(request)
+    return response, sampler.folded()
+
+
+def store(kind, view, seconds, report):
+    """
+    Write a report to ``PROFILING_DIR`` and drop the oldest beyond ``PROFILING_KEEP``.
+
+    :return: File name of the report
+    :rtype: str
+    """
+
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = "{}-{}-{}-{}.{}".format(
+        time.time_ns(), kind, re.sub(r"[^\w.-]", "_", view), int(seconds * 1000), EXTENSIONS[kind]
+    )
+    path = directory / name
+    if isinstance(report, str):
+        path.write_text(report)
+    else:
+        path.write_bytes(report)
+
+    reports = sorted(p for p in os.listdir(directory) if _NAME.match(p))
+    for old in reports[: max(0, len(reports) - settings.PROFILING_KEEP)]:
+        try:
+            (directory / old).unlink()
+        except FileNotFoundError:  # pragma: no cover - removed by another worker
+            pass
+    return name
+
+
+def reports():
+    """
+    :return: Stored reports, newest first, as dicts with name, kind, view and ms
+    :rtype: list[dict]
+    """
+
+    directory = Path(settings.PROFILING_DIR)
+    if not directory.is_dir():
+        return []
+    found = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        match = _NAME.match(name)
+        if match:
+            found.append({"name": name, "kind": match["kind"], "view": match["view"], "ms": int(match["ms"])})
+    return found
+
+
+def report_path(name):
+    """:return: Path of a stored report, None for names that are not reports"""
+
+    if not _NAME.match(name):
+        return None
+    path = Path(settings.PROFILING_DIR) / name
+    return path if path.is_file() else None
+
+
+def summary():
+    """
+    :return: Per view: number of reports, their total and slowest duration in ms, slowest first
+    :rtype: list[dict]
+    """
+
+    views = defaultdict(lambda: {"reports": 0, "total_ms": 0, "max_ms": 0})
+    for report in reports():
+        entry = views[report["view"]]
+        entry["reports"] += 1
+        entry["total_ms"] += report["ms"]
+        entry["max_ms"] = max(entry["max_ms"], report["ms"])
+    return sorted(({"view": view, **entry} for view, entry in views.items()), key=lambda e: -e["total_ms"])
+
+
+def aggregate(view):
+    """
+    :return: The sampled stacks of every stored report of ``view``, added up in the collapsed format
+    :rtype: str
+    """
+
+    stacks = Counter()
+    for report in reports():
+        if report["view"] != view or report["kind"] != "sample":
+            continue
+        path = report_path(report["name"])
+        if path is None:  # pragma: no cover - pruned meanwhile
+            continue
+        for line in path.read_text().splitlines():
+            stack, _, count = line.rpartition(" ")
+            stacks[stack] += int(count)
+    return "".join("{} {}\n".format(stack, count) for stack, count in stacks.most_common())
@@ -0,0 +1,26 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.perf.metrics import registry
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    registry.inc("db_connections_created_total", database=connection.alias)
+
+
+@receiver(post_save, sender="blog.Submission")
+@receiver(post_save, sender="blog.Comment")
+def count_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        registry.inc("blog_writes_total", model=sender._meta.model_name)
+        registry.maybe_flush()
+
+
+@receiver(post_save, sender="blog.Vote")
+def count_vote(sender, instance, raw=False, **kwargs):
+    # New votes and changed ones alike, both are a write.
+    if not raw:
+        registry.inc("blog_writes_total", model="vote")
+        registry.maybe_flush()
@@ -0,0 +1,190 @@
+"""
+Tests for response compression and HTML minification.
+"""
+
+import gzip
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template import engines
+from django.test import Client, RequestFactory
+from django.urls import reverse
+
+from apps.perf import compression
+from apps.perf.compression import accepted_encoding, minify
+from apps.perf.loadtest import ensure_submission
+from apps.perf.metrics import registry
+from apps.perf.middleware import CompressionMiddleware
+
+BODY = "<div>\n    <p>" + "comment " * 500 + "</p>\n</div>\n"
+
+
+def serve(response, accept="gzip, deflate", csrf=False):
+    request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+    if csrf:
+        get_token(request)
+    return CompressionMiddleware(lambda r: response)(request)
+
+
+class TestMinify:
+    """Tests for minify"""
+
+    def test_indentation_and_spaces(self):
+        html = "<ul>\n    <li>a   b</li>\n\n    <li>c</li>  \n</ul>"
+        assert minify(html) == "<ul>\n<li>a b</li>\n\n<li>c</li>\n</ul>"
+
+    def test_preserved_elements(self):
+        preserved = "<textarea>\n  t  </textarea><script>\n  if (a)\n    b()\n</script>"
+        html = "<div>  x</div>\n  <pre>  a\n    b</pre>  " + preserved
+        assert minify(html) == "<div> x</div>\n<pre>  a\n    b</pre> " + preserved
+
+
+class TestAcceptedEncoding:
+    """Tests for accepted_encoding"""
+
+    def test_gzip(self, monkeypatch):
+        monkeypatch.setattr(compression, "brotli", None)
+        assert accepted_encoding("gzip, deflate, br") == "gzip"
+        assert accepted_encoding("br;q=1.0, gzip;q=0.5") == "gzip"
+        assert accepted_encoding("gzip;q=0, deflate") is None
+        assert accepted_encoding("") is None
+
+    def test_brotli_preferred_when_installed(self, monkeypatch):
+        monkeypatch.setattr(compression, "brotli", object())
+        assert accepted_encoding("gzip, br") == "br"
+        assert accepted_encoding("gzip, br;q=0") == "gzip"
+
+
+class TestCompressionMiddleware:
+    """Tests for CompressionMiddleware"""
+
+    def test_gzip(self):
+        response = HttpResponse(BODY)
+        response["ETag"] = '"abc"'
+
+        response = serve(response)
+
+        assert response["Content-Encoding"] == "gzip"
+        assert response["Vary"] == "Accept-Encoding"
+        assert response["ETag"] == 'W/"abc"'
+        assert int(response["Content-Length"]) == len(response.content) < len(BODY)
+        assert gzip.decompress(response.content).decode() == BODY
+
+    def test_json(self):
+        response = serve(JsonResponse({"results": ["x" * 10] * 200}))
+        assert json.loads(gzip.decompress(response.content))["results"][0] == "x" * 10
+
+    def test_not_accepted(self):
+        response = serve(HttpResponse(BODY), accept="identity")
+        assert not response.has_header("Content-Encoding")
+        assert response["Vary"] == "Accept-Encoding"
+        assert response.content.decode() == BODY
+
+    @pytest.mark.parametrize(
+        "response",
+        [
+            HttpResponse("<p>short</p>"),
+            HttpResponse(b"\x89PNG" * 1000, content_type="image/png"),
+            HttpResponse(BODY, headers={"Content-Encoding": "br"}),
+            HttpResponse(BODY, headers={"Cache-Control": "no-transform"}),
+        ],
+    )
+    def test_skipped(self, response):
+        body = response.content
+        response = serve(response)
+        assert response.content == body
+        assert not response.has_header("Vary")
+
+    def test_csrf_responses_skipped(self, settings):
+        assert serve(HttpResponse(BODY), csrf=True)["Content-Encoding"] == "gzip"
+
+        settings.COMPRESSION_SKIP_CSRF = True
+        assert not serve(HttpResponse(BODY), csrf=True).has_header("Content-Encoding")
+
+    def test_streaming(self):
+        chunks = [BODY.encode(), b"<p>tail</p>"]
+        response = serve(StreamingHttpResponse(iter(chunks)))
+
+        compressed = list(response.streaming_content)
+
+        assert response["Content-Encoding"] == "gzip"
+        # Every chunk is flushed on its own, not held back until the end.
+        assert len(compressed) == 3 and all(compressed[:2])
+        assert gzip.decompress(b"".join(compressed)) == b"".join(chunks)
+
+    def test_bytes_counted(self):
+        def sent():
+            counters = registry.snapshot()["counters"].get("http_response_bytes_total", {})
+            labels = [(dict(json.loads(key)), value) for key, value in counters.items()]
+            return {
+                label["stage"]: value
+                for label, value in labels
+                if label["view"] == "unresolved" and label["encoding"] == "gzip"
+            }
+
+        before = sent()
+        response = serve(HttpResponse(BODY))
+        after = sent()
+
+        assert after["rendered"] - before.get("rendered", 0) == len(BODY)
+        assert after["sent"] - before.get("sent", 0) == len(response.content)
+
+
+class TestMinifiedTemplates:
+    """Tests for HTML_MINIFY in the template backend"""
+
+    def test_html_templates_minified(self, settings):
+        template = engines["django"].get_template("403.html")
+        rendered = template.render()
+
+        settings.HTML_MINIFY = True
+        assert template.render() == minify(rendered) != rendered
+
+    def test_off_by_default(self):
+        template = engines["django"].from_string("<p>\n    a    b</p>")
+        assert template.render() == "<p>\n    a    b</p>"
+
+
+@pytest.mark.django_db
+class TestPages:
+    """Tests for compression of whole pages"""
+
+    def test_logged_in_comments_page(self):
+        submission = ensure_submission(comments=5)
+        client = Client()
+        client.force_login(submission.author)
+
+        response = client.get(reverse("apps.blog:post", args=[submission.id]), HTTP_ACCEPT_ENCODING="gzip")
+
+        assert response.status_code == 200
+        assert response["Content-Encoding"] == "gzip"
+        # The logout form's CSRF token does not keep the page uncompressed.
+        assert b"csrfmiddlewaretoken" in gzip.decompress(response.content)
+
+
+@pytest.mark.django_db
+class TestPageSizes:
+    """Tests for the page_sizes command"""
+
+    def test_reports_every_page(self):
+        out = StringIO()
+        call_command("page_sizes", comments=5, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        assert lines[0].split()[:3] == ["endpoint", "rendered", "minified"]
+        rows = {line.split()[0]: line.split() for line in lines[1:] if line.split()[1].isdigit()}
+        assert set(rows) == {"frontpage", "comments"}
+        for row in rows.values():
+            assert int(row[2]) < int(row[1])
+            assert int(row[3]) < int(row[2])
+
+    def test_csrf_exclusion_reported(self, settings):
+        settings.COMPRESSION_SKIP_CSRF = True
+        out = StringIO()
+        call_command("page_sizes", comments=5, stdout=out)
+
+        assert "uncompressed" in out.getvalue()
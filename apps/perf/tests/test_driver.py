@@ -0,0 +1,102 @@
+"""
+Tests for the scenario load driver.
+"""
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from apps.blog.models import Comment, Vote
+from apps.perf.driver import Sample, Stats, WSGISession, check_slos, log_in, prepare_target, run, summarise
+from apps.perf.loadtest import ensure_submission, request_host
+
+
+class TestSummary:
+    """Tests for summarise and check_slos"""
+
+    def test_summarise(self):
+        samples = [Sample("a", 200, 0.1), Sample("a", 500, 0.3), Sample("b", 302, 0.2), Sample("b", 0, 1.0)]
+
+        stats = summarise(samples, wall=2.0)
+
+        assert [s.endpoint for s in stats] == ["a", "b", "all"]
+        assert [s.errors for s in stats] == [1, 1, 2]
+        assert stats[2].throughput == 2.0
+        assert stats[0].p50 == 0.1 and stats[2].p99 == 1.0
+
+    def test_check_slos(self):
+        stats = [Stats("comments", 100, 2, 10.0, 0.05, 0.25, 0.4), Stats("all", 100, 2, 10.0, 0.05, 0.25, 0.4)]
+
+        assert check_slos(stats, {"comments": {"p95": 300, "p99": 500}, "all": {"error_rate": 0.05}}) == []
+        assert check_slos(stats, {"comments": {"p95": 200}, "all": {"error_rate": 0.01}, "vote": {"p50": 1}}) == [
+            "comments p95 is 250.0ms, objective 200ms",
+            "all error_rate is 2.00%, objective 1.00%",
+            "no requests recorded for vote",
+        ]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRun:
+    """Tests for running scenarios, the threads and processes need committed data"""
+
+    @pytest.fixture
+    def target(self):
+        ensure_submission(comments=10)
+        return prepare_target(users=3, threads=2)
+
+    def test_session_logs_in(self, target):
+        from config.wsgi import application
+
+        session = WSGISession(application, request_host())
+        assert log_in(session, *target.credentials[0])
+        assert "sessionid" in session.cookies and "csrftoken" in session.cookies
+        status, body = session.get("comments", "/blog/comments/{}".format(target.threads[0]))
+        assert status == 200 and b"Load test thread" in body
+
+    def test_scenarios(self, target):
+        comments = Comment.objects.count()
+
+        # Concurrent, votes and comments must not deadlock on comment and user rows.
+        report = run(target, 12, mix={"vote": 1, "comment": 1}, threads=4)
+
+        by_endpoint = {s.endpoint: s for s in report.stats}
+        assert {"login", "comments", "vote_batch", "post_comment"} <= set(by_endpoint)
+        assert all(s.errors == 0 for s in report.stats)
+        assert Comment.objects.count() == comments + by_endpoint["post_comment"].requests
+        assert Vote.objects.exists()
+
+    def test_processes(self, target):
+        report = run(target, 12, mix={"browse": 3, "login": 1}, processes=2, threads=2)
+
+        assert report.stats[-1].requests >= 12 * 3
+        assert all(s.errors == 0 for s in report.stats)
+
+    def test_arrival_rate(self, target):
+        report = run(target, 6, mix={"browse": 1}, rate=50, threads=2)
+
+        assert report.lag_p99 is not None
+        assert {s.endpoint for s in report.stats} == {
+            "login_page",
+            "login",
+            "frontpage",
+            "comments",
+            "comment_votes",
+            "all",
+        }
+
+    def test_http(self, target, live_server):
+        report = run(target, 4, mix={"browse": 1, "login": 1}, threads=2, base_url=live_server.url)
+
+        assert report.stats[-1].requests > 4
+        assert all(s.errors == 0 for s in report.stats)
+
+    def test_command_meets_slos(self, target, capsys, settings):
+        # Latency objectives would depend on the machine.
+        settings.LOADTEST_SLOS = {"all": {"error_rate": 0}}
+        call_command("load_driver", "--visits", "4", "--users", "3")
+        assert "All objectives met" in capsys.readouterr().out
+
+    def test_command_fails_on_slo(self, target, settings):
+        settings.LOADTEST_SLOS = {}
+        # No request is answered in 0ms.
+        with pytest.raises(CommandError, match="all p50 is"):
+            call_command("load_driver", "--visits", "4", "--users", "3", "--slo", "all:p50=0")
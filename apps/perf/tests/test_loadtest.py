@@ -0,0 +1,75 @@
+"""
+Tests for the in-process load test.
+"""
+
+import pytest
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.urls import reverse
+
+from apps.perf.loadtest import default_targets, ensure_submission, log_in, percentile, request, request_host, run_mode
+from config.gunicorn import default_threads, default_workers
+
+
+class TestPercentile:
+    """Tests for percentile"""
+
+    def test_nearest_rank(self):
+        values = list(range(100, 0, -1))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile(values, 100) == 100
+        assert percentile([7], 99) == 7
+
+    def test_empty(self):
+        assert percentile([], 99) is None
+
+
+class TestSizing:
+    """Tests for the worker sizing in config/gunicorn.py"""
+
+    def test_sync_gets_more_processes(self):
+        assert default_workers("sync", 4) == 9
+        assert default_workers("gthread", 4) == 5
+        assert default_threads("sync") == 1
+        assert default_threads("gthread") == 4
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunMode:
+    """Tests for run_mode, the forked workers need committed data"""
+
+    def test_ensure_submission_is_reused(self):
+        submission = ensure_submission(comments=5)
+        submission.refresh_from_db()
+        assert submission.comment_count == 5
+        assert ensure_submission(comments=5) == submission
+
+    @pytest.mark.parametrize("mode,concurrency", [("sync", 1), ("gthread", 2)])
+    def test_every_request_served(self, mode, concurrency):
+        targets = default_targets(ensure_submission(comments=5))
+
+        results = run_mode(mode, targets, requests=8, workers=2, concurrency=concurrency)
+
+        assert [r.endpoint for r in results] == ["frontpage", "comments", "all"]
+        assert [r.requests for r in results] == [4, 4, 8]
+        assert all(r.errors == 0 for r in results)
+        assert all(r.p99 >= r.p50 > 0 for r in results)
+
+    def test_comments_served_logged_in(self):
+        submission = ensure_submission(comments=5)
+        host = request_host()
+        application = WSGIHandler()
+
+        # Anonymous readers are sent to the login page.
+        assert request(application, reverse("apps.blog:post", args=[submission.id]), host)[0] == 302
+        cookie = log_in(application, host)
+        assert "sessionid=" in cookie and "csrftoken=" in cookie
+        assert request(application, reverse("apps.blog:post", args=[submission.id]), host, cookie)[0] == 200
+
+    def test_command(self, capsys):
+        call_command("loadtest", "--requests", "4", "--workers", "1", "--comments", "3")
+
+        out = capsys.readouterr().out
+        assert "gthread" in out
+        assert out.count("comments") == 2
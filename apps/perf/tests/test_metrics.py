@@ -0,0 +1,141 @@
+"""
+Tests for the metrics registry, its multi-process aggregation and /metrics.
+"""
+
+import json
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from apps.blog.models import Submission, Comment
+from apps.perf.metrics import collect, registry, render
+from apps.user.models import User
+
+DEAD_PID = 999999999
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+def worker_file(directory, pid, requests):
+    data = {"counters": {"http_requests_total": {json.dumps([["view", "frontpage"]]): requests}}, "histograms": {}}
+    (directory / "{}.json".format(pid)).write_text(json.dumps(data))
+
+
+def requests_total(snapshot):
+    return snapshot["counters"]["http_requests_total"][json.dumps([["view", "frontpage"]])]
+
+
+class TestRegistry:
+    """Tests for Registry and render"""
+
+    def test_histogram_exposition(self):
+        for seconds in (0.003, 0.005, 0.2, 30):
+            registry.observe("http_request_duration_seconds", seconds, view="frontpage")
+
+        text = render(registry.snapshot())
+
+        assert "# TYPE http_request_duration_seconds histogram" in text
+        assert 'http_request_duration_seconds_bucket{view="frontpage",le="0.005"} 2' in text
+        assert 'http_request_duration_seconds_bucket{view="frontpage",le="0.25"} 3' in text
+        assert 'http_request_duration_seconds_bucket{view="frontpage",le="10.0"} 3' in text
+        assert 'http_request_duration_seconds_bucket{view="frontpage",le="+Inf"} 4' in text
+        assert 'http_request_duration_seconds_count{view="frontpage"} 4' in text
+
+    def test_labels_escaped(self):
+        registry.inc("http_requests_total", view='a"b\\c')
+        assert 'http_requests_total{view="a\\"b\\\\c"} 1' in render(registry.snapshot())
+
+    def test_forked_process_starts_empty(self):
+        registry.inc("http_requests_total", view="frontpage")
+        registry.pid = -1  # as seen from a forked child
+
+        assert registry.snapshot()["counters"] == {}
+
+
+class TestCollect:
+    """Tests for collect across worker files"""
+
+    def test_sums_live_workers_and_archives_dead_ones(self, metrics_dir):
+        import os
+
+        registry.inc("http_requests_total", view="frontpage")
+        worker_file(metrics_dir, os.getppid(), 10)
+        worker_file(metrics_dir, DEAD_PID, 100)
+
+        assert requests_total(collect()) == 111
+        assert not (metrics_dir / "{}.json".format(DEAD_PID)).exists()
+        # The dead worker's counts survive in the archive.
+        assert requests_total(collect()) == 111
+
+    def test_flush_writes_own_file(self, metrics_dir):
+        registry.inc("http_requests_total", view="frontpage")
+        registry.maybe_flush()
+
+        data = json.loads((metrics_dir / "{}.json".format(registry.pid)).read_text())
+        assert requests_total(data) == 1
+
+
+class TestCacheMetrics:
+    """Tests for the hit and miss counters of the timed cache backends"""
+
+    def test_hits_and_misses(self):
+        assert cache.get("blog-thread:1") is None
+        cache.set("blog-thread:1", "html")
+        assert cache.get("blog-thread:1") == "html"
+        assert cache.get_many(["blog-thread:1", "blog-thread:2"]) == {"blog-thread:1": "html"}
+
+        counters = registry.snapshot()["counters"]["cache_requests_total"]
+        assert counters[json.dumps([["cache", "blog-thread"], ["result", "hit"]])] == 2
+        assert counters[json.dumps([["cache", "blog-thread"], ["result", "miss"]])] == 2
+
+
+@pytest.mark.django_db
+class TestMetricsView:
+    """Tests for the /metrics endpoint"""
+
+    def test_forbidden_without_staff_or_token(self, client):
+        assert client.get(reverse("metrics")).status_code == 403
+        client.force_login(User.objects.create_user(username="test_user", password="test_password"))
+        assert client.get(reverse("metrics")).status_code == 403
+
+    def test_token(self, client, settings):
+        settings.METRICS_TOKEN = "secret"
+
+        assert client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+        assert client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret").status_code == 200
+
+    def test_exposition(self, client):
+        staff = User.objects.create_user(username="test_user", password="test_password", is_staff=True)
+        client.force_login(staff)
+        submission = Submission.objects.create(title="test_submission")
+        Comment.create(author=staff, content="test comment", parent=submission).save()
+        client.get(reverse("apps.blog:post", args=[submission.id]))
+
+        response = client.get(reverse("metrics"))
+
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        text = response.content.decode()
+        assert 'http_requests_total{method="GET",status="200",view="apps.blog:post"} 1' in text
+        assert 'http_request_duration_seconds_count{view="apps.blog:post"} 1' in text
+        assert 'blog_writes_total{model="comment"} 1' in text
+        assert 'blog_writes_total{model="submission"} 1' in text
+        assert "# TYPE db_connections gauge" in text
+        assert 'db_connections{database="default",state="active"}' in text
@@ -0,0 +1,144 @@
+"""
+Tests for the object cache.
+"""
+
+import time
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from apps.blog.models import Comment, Submission
+from apps.blog.purge import soft_delete_submission
+from apps.blog.utils.objects import get_submission, submissions
+from apps.perf.objects import LRU
+from apps.user.jobs import adjust_karma
+from apps.user.models import User
+from apps.user.utils.objects import users
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username="test_author", password="test_password")
+
+
+@pytest.fixture
+def submission(author):
+    return Submission.objects.create(title="test_submission", author=author)
+
+
+class TestLRU:
+    """Tests for LRU"""
+
+    def test_evicts_least_recently_used(self):
+        lru = LRU(2)
+        lru.set("a", 1, 60)
+        lru.set("b", 2, 60)
+        assert lru.get("a") == 1
+        lru.set("c", 3, 60)
+
+        assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+        assert len(lru) == 2
+
+    def test_expires(self):
+        lru = LRU(2)
+        lru.set("a", 1, 0.01)
+        time.sleep(0.02)
+
+        assert lru.get("a") is None
+        assert len(lru) == 0
+
+
+@pytest.mark.django_db
+class TestObjectCache:
+    """Tests for ObjectCache and its invalidation"""
+
+    def test_tiers(self, submission, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert submissions.get(submission.pk).title == "test_submission"
+        with django_assert_num_queries(0):
+            first = submissions.get(submission.pk)
+            submissions.local.clear()
+            second = submissions.get(submission.pk)
+        assert first == second and first is not second
+        with django_assert_num_queries(1):
+            assert submissions.get(0) is None
+
+    def test_save_and_delete_invalidate(self, submission, django_capture_on_commit_callbacks):
+        submissions.get(submission.pk)
+        with django_capture_on_commit_callbacks(execute=True):
+            Submission.objects.filter(pk=submission.pk).update(title="changed behind its back")
+            submission.title = "changed"
+            submission.save()
+
+        assert submissions.get(submission.pk).title == "changed"
+        submission.delete()
+        assert submissions.get(submission.pk) is None
+
+    def test_counters_invalidate(self, submission, author):
+        assert get_submission(submission.pk).comment_count == 0
+        assert users.get(author.pk).comment_count == 0
+
+        Comment.create(author=author, content="comment", parent=submission).save()
+
+        assert get_submission(submission.pk).comment_count == 1
+        assert users.get(author.pk).comment_count == 1
+        soft_delete_submission(submission)
+        assert get_submission(submission.pk) is None
+        assert users.get(author.pk).submission_count == 0
+
+    def test_author_from_user_cache(self, submission, author, django_assert_num_queries):
+        get_submission(submission.pk)
+        with django_assert_num_queries(0):
+            assert get_submission(submission.pk).author_name == "test_author"
+
+        author.mark_deleted()
+        assert get_submission(submission.pk).author_name == "deleted user"
+
+    def test_get_by_alias(self, author, django_assert_num_queries):
+        assert users.get_by("test_author") == author
+        with django_assert_num_queries(0):
+            assert users.get_by("test_author") == author
+
+        author.username = "test_renamed"
+        author.save()
+
+        assert users.get_by("test_author") is None
+        assert users.get_by("test_renamed") == author
+
+
+@pytest.mark.django_db
+class TestViews:
+    """Tests for views served from the object cache"""
+
+    def test_deleted_submission_is_gone(self, submission, author):
+        client = Client()
+        client.force_login(author)
+        assert client.get(reverse("apps.blog:post", args=[submission.pk])).status_code == 200
+
+        client.post(reverse("apps.blog:delete_post", args=[submission.pk]))
+
+        assert client.get(reverse("apps.blog:post", args=[submission.pk])).status_code == 404
+
+    def test_update_keeps_newer_columns(self, submission, author):
+        client = Client()
+        client.force_login(author)
+        get_submission(submission.pk)
+        # Written by another worker, whose invalidation this process's LRU never sees.
+        Submission.objects.filter(pk=submission.pk).update(comment_count=5, deleted=True)
+
+        client.post(reverse("apps.blog:update_post", args=[submission.pk]), {"title": "new title", "content": "x"})
+
+        submission.refresh_from_db()
+        assert (submission.title, submission.comment_count, submission.deleted) == ("new title", 5, True)
+
+    def test_profile_shows_new_karma(self, author):
+        client = Client()
+        client.force_login(author)
+        url = reverse("apps.user:user_profile", args=["test_author"])
+        assert client.get(url).context["profile"].karma == 0
+
+        adjust_karma([{"user_id": author.pk, "delta": 3}])
+
+        assert client.get(url).context["profile"].karma == 3
+        assert client.get(reverse("apps.user:user_profile", args=["nobody"])).status_code == 404
@@ -0,0 +1,128 @@
+"""
+Tests for request profiling.
+"""
+
+import pstats
+import time
+
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import Client
+from django.urls import reverse
+
+from apps.perf import profiling
+from apps.perf.middleware import ProfilingMiddleware
+from apps.user.models import User
+
+
+@pytest.fixture
+def store(settings, tmp_path):
+    settings.PROFILING_DIR = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def staff_client():
+    client = Client()
+    client.force_login(User.objects.create_user(username="test_staff", password="test_password", is_staff=True))
+    return client
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestSampler:
+    """Tests for Sampler and the store"""
+
+    def test_collects_stacks_below_root(self):
+        with profiling.Sampler(0.001, root=TestSampler.test_collects_stacks_below_root.__code__) as sampler:
+            busy(0.05)
+
+        folded = sampler.folded()
+        assert sum(sampler.stacks.values()) > 5
+        first = folded.splitlines()[0]
+        assert first.startswith("test_collects_stacks_below_root (")
+        assert ";busy (" in first
+        assert "pytest" not in folded
+
+    def test_store_keeps_the_newest(self, settings, store):
+        settings.PROFILING_KEEP = 2
+        names = [profiling.store("sample", "apps.blog:post", 0.01 * i, "a;b {}\n".format(i)) for i in range(1, 4)]
+
+        assert [r["name"] for r in profiling.reports()] == names[:0:-1]
+        assert profiling.aggregate("apps.blog_post") == "a;b 5\n"
+        assert profiling.summary() == [{"view": "apps.blog_post", "reports": 2, "total_ms": 50, "max_ms": 30}]
+        assert profiling.report_path("../etc/passwd") is None
+
+
+@pytest.mark.django_db
+class TestMiddleware:
+    """Tests for ProfilingMiddleware"""
+
+    def test_not_loaded_when_off(self, settings):
+        settings.PROFILING_ON_DEMAND = False
+        settings.PROFILING_SAMPLE_RATE = 0
+        with pytest.raises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: None)
+
+    def test_staff_only(self, store):
+        response = Client().get(reverse("frontpage"), {"profile": "cprofile"})
+
+        assert response.status_code == 200
+        assert "X-Profile-Report" not in response
+        assert profiling.reports() == []
+
+    def test_cprofile(self, store, staff_client):
+        response = staff_client.get(reverse("frontpage"), {"profile": "cprofile"})
+
+        report = profiling.reports()[0]
+        assert response["X-Profile-Report"] == reverse("profile_report", args=[report["name"]])
+        assert (report["kind"], report["view"]) == ("cprofile", "frontpage")
+        stats = pstats.Stats(str(store / report["name"]))
+        assert any(func[2] == "frontpage" for func in stats.stats)
+
+        download = staff_client.get(response["X-Profile-Report"])
+        assert download["Content-Disposition"].startswith("attachment")
+
+    def test_header_sample(self, settings, store, staff_client):
+        settings.PROFILING_INTERVAL = 0.0005
+        response = staff_client.get(reverse("frontpage"), HTTP_X_PROFILE="1")
+
+        assert profiling.reports()[0]["kind"] == "sample"
+        report = staff_client.get(response["X-Profile-Report"])
+        assert report["Content-Type"].startswith("text/plain")
+
+    def test_one_in_n(self, settings, store):
+        settings.PROFILING_ON_DEMAND = False
+        settings.PROFILING_SAMPLE_RATE = 2
+        client = Client()
+        for _ in range(4):
+            response = client.get(reverse("frontpage"))
+            assert "X-Profile-Report" not in response
+
+        assert [r["view"] for r in profiling.reports()] == ["frontpage", "frontpage"]
+
+
+@pytest.mark.django_db
+class TestViews:
+    """Tests for the profile views"""
+
+    def test_staff_only(self, store):
+        client = Client()
+        assert client.get(reverse("profiles")).status_code == 403
+        assert client.get(reverse("profile_view", args=["frontpage"])).status_code == 403
+
+    def test_list_and_aggregate(self, store, staff_client):
+        profiling.store("sample", "frontpage", 0.02, "a;b 2\na 1\n")
+        profiling.store("sample", "frontpage", 0.01, "a;b 1\n")
+
+        listing = staff_client.get(reverse("profiles")).json()
+        assert listing["views"] == [{"view": "frontpage", "reports": 2, "total_ms": 30, "max_ms": 20}]
+        assert len(listing["reports"]) == 2
+
+        response = staff_client.get(reverse("profile_view", args=["frontpage"]))
+        assert response.content == b"a;b 3\na 1\n"
+        assert staff_client.get(reverse("profile_report", args=["missing"])).status_code == 404
@@ -0,0 +1,117 @@
+"""
+Tests for the per-request timing middleware, header and log.
+"""
+
+import json
+import logging
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from apps.blog.models import Submission
+from apps.perf import timing
+from apps.perf.log import JsonFormatter
+from apps.user.models import User
+
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+@pytest.fixture
+def submission():
+    return Submission.objects.create(title="test_submission")
+
+
+def login(client, **extra):
+    user = User.objects.create_user(username="test_user", password="test_password", **extra)
+    client.force_login(user)
+    return user
+
+
+def request_records(caplog):
+    return [r for r in caplog.records if r.name == "apps.perf.requests"]
+
+
+class TestTrack:
+    """Tests for track outside and inside a request"""
+
+    def test_noop_outside_request(self):
+        with timing.track("db"):
+            pass
+        assert timing.current() is None
+
+    def test_nested_same_kind_counted_once(self):
+        token = timing.start()
+        try:
+            with timing.track("cache"):
+                with timing.track("cache"):
+                    pass
+            cache.get("key")
+            timings = timing.current()
+        finally:
+            timing.stop(token)
+
+        assert timings.calls == {"cache": 2}
+
+
+@pytest.mark.django_db
+class TestTimingMiddleware:
+    """Tests for TimingMiddleware"""
+
+    def test_staff_gets_server_timing(self, client, submission):
+        login(client, is_staff=True)
+
+        response = client.get(reverse("apps.blog:post", args=[submission.id]))
+
+        header = response["Server-Timing"]
+        metrics = [part.split(";")[0] for part in header.split(", ")]
+        assert metrics == ["db", "cache", "template", "view", "total"]
+        assert "queries" in header
+
+    def test_no_header_for_others(self, client, submission):
+        assert "Server-Timing" not in client.get(reverse("frontpage"))
+        login(client)
+        assert "Server-Timing" not in client.get(reverse("apps.blog:post", args=[submission.id]))
+
+    def test_one_log_line_per_request(self, client, submission, caplog):
+        login(client)
+
+        with caplog.at_level(logging.INFO, logger="apps.perf.requests"):
+            client.get(reverse("apps.blog:post", args=[submission.id]))
+
+        (record,) = request_records(caplog)
+        fields = record.fields
+        assert fields["view"] == "apps.blog:post"
+        assert fields["status"] == 200
+        assert fields["db_queries"] > 0
+        assert fields["total_ms"] >= fields["view_ms"] >= fields["template_ms"] > 0
+
+    def test_cache_time_tracked(self, client, caplog):
+        Submission.objects.bulk_create([Submission(title=str(i)) for i in range(3)])
+
+        with caplog.at_level(logging.INFO, logger="apps.perf.requests"):
+            client.get(reverse("frontpage"))
+
+        (record,) = request_records(caplog)
+        # The paginator's cached count: a miss and the set.
+        assert record.fields["cache_calls"] == 2
+        assert "cache_ms" in record.fields
+
+
+class TestJsonFormatter:
+    """Tests for JsonFormatter"""
+
+    def test_fields_merged(self):
+        record = logging.LogRecord("apps.perf.requests", logging.INFO, __file__, 1, "GET %s", ("/",), None)
+        record.fields = {"status": 200, "total_ms": 1.5}
+
+        data = json.loads(JsonFormatter().format(record))
+
+        assert data["message"] == "GET /"
+        assert data["status"] == 200
+        assert data["total_ms"] == 1.5
+        assert data["level"] == "INFO"
@@ -0,0 +1,89 @@
+"""
+Per-request timing of the database, cache, template and view work.
+
+``TimingMiddleware`` opens a ``Timings`` record for every request; code
+running on the request's thread adds to it with ``track(kind)``. Database
+queries are tracked by a connection execute wrapper, template rendering by
+``apps.perf.backends.TimedDjangoTemplates`` and the cache by the backends
+in ``apps.perf.cache``. Outside of a request ``track`` does nothing.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("perf_timings", default=None)
+
+
+class Timings:
+    """Seconds spent and number of calls per kind of work for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = {}
+        self.calls = {}
+        # Kinds being tracked right now, nested calls of the same kind are not counted twice.
+        self.active = set()
+
+    def add(self, kind, seconds):
+        self.seconds[kind] = self.seconds.get(kind, 0.0) + seconds
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+
+    def elapsed(self):
+        """:return: Seconds since the request started"""
+        return time.perf_counter() - self.started
+
+    def as_ms(self):
+        """:return: Milliseconds per kind, rounded for logging"""
+        return {kind: round(seconds * 1000, 2) for kind, seconds in self.seconds.items()}
+
+
+def current():
+    """:return: Timings of the request being served, None outside a request"""
+
+    return _current.get()
+
+
+def start():
+    """
+    Begin timing a request.
+
+    :return: Token for ``stop``
+    """
+
+    return _current.set(Timings())
+
+
+def stop(token):
+    """Stop timing the request started with ``token``."""
+
+    _current.reset(token)
+
+
+@contextmanager
+def track(kind):
+    """
+    Add the time spent in the block to the current request's ``kind``.
+
+    :param kind: Kind of work, e.g. "db", "cache" or "template"
+    :type kind: str
+    """
+
+    timings = _current.get()
+    if timings is None or kind in timings.active:
+        yield
+        return
+    timings.active.add(kind)
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(kind)
+        timings.add(kind, time.perf_counter() - began)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Connection execute wrapper tracking query time as "db"."""
+
+    with track("db"):
+        return execute(sql, params, many, context)
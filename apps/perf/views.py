@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from apps.perf import profiling
+from apps.perf.metrics import collect, render
+
+
+def connection_gauges():
+    """
+    Server-side connection counts per database and state, every worker's
+    pool (and every other client) included. Postgres only.
+
+    :return: Gauge in the format ``metrics.render`` expects
+    :rtype: tuple
+    """
+
+    samples = []
+    for alias in connections:
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT coalesce(state, 'unknown'), count(*) FROM pg_stat_activity "
+                "WHERE datname = current_database() GROUP BY 1"
+            )
+            samples += [({"database": alias, "state": state}, count) for state, count in cursor.fetchall()]
+    return ("db_connections", "Connections to the database server, by state.", samples)
+
+
+def allowed(request):
+    """Staff users, or scrapers sending ``Authorization: Bearer <METRICS_TOKEN>``."""
+
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(request.headers.get("Authorization", ""), "Bearer " + token):
+        return True
+    return request.user.is_staff
+
+
+@require_GET
+def metrics(request):
+    """
+    Serves the metrics of all workers in the Prometheus text format.
+    """
+
+    if not allowed(request):
+        return HttpResponseForbidden()
+    body = render(collect(), gauges=[connection_gauges()])
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@require_GET
+def profiles(request):
+    """
+    Lists the stored profiles, newest first, and their durations per view.
+    """
+
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    return JsonResponse({"views": profiling.summary(), "reports": profiling.reports()})
+
+
+@require_GET
+def profile_report(request, name):
+    """
+    Serves one stored profile, folded stacks as text, cProfile dumps as pstats files.
+    """
+
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    path = profiling.report_path(name)
+    if path is None:
+        raise Http404
+    if path.suffix == ".folded":
+        return FileResponse(path.open("rb"), content_type="text/plain; charset=utf-8")
+    return FileResponse(path.open("rb"), as_attachment=True, content_type="application/octet-stream")
+
+
+@require_GET
+def profile_view(request, view):
+    """
+    Serves the sampled stacks of every stored profile of a view, added up, as folded text.
+    """
+
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(profiling.aggregate(view), content_type="text/plain; charset=utf-8")
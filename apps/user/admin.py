@@ -3,12 +3,41 @@ from django.contrib import admin
 # Register your models here.
 from ..blog.admin import SubmissionInline
 from .models import User
+from .utils.usernames import USERNAME_KEY, USERNAME_PREFIX
 
 
 class UserAdmin(admin.ModelAdmin):
+    list_display = ("username", "email", "karma", "date_joined", "is_staff", "deleted_at")
+    # Case-insensitive prefix search, also used by the blog autocompletes, see get_search_results.
+    search_fields = ("^username",)
+    ordering = ("username",)
+    show_full_result_count = False
     inlines = [
         SubmissionInline,
     ]
 
+    def get_search_results(self, request, queryset, search_term):
+        # "^username" compiles to UPPER("username"::text) LIKE ..., which no index serves.
+        # Compare USERNAME_KEY instead, a range scan of user_user_username_upper_idx.
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if not USERNAME_PREFIX.match(search_term):
+            return queryset.none(), False
+        return queryset.annotate(username_key=USERNAME_KEY).filter(username_key__startswith=search_term.upper()), False
+
+    # Deleting goes through User.mark_deleted, the content is detached in batches by a job.
+
+    def get_deleted_objects(self, objs, request):
+        # Don't collect every submission, comment and vote of the account for the confirmation page.
+        return [str(obj) for obj in objs], {self.opts.verbose_name_plural: len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        obj.mark_deleted()
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            user.mark_deleted()
+
 
 admin.site.register(User, UserAdmin)
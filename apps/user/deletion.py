@@ -0,0 +1,80 @@
+"""
+Deleting accounts without one huge SET NULL transaction.
+
+``User.delete()`` makes the collector null ``author`` on every submission
+and comment and ``user`` on every vote of the account in one transaction.
+``User.mark_deleted`` instead disables the account at once, from then on
+it is shown as "deleted user", and queues ``user.anonymise``, which
+detaches its rows in bounded batches, one short transaction each, and
+deletes the user row when nothing refers to it any more.
+
+Votes are kept with ``user`` set to NULL, so the scores and karma they
+gave other users stay as they are. The account's notifications are
+deleted in batches too, last.
+"""
+
+import logging
+
+from django.db import transaction
+
+from apps.blog.models import Comment, Notification, Submission, Vote
+from apps.perf.objects import invalidate
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# (model, field pointing at the user) in the order they are detached.
+AUTHORED = (
+    (Submission, "author"),
+    (Comment, "author"),
+    (Vote, "user"),
+)
+
+
+def anonymise_batch(user_id, batch_size=BATCH_SIZE):
+    """
+    Detach one batch of rows from a deleted account.
+
+    :param user_id: ID of a user marked deleted
+    :type user_id: int
+    :param batch_size: Maximum rows updated in this batch
+    :type batch_size: int
+    :return: Rows detached per model name and whether the account is gone
+    :rtype: dict
+    """
+
+    progress = {"done": False}
+    with transaction.atomic():
+        if not User.objects.filter(pk=user_id, deleted_at__isnull=False).exists():
+            # Already removed or never deleted, nothing to do.
+            progress["done"] = True
+            return progress
+
+        room = batch_size
+        for model, field in AUTHORED:
+            if room <= 0:
+                break
+            ids = list(model.objects.filter(**{field: user_id}).values_list("pk", flat=True)[:room])
+            if ids:
+                progress[model._meta.model_name] = model.objects.filter(pk__in=ids).update(**{field: None})
+                invalidate(model, *ids)
+                room -= len(ids)
+
+        if room > 0:
+            # Without signals: the account's unread counter goes with it, and the collector
+            # would otherwise load and delete its notifications one by one.
+            ids = list(Notification.objects.filter(recipient_id=user_id).values_list("pk", flat=True)[:room])
+            if ids:
+                progress["notification"] = Notification.objects.filter(pk__in=ids)._raw_delete(Notification.objects.db)
+                room -= len(ids)
+
+        if room > 0:
+            # Everything detached: the collector has no SET NULL updates or cascades left to make.
+            User.objects.get(pk=user_id).delete()
+            progress["done"] = True
+
+    logger.info("anonymising user %s: %s", user_id, progress)
+    return progress
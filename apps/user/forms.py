@@ -2,6 +2,7 @@ from django import forms
 from django.core.validators import RegexValidator
 
 from .models import User
+from .utils.usernames import username_exists
 
 
 class UserForm(forms.ModelForm):
@@ -73,6 +74,14 @@ class UserForm(forms.ModelForm):
             "about_text",
         )
 
+    def clean_username(self):
+        username = self.cleaned_data["username"]
+        # Names differing only in case are taken too, the unique constraint would allow them.
+        # Not username_taken: its filter may not know names registered through other processes.
+        if username_exists(username):
+            raise forms.ValidationError("This username is already taken.", code="taken")
+        return username
+
 
 class UserUpdateForm(forms.ModelForm):
     first_name = forms.CharField(
@@ -0,0 +1,50 @@
+from collections import Counter
+
+from django.core.mail import send_mail as django_send_mail
+from django.db.models import F
+
+from apps.jobs.queue import enqueue
+from apps.jobs.registry import job
+from apps.perf.objects import invalidate
+
+from .deletion import BATCH_SIZE, anonymise_batch
+from .models import User
+
+
+@job("user.adjust_karma", batch=True)
+def adjust_karma(payloads):
+    """
+    Apply karma deltas from votes, one narrow UPDATE per affected user.
+    """
+
+    deltas = Counter()
+    for payload in payloads:
+        if payload.get("user_id"):
+            deltas[payload["user_id"]] += payload["delta"]
+
+    for user_id, delta in deltas.items():
+        if delta:
+            User.objects.filter(pk=user_id).update(karma=F("karma") + delta)
+            invalidate(User, user_id)
+
+
+@job("user.send_mail")
+def send_mail(payload):
+    django_send_mail(
+        subject=payload["subject"],
+        message=payload["message"],
+        from_email=None,
+        recipient_list=payload["recipient_list"],
+    )
+
+
+@job("user.anonymise")
+def anonymise(payload):
+    """
+    Detach one batch of a deleted account's content per run and queue the
+    next one until the account is gone.
+    """
+
+    batch_size = payload.get("batch_size", BATCH_SIZE)
+    if not anonymise_batch(payload["user_id"], batch_size)["done"]:
+        enqueue("user.anonymise", {"user_id": payload["user_id"], "batch_size": batch_size})
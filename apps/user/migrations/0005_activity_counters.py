@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-19 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0004_remove_user_comment_karma_remove_user_post_karma_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="comment_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="submission_count",
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-19 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("user", "0006_user_deleted_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="unread_notifications",
+            field=models.IntegerField(default=0),
+        ),
+    ]
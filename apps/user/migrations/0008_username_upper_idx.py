@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-19 19:55
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("user", "0007_user_unread_notifications"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate(django.db.models.functions.text.Upper("username"), "C"),
+                name="user_user_username_upper_idx",
+            ),
+        ),
+    ]
@@ -2,8 +2,12 @@ from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models.functions import Collate, Upper
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from apps.jobs.queue import enqueue
+
 
 class User(AbstractUser):
     email = models.EmailField(_("email address"), blank=True, null=True, unique=True)
@@ -15,9 +19,23 @@ class User(AbstractUser):
     username = models.CharField(max_length=20, unique=True, validators=[username_validator])
     about_text = models.TextField(blank=True, null=True, max_length=500, default=None)
     karma = models.IntegerField(default=0)  # how useful are this user's comments?
+    # Denormalised totals for the profile page, kept up to date by apps.blog.signals
+    submission_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    # Unread replies, shown on every page without a query, kept up to date by apps.blog.notifications
+    unread_notifications = models.IntegerField(default=0)
+    # Set when the account is deleted, the row itself goes once apps.user.deletion anonymised the content.
+    deleted_at = models.DateTimeField(null=True, blank=True)
 
     REQUIRED_FIELDS = ["email"]
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Case-insensitive lookups and prefix scans of usernames, see apps.user.utils.usernames.
+            # The "C" collation lets LIKE 'PREFIX%' use the index and orders it byte-wise.
+            models.Index(Collate(Upper("username"), "C"), name="user_user_username_upper_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if self.email:
             self.email = self.email.lower().strip()
@@ -25,5 +43,22 @@ class User(AbstractUser):
             self.email = None
         super(AbstractUser, self).save(*args, **kwargs)
 
+    def mark_deleted(self):
+        """
+        Delete the account: it can no longer log in and is shown as
+        "deleted user" at once, its submissions, comments and votes are
+        detached in background batches before the row is removed.
+        """
+
+        if self.deleted_at:
+            return
+        self.deleted_at = timezone.now()
+        self.is_active = False
+        self.email = None
+        # Also ends every session, their auth hash no longer matches.
+        self.set_unusable_password()
+        self.save(update_fields=["deleted_at", "is_active", "email", "password"])
+        enqueue("user.anonymise", {"user_id": self.pk})
+
     def __unicode__(self):
         return "<User:{}>".format(self.user.username)
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .utils.profile import invalidate_profile
+from .utils.usernames import remember_username
+
+
+@receiver(post_save, sender="blog.Submission")
+@receiver(post_delete, sender="blog.Submission")
+@receiver(post_save, sender="blog.Comment")
+@receiver(post_delete, sender="blog.Comment")
+def activity_changed(sender, instance, raw=False, **kwargs):
+    """New, edited and removed posts change their author's activity feed."""
+    if not raw and instance.author_id:
+        invalidate_profile(instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def username_saved(sender, instance, **kwargs):
+    """New and renamed users are taken at once in this process's username filter."""
+    remember_username(instance.username)
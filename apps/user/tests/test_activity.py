@@ -0,0 +1,116 @@
+"""
+Tests for the profile activity feed and the per-user counters.
+"""
+
+import re
+from datetime import timedelta
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blog.models import Submission, Comment
+from apps.user.models import User
+from apps.user.utils.activity import user_activity, encode_cursor, decode_cursor
+
+
+@pytest.fixture
+def client():
+    return Client()
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username="test_author", password="test_password")
+
+
+def make_activity(author, n):
+    """Alternate submissions and comments, all with distinct timestamps except one tie."""
+    base = timezone.now()
+    parent = Submission.objects.create(title="parent")
+    for i in range(n):
+        if i % 2:
+            obj = Comment.create(author=author, content=f"comment {i}", parent=parent)
+            obj.save()
+            model = Comment
+        else:
+            obj = Submission.objects.create(title=f"submission {i}", author=author)
+            model = Submission
+        # auto_now_add ignores assigned values, set the timestamp afterwards
+        model.objects.filter(pk=obj.pk).update(timestamp=base - timedelta(minutes=i // 2 * 2))
+
+
+@pytest.mark.django_db
+class TestCounters:
+    """Tests for denormalised submission_count and comment_count"""
+
+    def test_counters_follow_inserts_and_deletes(self, author):
+        submission = Submission.objects.create(title="test_submission", author=author)
+        comment = Comment.create(author=author, content="test_content", parent=submission)
+        comment.save()
+        author.refresh_from_db()
+        assert (author.submission_count, author.comment_count) == (1, 1)
+
+        comment.delete()
+        submission.delete()
+        author.refresh_from_db()
+        assert (author.submission_count, author.comment_count) == (0, 0)
+
+    def test_counters_follow_cascade(self, author):
+        submission = Submission.objects.create(title="test_submission", author=author)
+        Comment.create(author=author, content="test_content", parent=submission).save()
+        submission.delete()
+        author.refresh_from_db()
+        assert (author.submission_count, author.comment_count) == (0, 0)
+
+
+@pytest.mark.django_db
+class TestActivityFeed:
+    """Tests for keyset pagination of the activity feed"""
+
+    def test_cursor_roundtrip(self, author):
+        make_activity(author, 1)
+        item = user_activity(author)[0][0]
+        assert decode_cursor(encode_cursor(item)) == (item.obj.timestamp, 1, item.obj.id)
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_pages_cover_everything_once_newest_first(self, author):
+        make_activity(author, 11)
+        seen = []
+        cursor = None
+        while True:
+            items, cursor = user_activity(author, cursor=cursor, limit=3)
+            seen.extend(items)
+            if not cursor:
+                break
+
+        keys = [(i.obj.timestamp, i.kind, i.obj.id) for i in seen]
+        assert len(keys) == 11
+        assert len(set(keys)) == 11
+        assert [k[0] for k in keys] == sorted((k[0] for k in keys), reverse=True)
+
+    def test_page_query_count(self, author, django_assert_num_queries):
+        make_activity(author, 6)
+        with django_assert_num_queries(2):
+            user_activity(author, limit=3)
+
+    def test_profile_view(self, client, author):
+        make_activity(author, 30)
+        client.login(username="test_author", password="test_password")
+        url = reverse("apps.user:user_profile", kwargs={"username": "test_author"})
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.content.count(b'<article class="media content-section">') == 25
+        cursor = re.search(r'href="\?cursor=([\w-]+)"', response.content.decode())[1]
+
+        response = client.get(url, {"cursor": cursor})
+        assert response.content.count(b'<article class="media content-section">') == 5
+        assert b"?cursor=" not in response.content
+
+        response = client.get(url, {"cursor": "garbage"})
+        assert response.status_code == 404
@@ -0,0 +1,113 @@
+"""
+Tests for the account deletion pipeline.
+"""
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from apps.blog.models import Submission, Comment, Notification, Vote
+from apps.blog.utils.thread import thread_nodes
+from apps.jobs import queue
+from apps.jobs.models import Job
+from apps.user.deletion import anonymise_batch
+from apps.user.models import User
+
+
+@pytest.fixture
+def deferred(settings):
+    settings.JOBS_ALWAYS_EAGER = False
+
+
+@pytest.fixture
+def leaving():
+    return User.objects.create_user(username="leaving", email="leaving@example.com", password="test_password")
+
+
+@pytest.fixture
+def other():
+    return User.objects.create_user(username="other", password="test_password")
+
+
+@pytest.fixture
+def content(leaving, other):
+    """Two submissions and three comments by ``leaving``, who also upvoted a comment by ``other``."""
+    submissions = [Submission.objects.create(title=str(i), author=leaving) for i in range(2)]
+    for i in range(3):
+        Comment.create(author=leaving, content=str(i), parent=submissions[0]).save()
+    target = Comment.create(author=other, content="other", parent=submissions[0])
+    target.save()
+    Vote.create(user=leaving, comment=target, vote_value=1).save()
+    return submissions
+
+
+@pytest.mark.django_db
+class TestMarkDeleted:
+    """Tests for User.mark_deleted"""
+
+    def test_disabled_and_hidden_at_once(self, deferred, leaving, content):
+        client = Client()
+        client.force_login(leaving)
+
+        leaving.mark_deleted()
+
+        leaving.refresh_from_db()
+        assert leaving.deleted_at and not leaving.is_active and leaving.email is None
+        assert not leaving.has_usable_password()
+        assert Job.objects.filter(name="user.anonymise", status=Job.QUEUED).count() == 1
+        # Content still points at the account but reads as deleted.
+        assert Submission.objects.filter(author=leaving).count() == 2
+        assert Submission.objects.get(pk=content[0].pk).author_name == "deleted user"
+        names = {(n.author_id, n.author_name) for n in thread_nodes(Comment.objects.all())}
+        assert (None, "deleted user") in names
+        assert client.get(reverse("frontpage")).wsgi_request.user.is_anonymous
+        assert Client().get(reverse("apps.user:user_profile", args=["leaving"])).status_code in (302, 404)
+
+    def test_admin_delete_goes_through_pipeline(self, deferred, leaving, content):
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="test_password")
+        client = Client()
+        client.force_login(admin)
+        url = reverse("admin:user_user_delete", args=(leaving.pk,))
+
+        assert client.get(url).status_code == 200
+        client.post(url, {"post": "yes"})
+
+        leaving.refresh_from_db()
+        assert leaving.deleted_at
+        assert Job.objects.filter(name="user.anonymise").count() == 1
+
+
+@pytest.mark.django_db
+class TestAnonymise:
+    """Tests for anonymise_batch and the user.anonymise job"""
+
+    def test_batches(self, deferred, leaving, other, content):
+        queue.run_pending()  # the vote's karma
+        leaving.mark_deleted()
+
+        assert anonymise_batch(leaving.pk, batch_size=3) == {"done": False, "submission": 2, "comment": 1}
+        assert anonymise_batch(leaving.pk, batch_size=3) == {"done": False, "comment": 2, "vote": 1}
+        assert anonymise_batch(leaving.pk, batch_size=3) == {"done": True, "notification": 1}
+
+        assert not User.objects.filter(pk=leaving.pk).exists()
+        assert not Notification.objects.exists()
+        assert Comment.objects.filter(author=None).count() == 3
+        vote = Vote.objects.get()
+        assert vote.user_id is None and vote.value == 1
+        other.refresh_from_db()
+        assert other.karma == 1  # the vote still counts
+
+    def test_job_requeues_itself(self, deferred, leaving, content):
+        leaving.mark_deleted()
+        Job.objects.filter(name="user.anonymise").update(payload={"user_id": leaving.pk, "batch_size": 2})
+
+        runs = 0
+        while queue.run_pending():
+            runs += 1
+
+        assert runs == 4
+        assert not User.objects.filter(pk=leaving.pk).exists()
+
+    def test_live_user_untouched(self, leaving, content):
+        assert anonymise_batch(leaving.pk) == {"done": True}
+        assert Submission.objects.filter(author=leaving).count() == 2
@@ -0,0 +1,91 @@
+"""
+Tests for the cached profile activity and the user hovercard.
+"""
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from apps.blog.editing import edit_comment
+from apps.blog.models import Comment, Submission
+from apps.user.jobs import adjust_karma
+from apps.user.models import User
+from apps.user.utils.profile import activity_html
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username="test_author", password="test_password", first_name="Test")
+
+
+@pytest.fixture
+def submission(author):
+    return Submission.objects.create(title="test_submission", author=author)
+
+
+@pytest.fixture
+def client(author):
+    client = Client()
+    client.force_login(author)
+    return client
+
+
+@pytest.mark.django_db
+class TestActivityCache:
+    """Tests for activity_html and its invalidation"""
+
+    def test_first_page_cached(self, author, submission, django_assert_num_queries):
+        assert "test_submission" in activity_html(author)
+        with django_assert_num_queries(0):
+            assert "test_submission" in activity_html(author)
+        with django_assert_num_queries(2):
+            activity_html(author, cursor="MjAwMC0wMS0wMVQwMDowMDowMHwxfDE")
+
+    def test_posts_and_edits_invalidate(self, author, submission, django_capture_on_commit_callbacks):
+        activity_html(author)
+        with django_capture_on_commit_callbacks(execute=True):
+            comment = Comment.create(author=author, content="first words", parent=submission)
+            comment.save()
+        assert "first words" in activity_html(author)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            edit_comment(comment, "second thoughts")
+        assert "second thoughts" in activity_html(author)
+
+    def test_karma_keeps_cache(self, author, submission, client, django_capture_on_commit_callbacks):
+        url = reverse("apps.user:user_profile", args=["test_author"])
+        client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            adjust_karma([{"user_id": author.pk, "delta": 5}])
+
+        response = client.get(url)
+        assert response.context["profile"].karma == 5
+        assert b"<strong> 5 </strong>" in response.content
+        assert "test_submission" in response.context["activity_html"]
+
+
+@pytest.mark.django_db
+class TestUserCard:
+    """Tests for the user_card view"""
+
+    def test_card(self, author, submission, client):
+        response = client.get(reverse("apps.user:user_card", args=["test_author"]))
+
+        assert response["Cache-Control"] == "private, max-age=60"
+        assert response.json() == {
+            "username": "test_author",
+            "name": "Test",
+            "karma": 0,
+            "submission_count": 1,
+            "comment_count": 0,
+            "joined": author.date_joined.date().isoformat(),
+            "url": reverse("apps.user:user_profile", args=["test_author"]),
+        }
+
+    def test_anonymous_and_deleted(self, author, client):
+        assert Client().get(reverse("apps.user:user_card", args=["test_author"])).status_code == 403
+        User.objects.create_user(username="test_gone", password="test_password").mark_deleted()
+
+        assert client.get(reverse("apps.user:user_card", args=["test_gone"])).status_code == 404
+        assert client.get(reverse("apps.user:user_card", args=["nobody"])).status_code == 404
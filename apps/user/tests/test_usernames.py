@@ -0,0 +1,146 @@
+"""
+Tests for username availability and completion.
+"""
+
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from apps.user.forms import UserForm
+from apps.user.models import User
+from apps.user.utils import usernames
+from apps.user.utils.usernames import BloomFilter, complete_username, username_taken
+
+
+@pytest.fixture(autouse=True)
+def fresh_filter():
+    usernames.forget_filter()
+    yield
+    usernames.forget_filter()
+
+
+def wait_for_rebuild():
+    if usernames._rebuild is not None:
+        usernames._rebuild.join()
+
+
+@pytest.fixture
+def alice():
+    return User.objects.create_user(username="Alice", password="test_password")
+
+
+class TestBloomFilter:
+    """Tests for BloomFilter"""
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        names = ["USER{}".format(i) for i in range(1000)]
+        for name in names:
+            bloom.add(name)
+
+        assert all(name in bloom for name in names)
+        false_positives = sum("OTHER{}".format(i) in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+@pytest.mark.django_db
+class TestUsernames:
+    """Tests for username_taken and complete_username"""
+
+    def test_taken_in_any_case(self, alice, django_assert_num_queries):
+        usernames.refresh_filter()
+
+        assert username_taken("ALICE") and username_taken("alice")
+        # Free names the filter has never seen need no query.
+        with django_assert_num_queries(0):
+            assert not username_taken("bob_the_first")
+
+    def test_learns_new_names(self, alice):
+        usernames.refresh_filter()
+        User.objects.create_user(username="Bob", password="test_password")
+
+        assert username_taken("bob")
+
+    def test_complete(self, alice):
+        User.objects.create_user(username="alfred", password="test_password")
+        User.objects.create_user(username="al_gone", password="test_password").mark_deleted()
+        User.objects.create_user(username="bob", password="test_password")
+
+        assert complete_username("AL") == ["alfred", "Alice"]
+        assert complete_username("al", limit=1) == ["alfred"]
+        assert complete_username("al%") == []
+        assert complete_username("") == []
+
+    def test_form_rejects_other_case(self, alice):
+        usernames.refresh_filter()
+        # Registered through another process, this one's filter does not know it.
+        User.objects.bulk_create([User(username="Carol")])
+        assert not username_taken("carol")
+        assert not UserForm({"username": "cAROL", "password": "test_password"}).is_valid()
+
+        form = UserForm({"username": "aLiCe", "password": "test_password"})
+
+        assert not form.is_valid()
+        assert form.errors["username"] == ["This username is already taken."]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRebuild:
+    """Tests for rebuilding the filter, the rebuild thread needs committed data"""
+
+    def test_rebuilds_in_background(self, settings, alice, django_assert_num_queries):
+        # No filter yet: looked up, and a build starts.
+        assert username_taken("alice")
+        wait_for_rebuild()
+        User.objects.bulk_create([User(username="Carol")])
+        assert not username_taken("carol")
+
+        settings.USERNAME_FILTER_MAX_AGE = 0
+        # The old filter answers while the new one is built.
+        with django_assert_num_queries(0):
+            assert not username_taken("carol")
+        wait_for_rebuild()
+        settings.USERNAME_FILTER_MAX_AGE = 300
+        assert username_taken("carol")
+
+
+@pytest.mark.django_db
+class TestViews:
+    """Tests for username_check and username_search"""
+
+    def test_check(self, alice):
+        usernames.refresh_filter()
+        client = Client()
+        url = reverse("username_check")
+
+        assert client.get(url, {"username": "alice"}).json()["available"] is False
+        assert client.get(url, {"username": "ab"}).json() == {
+            "username": "ab",
+            "available": False,
+            "message": "Ensure this value has at least 3 characters (it has 2).",
+        }
+        response = client.get(url, {"username": "new_name"})
+        assert response.json()["available"] is True
+
+    def test_search(self, alice):
+        url = reverse("username_search")
+        assert Client().get(url, {"q": "al"}).status_code == 403
+
+        client = Client()
+        client.force_login(alice)
+        assert client.get(url, {"q": "al"}).json() == {"usernames": ["Alice"]}
+
+
+@pytest.mark.django_db
+class TestAdminSearch:
+    """Tests for UserAdmin.get_search_results"""
+
+    def test_prefix_in_any_case(self, alice):
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="test_password")
+        User.objects.create_user(username="bob", password="test_password")
+        client = Client()
+        client.force_login(admin)
+        url = reverse("admin:user_user_changelist")
+
+        assert [u.username for u in client.get(url, {"q": "AL"}).context["cl"].result_list] == ["Alice"]
+        assert list(client.get(url, {"q": "a%"}).context["cl"].result_list) == []
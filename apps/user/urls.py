@@ -6,5 +6,6 @@ app_name = "apps.user"
 urlpatterns = [
     re_path(r"^$", views.user_profile, name="user_profile"),
     re_path(r"^(?P<username>[0-9a-zA-Z_]*)/$", views.user_profile, name="user_profile"),
+    re_path(r"^(?P<username>[0-9a-zA-Z_]+)/card/$", views.user_card, name="user_card"),
     re_path(r"^edit-profile/$", views.edit_profile, name="edit_profile"),
 ]
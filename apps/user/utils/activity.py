@@ -0,0 +1,95 @@
+"""
+Keyset-paginated activity feed of a user's submissions and comments.
+
+Both tables are read through their (author, timestamp, id) index, newest
+first, and merged in Python. The position in the feed is carried by an
+opaque cursor instead of an OFFSET, so every page costs the same no matter
+how deep the user scrolls.
+"""
+import base64
+import heapq
+from collections import namedtuple
+from datetime import datetime
+
+from django.db.models import Q
+
+from apps.blog.models import Comment, Submission
+
+ActivityItem = namedtuple("ActivityItem", ["kind", "obj"])
+
+# Tie breaker between the two tables when timestamps are equal.
+KIND_RANK = {"comment": 0, "submission": 1}
+
+
+def encode_cursor(item):
+    raw = "{}|{}|{}".format(item.obj.timestamp.isoformat(), KIND_RANK[item.kind], item.obj.id)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    :return: (timestamp, kind rank, id) of the last item on the previous page
+    :raises ValueError: if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, rank, pk = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(rank), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _after(kind, cursor):
+    """:return: Filter for rows of ``kind`` that sort after ``cursor`` in the feed"""
+    timestamp, rank, pk = cursor
+    # timestamp__lte keeps the condition sargable on the index
+    older = Q(timestamp__lt=timestamp)
+    if KIND_RANK[kind] < rank:
+        older |= Q(timestamp=timestamp)
+    elif KIND_RANK[kind] == rank:
+        older |= Q(pk__lt=pk)
+    return Q(timestamp__lte=timestamp) & older
+
+
+def _page(kind, queryset, cursor, limit):
+    if cursor:
+        queryset = queryset.filter(_after(kind, cursor))
+    return [ActivityItem(kind, obj) for obj in queryset.order_by("-timestamp", "-id")[:limit]]
+
+
+def user_activity(user, cursor=None, limit=25):
+    """
+    One page of a user's submissions and comments, newest first.
+
+    :param user: Author whose activity is listed
+    :type user: User
+    :param cursor: Cursor returned with the previous page, None for the first page
+    :type cursor: str
+    :param limit: Page size
+    :type limit: int
+    :return: Items on the page and the cursor of the next page (None on the last page)
+    :rtype: tuple[list[ActivityItem], str | None]
+    :raises ValueError: if the cursor is malformed
+    """
+
+    position = decode_cursor(cursor) if cursor else None
+
+    submissions = Submission.objects.visible().filter(author=user).only("id", "title", "timestamp", "comment_count")
+    comments = (
+        Comment.objects.filter(author=user, submission__deleted=False)
+        .select_related("submission")
+        .only("id", "content", "timestamp", "submission__id", "submission__title")
+    )
+
+    merged = heapq.merge(
+        _page("submission", submissions, position, limit + 1),
+        _page("comment", comments, position, limit + 1),
+        key=lambda item: (item.obj.timestamp, KIND_RANK[item.kind], item.obj.id),
+        reverse=True,
+    )
+    items = list(merged)[: limit + 1]
+
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_cursor(items[-1])
+    return items, None
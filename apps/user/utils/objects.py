@@ -0,0 +1,9 @@
+"""
+Users served from the object cache, see apps.perf.objects.
+"""
+
+from apps.perf.objects import ObjectCache
+
+from ..models import User
+
+users = ObjectCache(User, alias="username")
@@ -0,0 +1,91 @@
+"""
+Cached parts of the profile page.
+
+The activity feed is the expensive part of a profile and the same for
+every reader, so the HTML of its first page is cached per user under a
+version that is replaced whenever the user posts, edits or deletes
+something. Karma, which moves with every vote on the user's comments, and
+the other counters are not part of it: they are rendered from the user
+row, itself served by the object cache (see ``apps.user.utils.objects``),
+so votes never throw the rendered feed away.
+
+The hovercard of author links, :func:`profile_card`, is built from the
+same cached user row.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from .activity import user_activity
+
+
+def _version_key(user_id):
+    return "profile-version:{}".format(user_id)
+
+
+def profile_version(user_id):
+    """:return: Current version of the user's cached activity HTML"""
+
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh version even after eviction, so no stale HTML is picked up again.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_profile(user_id):
+    """Retire the cached activity HTML of a user once the transaction commits."""
+
+    transaction.on_commit(lambda: cache.set(_version_key(user_id), time.time_ns(), None))
+
+
+def activity_html(user, cursor=None):
+    """
+    Render one page of the user's activity feed, the first one from the cache.
+
+    :param user: Author whose activity is listed
+    :type user: User
+    :param cursor: Cursor of the page, None for the first page
+    :type cursor: str
+    :rtype: SafeString
+    :raises ValueError: if the cursor is malformed
+    """
+
+    if cursor:
+        return _render_activity(user, cursor)
+
+    key = "profile-activity:{}:{}".format(user.pk, profile_version(user.pk))
+    html = cache.get(key)
+    if html is None:
+        html = _render_activity(user)
+        cache.set(key, html, settings.PROFILE_CACHE_TIMEOUT)
+    return html
+
+
+def _render_activity(user, cursor=None):
+    activity, next_cursor = user_activity(user, cursor=cursor)
+    return render_to_string("profile_activity.html", {"activity": activity, "next_cursor": next_cursor})
+
+
+def profile_card(user):
+    """
+    :return: What the hovercard of an author link shows
+    :rtype: dict
+    """
+
+    return {
+        "username": user.username,
+        "name": user.get_full_name(),
+        "karma": user.karma,
+        "submission_count": user.submission_count,
+        "comment_count": user.comment_count,
+        "joined": user.date_joined.date().isoformat(),
+        "url": reverse("apps.user:user_profile", args=[user.username]),
+    }
@@ -0,0 +1,203 @@
+"""
+Username availability and @mention completion without a query per keystroke.
+
+Usernames are compared case-insensitively, through the index on
+``UPPER(username) COLLATE "C"``. Registration checks a name with
+:func:`username_exists`, always a lookup of that index.
+
+The live check while a name is typed, :func:`username_taken`, asks a Bloom
+filter of every username first, kept in each process: a name the filter
+has never seen is reported free without asking the database. Only names it
+may have seen, the taken ones and ``USERNAME_FILTER_ERROR_RATE`` of the
+free ones, are looked up.
+
+The filter is built at warm-up (see ``config.warmup``) and rebuilt in a
+background thread once it is ``USERNAME_FILTER_MAX_AGE`` seconds old, so
+no request scans the User table. Until a process has a filter every check
+is a lookup. The filter learns the names registered in its own process at
+once, names registered through other processes only with its next
+rebuild: until then the live check may report them free, registration
+still rejects them. Names freed by deleting an account stay in the filter
+(a Bloom filter cannot forget) and are found free by the lookup.
+"""
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.functions import Collate, Upper
+
+from apps.perf.metrics import registry
+
+from ..models import User
+
+logger = logging.getLogger(__name__)
+
+# Expression of the user_user_username_upper_idx index, comparisons must use it verbatim.
+USERNAME_KEY = Collate(Upper("username"), "C")
+
+# What can start a valid username, anything else matches no one.
+USERNAME_PREFIX = re.compile(r"^[0-9a-zA-Z_]{1,20}$")
+
+_lock = threading.Lock()
+_filter = None
+# Thread building the next filter, see _current_filter.
+_rebuild = None
+
+
+class BloomFilter:
+    """
+    Set of strings answering "maybe present" or "certainly absent".
+
+    :param capacity: Number of values it is sized for, more raise the error rate
+    :type capacity: int
+    :param error_rate: Share of absent values reported as maybe present at capacity
+    :type error_rate: float
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.built = time.monotonic()
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        self.count += 1
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def build_filter():
+    """
+    :return: A filter of every username in the User table, deleted accounts
+             included: their rows still hold the name
+    :rtype: BloomFilter
+    """
+
+    # Room to grow until the next rebuild without passing the error rate.
+    bloom = BloomFilter(User.objects.count() * 2 + 1000, settings.USERNAME_FILTER_ERROR_RATE)
+    for username in User.objects.values_list("username", flat=True).iterator(chunk_size=10000):
+        bloom.add(username.upper())
+    return bloom
+
+
+def refresh_filter():
+    """
+    Build this process's filter now, called at warm-up.
+
+    :return: Number of usernames in it
+    :rtype: int
+    """
+
+    global _filter
+    _filter = build_filter()
+    return _filter.count
+
+
+def _refresh_in_background():
+    try:
+        refresh_filter()
+    except Exception:
+        logger.exception("username filter rebuild failed")
+    finally:
+        # The thread's own connection, nothing else would close it.
+        connection.close()
+
+
+def _current_filter():
+    """
+    :return: The filter of this process, None until the first one is built.
+             A missing or old filter is rebuilt by a background thread, the
+             current one keeps answering meanwhile.
+    :rtype: BloomFilter | None
+    """
+
+    global _rebuild
+    bloom = _filter
+    if bloom is None or time.monotonic() - bloom.built > settings.USERNAME_FILTER_MAX_AGE:
+        with _lock:
+            if _rebuild is None or not _rebuild.is_alive():
+                _rebuild = threading.Thread(target=_refresh_in_background, name="username-filter", daemon=True)
+                _rebuild.start()
+    return bloom
+
+
+def remember_username(username):
+    """Add a new or renamed user's name to this process's filter."""
+
+    if _filter is not None:
+        _filter.add(username.upper())
+
+
+def forget_filter():
+    """Drop this process's filter, the next check builds it again."""
+
+    global _filter
+    _filter = None
+
+
+def username_exists(username):
+    """
+    :param username: Name to check, in any case
+    :type username: str
+    :return: Whether an account, possibly deleted, has the name in any case
+    :rtype: bool
+    """
+
+    return User.objects.annotate(key=USERNAME_KEY).filter(key=username.upper()).exists()
+
+
+def username_taken(username):
+    """
+    :func:`username_exists` for the live check while a name is typed,
+    most free names are answered by the filter. May report a name
+    registered through another process as free, see the module docstring.
+
+    :param username: Name to check, in any case
+    :type username: str
+    :rtype: bool
+    """
+
+    bloom = _current_filter()
+    if bloom is not None and username.upper() not in bloom:
+        registry.inc("username_checks_total", answer="filter")
+        return False
+    registry.inc("username_checks_total", answer="database")
+    return username_exists(username)
+
+
+def complete_username(prefix, limit=10):
+    """
+    Usernames of live accounts starting with ``prefix`` in any case, for
+    @mention completion. A range scan of the ``UPPER(username)`` index,
+    already in the order returned.
+
+    :param prefix: Start of the name
+    :type prefix: str
+    :param limit: Maximum names returned
+    :type limit: int
+    :rtype: list[str]
+    """
+
+    if not USERNAME_PREFIX.match(prefix):
+        return []
+    return list(
+        User.objects.annotate(key=USERNAME_KEY)
+        .filter(key__startswith=prefix.upper(), deleted_at__isnull=True, is_active=True)
+        .order_by("key")
+        .values_list("username", flat=True)[:limit]
+    )
@@ -1,22 +1,51 @@
 from django.contrib import messages
 from django.contrib.auth import logout, login, authenticate
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
-from django.http import HttpResponseBadRequest, Http404
-from django.shortcuts import render, redirect, get_object_or_404
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, Http404, JsonResponse
+from django.shortcuts import render, redirect
+from django.views.decorators.cache import cache_control
+
+from apps.jobs.queue import enqueue
 
 from .forms import UserForm, UserUpdateForm
+from .utils.profile import activity_html, profile_card
+from .utils.usernames import complete_username, username_taken
 from .utils.helpers import post_only
-from .models import User
+from .utils.objects import users
 
 
 @login_required(login_url="/login/")
 def user_profile(request, username=None):
-    """Handles user profile page."""
-    username = username or request.user.username
-    user = get_object_or_404(User, username=username)
+    """
+    Handles user profile page together with the user's activity feed.
+    The feed is paginated with the opaque ``cursor`` GET parameter, its
+    first page is cached.
+    """
+    user = users.get_by(username) if username else request.user
+    if user is None or user.deleted_at:
+        raise Http404
+
+    try:
+        activity = activity_html(user, cursor=request.GET.get("cursor"))
+    except ValueError:
+        raise Http404
+
+    return render(request, "profile.html", {"profile": user, "activity_html": activity})
+
+
+@cache_control(private=True, max_age=60)
+def user_card(request, username):
+    """
+    The hovercard of author links as JSON, from the cached user row.
+    """
 
-    return render(request, "profile.html", {"profile": user})
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden()
+    user = users.get_by(username)
+    if user is None or user.deleted_at:
+        raise Http404
+    return JsonResponse(profile_card(user))
 
 
 @login_required(login_url="/login/")
@@ -78,7 +107,6 @@ def user_logout(request):
         redirect_page = request.POST.get("current_page", "/")
         logout(request)
         messages.success(request, "Logged out!")
-        print(f"\n\nuser.is_authenticated: {request.user.is_authenticated}\n\n")
         return redirect(redirect_page)
     return redirect("frontpage")
 
@@ -90,6 +118,8 @@ def register(request):
     has been supplied.
 
     If account has been created user is redirected to login page.
+    The welcome mail is handed to the job queue so SMTP latency
+    never delays the response.
     """
     user_form = UserForm()
     if request.user.is_authenticated:
@@ -102,8 +132,48 @@ def register(request):
             user = user_form.save()
             user.set_password(user.password)
             user.save()
+            if user.email:
+                enqueue(
+                    "user.send_mail",
+                    {
+                        "subject": "Welcome to Matolymp",
+                        "message": "Hi {}, your account has been created.".format(user.username),
+                        "recipient_list": [user.email],
+                    },
+                    key="welcome-mail:{}".format(user.pk),
+                )
             # user = authenticate(username=request.POST["username"], password=request.POST["password"])
             # login(request, user)
             return redirect("login")
 
     return render(request, "register.html", {"form": user_form})
+
+
+@cache_control(private=True, max_age=0)
+def username_check(request):
+    """
+    Whether the ``username`` GET parameter can be registered, as JSON, for
+    checking the name while it is typed. Answered by the username filter,
+    most free names cost no query.
+    """
+
+    username = request.GET.get("username", "")
+    field = UserForm.base_fields["username"]
+    try:
+        field.clean(username)
+    except ValidationError as e:
+        return JsonResponse({"username": username, "available": False, "message": e.messages[0]})
+    if username_taken(username):
+        return JsonResponse({"username": username, "available": False, "message": "This username is already taken."})
+    return JsonResponse({"username": username, "available": True, "message": ""})
+
+
+@cache_control(private=True, max_age=60)
+def username_search(request):
+    """
+    Usernames starting with the ``q`` GET parameter as JSON, for @mention completion.
+    """
+
+    if not request.user.is_authenticated:
+        return HttpResponseForbidden()
+    return JsonResponse({"usernames": complete_username(request.GET.get("q", ""))})
@@ -0,0 +1,106 @@
+"""
+Gunicorn configuration, used as ``gunicorn -c config/gunicorn.py``.
+
+Every setting can be overridden from the environment (``GUNICORN_*``), the
+defaults size the pool from the CPU count for the selected worker class:
+
+* ``sync`` (default): one request per process, ``2 * cores + 1`` processes.
+  Best for CPU-bound pages next to a fast database.
+* ``gthread``: ``cores + 1`` processes with 4 threads each, overlaps
+  database round trips and keeps idle keep-alive connections off the
+  request threads.
+* ``gevent``: ``cores + 1`` processes with up to 100 greenlets each. Needs
+  gevent installed; every greenlet holds its own database connection, so
+  mind the server's connection limit.
+
+With ``GUNICORN_PRELOAD`` (the default except for gevent, whose monkey
+patching must happen before the app is imported) the application, and
+with it the warm-up in ``config.wsgi``, is loaded once in the master and
+shared by the forked workers. Database connections must not be shared
+across the fork, so the master closes them before forking and every
+worker opens its own.
+
+``python manage.py loadtest`` compares the worker classes locally.
+"""
+
+import multiprocessing
+import os
+
+
+def _env(name, default):
+    return os.environ.get("GUNICORN_" + name, default)
+
+
+def _env_int(name, default):
+    return int(_env(name, default))
+
+
+def _env_bool(name, default):
+    return str(_env(name, default)).lower() in ("1", "true", "yes", "on")
+
+
+WORKER_CLASSES = ("sync", "gthread", "gevent")
+
+
+def default_workers(worker_class, cores):
+    """
+    :param worker_class: One of WORKER_CLASSES
+    :param cores: Number of CPUs available
+    :return: Number of worker processes for the worker class
+    :rtype: int
+    """
+
+    if worker_class == "sync":
+        return 2 * cores + 1
+    return cores + 1
+
+
+def default_threads(worker_class):
+    """:return: Number of threads per worker process for the worker class"""
+
+    return 4 if worker_class == "gthread" else 1
+
+
+wsgi_app = "config.wsgi:application"
+
+worker_class = _env("WORKER_CLASS", "sync")
+if worker_class not in WORKER_CLASSES:
+    raise ValueError("GUNICORN_WORKER_CLASS must be one of {}".format(", ".join(WORKER_CLASSES)))
+
+workers = _env_int("WORKERS", default_workers(worker_class, multiprocessing.cpu_count()))
+threads = _env_int("THREADS", default_threads(worker_class))
+worker_connections = _env_int("WORKER_CONNECTIONS", 100)
+
+# Seconds an idle client connection is held open. Sync workers ignore it.
+keepalive = _env_int("KEEPALIVE", 5)
+# Recycle workers every ~1000 requests, staggered so they do not all restart at once.
+max_requests = _env_int("MAX_REQUESTS", 1000)
+max_requests_jitter = _env_int("MAX_REQUESTS_JITTER", 100)
+# A worker silent for this long is killed; on restart in-flight requests get graceful_timeout to finish.
+timeout = _env_int("TIMEOUT", 30)
+graceful_timeout = _env_int("GRACEFUL_TIMEOUT", 30)
+
+preload_app = _env_bool("PRELOAD", worker_class != "gevent")
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    from config.warmup import mark_boot
+
+    mark_boot()
+
+
+def post_worker_init(worker):
+    if worker.cfg.preload_app:
+        from django.conf import settings
+
+        from config.warmup import connect
+
+        if settings.WARMUP_ON_START:
+            connect()
@@ -84,8 +84,10 @@ THIRD_PARTY_APPS = [
 ]
 
 LOCAL_APPS = [
+    "apps.jobs",
     "apps.user",
     "apps.blog",
+    "apps.perf",
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -131,13 +133,16 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "apps.perf.middleware.TimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "apps.perf.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "apps.perf.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "allauth.account.middleware.AccountMiddleware",
@@ -170,7 +175,9 @@ MEDIA_URL = "/media/"
 TEMPLATES = [
     {
         # https://docs.djangoproject.com/en/dev/ref/settings/#std:setting-TEMPLATES-BACKEND
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that adds render time to the request timings.
+        "BACKEND": "apps.perf.backends.TimedDjangoTemplates",
+        "NAME": "django",
         # https://docs.djangoproject.com/en/dev/ref/settings/#dirs
         "DIRS": [str(APPS_DIR / "templates")],
         # https://docs.djangoproject.com/en/dev/ref/settings/#app-dirs
@@ -247,15 +254,25 @@ LOGGING = {
         "verbose": {
             "format": "%(levelname)s %(asctime)s %(module)s %(process)d %(thread)d %(message)s",
         },
+        "json": {"()": "apps.perf.log.JsonFormatter"},
     },
     "handlers": {
         "console": {
             "level": "DEBUG",
             "class": "logging.StreamHandler",
             "formatter": "verbose",
-        }
+        },
+        "json_console": {
+            "level": "DEBUG",
+            "class": "logging.StreamHandler",
+            "formatter": "json",
+        },
     },
     "root": {"level": "INFO", "handlers": ["console"]},
+    "loggers": {
+        # One JSON line per request with its timings, see apps.perf.middleware.
+        "apps.perf.requests": {"level": "INFO", "handlers": ["json_console"], "propagate": False},
+    },
 }
 
 
@@ -280,3 +297,102 @@ SOCIALACCOUNT_FORMS = {"signup": "apps.user.forms.UserSocialSignupForm"}
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+
+# Background jobs
+# ------------------------------------------------------------------------------
+# Run job handlers inline instead of queueing them (no worker needed).
+JOBS_ALWAYS_EAGER = env.bool("DJANGO_JOBS_ALWAYS_EAGER", default=False)
+# "database" polls the jobs table, "redis" wakes workers through the default cache's redis.
+JOBS_TRANSPORT = env("DJANGO_JOBS_TRANSPORT", default="database")
+# Base delay in seconds before a failed job is retried, doubled on every attempt.
+JOBS_RETRY_BACKOFF = 10
+# Seconds a claimed job is hidden from other workers, it runs again if its worker dies meanwhile.
+JOBS_LEASE = 300
+
+# Pagination
+# ------------------------------------------------------------------------------
+# Above this many (estimated) rows paginators trust planner estimates instead of COUNT(*).
+PAGINATOR_ESTIMATE_THRESHOLD = 10000
+# Seconds an exact count below the threshold is cached for.
+PAGINATOR_COUNT_CACHE_TIMEOUT = 60
+
+# Comment threads
+# ------------------------------------------------------------------------------
+# Replies deeper than this are collapsed behind a "continue this thread" link.
+COMMENT_TREE_MAX_DEPTH = 8
+# Seconds the rendered thread HTML is cached for, it is also replaced whenever a comment changes.
+# Bounds how stale the "x minutes ago" timestamps get.
+THREAD_CACHE_TIMEOUT = 60
+# Seconds a user's votes in a thread are cached for, dropped whenever the user votes there.
+THREAD_VOTES_CACHE_TIMEOUT = 600
+
+# Object cache
+# ------------------------------------------------------------------------------
+# Seconds hot rows (submissions, users) stay in the shared cache, see apps.perf.objects.
+# Saves and deletes drop them at once.
+OBJECT_CACHE_TIMEOUT = 300
+# Rows kept in each process, and for how many seconds: how long other
+# processes may serve a row after it changed.
+OBJECT_CACHE_LOCAL_SIZE = 1000
+OBJECT_CACHE_LOCAL_TIMEOUT = 2
+
+# Profiles
+# ------------------------------------------------------------------------------
+# Seconds the first page of a user's activity feed is cached for, it is also replaced whenever
+# the user posts, edits or deletes. Bounds how stale other users' comment counts on it get.
+PROFILE_CACHE_TIMEOUT = 60
+
+# Usernames
+# ------------------------------------------------------------------------------
+# Share of free usernames the availability filter still looks up, see apps.user.utils.usernames.
+USERNAME_FILTER_ERROR_RATE = 0.01
+# Seconds before a process rebuilds its filter in the background, and so learns the names registered elsewhere.
+USERNAME_FILTER_MAX_AGE = 300
+
+# Worker warm-up
+# ------------------------------------------------------------------------------
+# Compile templates, prime the URLconf and content types and connect when config.wsgi is loaded.
+WARMUP_ON_START = env.bool("DJANGO_WARMUP_ON_START", default=False)
+
+# Metrics
+# ------------------------------------------------------------------------------
+# Directory the workers share their metrics through, unset reports only the serving process.
+METRICS_DIR = env("DJANGO_METRICS_DIR", default="")
+# Seconds between writes of a worker's metrics to METRICS_DIR.
+METRICS_FLUSH_INTERVAL = 1.0
+# Bearer token for scrapers, staff users can always read /metrics.
+METRICS_TOKEN = env("DJANGO_METRICS_TOKEN", default="")
+
+# Compression
+# ------------------------------------------------------------------------------
+# Content types of dynamic responses compressed by apps.perf.middleware.CompressionMiddleware.
+COMPRESSION_TYPES = ("text/html", "text/plain", "application/json", "text/css", "text/javascript")
+# Bodies shorter than this many bytes are sent uncompressed.
+COMPRESSION_MIN_SIZE = 1024
+# Send responses that used the CSRF token uncompressed. Off: Django masks the token
+# differently in every response, its own mitigation of BREACH.
+COMPRESSION_SKIP_CSRF = False
+# Strip indentation and repeated spaces from rendered .html templates.
+HTML_MINIFY = env.bool("DJANGO_HTML_MINIFY", default=False)
+
+# Profiling
+# ------------------------------------------------------------------------------
+# Let staff users profile a request with ?profile=sample|cprofile, see apps.perf.profiling.
+PROFILING_ON_DEMAND = env.bool("DJANGO_PROFILING_ON_DEMAND", default=True)
+# Sample every Nth request of each process into the profile store, 0 for none.
+PROFILING_SAMPLE_RATE = env.int("DJANGO_PROFILING_SAMPLE_RATE", default=0)
+# Seconds between two stack samples.
+PROFILING_INTERVAL = 0.002
+# Directory the workers store their profiles in, and how many of the newest are kept.
+PROFILING_DIR = env("DJANGO_PROFILING_DIR", default="/tmp/matolymp-profiles")
+PROFILING_KEEP = 500
+
+# Load testing
+# ------------------------------------------------------------------------------
+# Objectives `manage.py load_driver` fails on: per endpoint (or "all"), latency
+# percentiles in milliseconds and the share of failed requests.
+LOADTEST_SLOS = {
+    "all": {"p99": 1000, "error_rate": 0.01},
+    "frontpage": {"p95": 200},
+    "comments": {"p95": 300},
+}
@@ -18,7 +18,7 @@ ALLOWED_HOSTS = ["localhost", "0.0.0.0", "127.0.0.1"]
 # https://docs.djangoproject.com/en/dev/ref/settings/#caches
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": "apps.perf.cache.LocMemCache",
         "LOCATION": "",
     }
 }
@@ -56,3 +56,4 @@ INSTALLED_APPS += ["django_extensions"]  # noqa: F405
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+JOBS_ALWAYS_EAGER = env.bool("DJANGO_JOBS_ALWAYS_EAGER", default=True)
@@ -16,7 +16,8 @@ DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # no
 # ------------------------------------------------------------------------------
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        # django_redis.cache.RedisCache adding cache time to the request timings.
+        "BACKEND": "apps.perf.cache.RedisCache",
         "LOCATION": env("REDIS_URL"),
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
@@ -101,6 +102,7 @@ LOGGING = {
         "verbose": {
             "format": "%(levelname)s %(asctime)s %(module)s %(process)d %(thread)d %(message)s",
         },
+        "json": {"()": "apps.perf.log.JsonFormatter"},
     },
     "handlers": {
         "mail_admins": {
@@ -113,9 +115,15 @@ LOGGING = {
             "class": "logging.StreamHandler",
             "formatter": "verbose",
         },
+        "json_console": {
+            "level": "DEBUG",
+            "class": "logging.StreamHandler",
+            "formatter": "json",
+        },
     },
     "root": {"level": "INFO", "handlers": ["console"]},
     "loggers": {
+        "apps.perf.requests": {"level": "INFO", "handlers": ["json_console"], "propagate": False},
         "django.request": {
             "handlers": ["mail_admins"],
             "level": "ERROR",
@@ -132,3 +140,7 @@ LOGGING = {
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+JOBS_TRANSPORT = env("DJANGO_JOBS_TRANSPORT", default="redis")
+WARMUP_ON_START = env.bool("DJANGO_WARMUP_ON_START", default=True)
+METRICS_DIR = env("DJANGO_METRICS_DIR", default="/tmp/matolymp-metrics")
+HTML_MINIFY = env.bool("DJANGO_HTML_MINIFY", default=True)
@@ -35,3 +35,4 @@ TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore # noqa: F405
 MEDIA_URL = "http://media.testserver"
 # Your stuff...
 # ------------------------------------------------------------------------------
+JOBS_ALWAYS_EAGER = env.bool("DJANGO_JOBS_ALWAYS_EAGER", default=True)
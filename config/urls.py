@@ -7,6 +7,7 @@ from django.views import defaults as default_views
 from django.views.generic import TemplateView
 
 from apps.blog.views import frontpage
+from apps.perf import views as perf_views
 from apps.user import views as user_views
 
 
@@ -21,6 +22,12 @@ urlpatterns = [
     path("login/", user_views.user_login, name="login"),
     path("logout/", user_views.user_logout, name="logout"),
     path("register/", user_views.register, name="register"),
+    path("register/check/", user_views.username_check, name="username_check"),
+    path("users/search/", user_views.username_search, name="username_search"),
+    path("metrics", perf_views.metrics, name="metrics"),
+    path("profiles/", perf_views.profiles, name="profiles"),
+    path("profiles/view/<str:view>", perf_views.profile_view, name="profile_view"),
+    path("profiles/<str:name>", perf_views.profile_report, name="profile_report"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 
@@ -0,0 +1,183 @@
+"""
+Start-up warm-up for WSGI workers.
+
+Without it every freshly started worker pays for URL resolver compilation,
+template loading and compilation, ContentType cache fills, the first
+database connection and the username filter while serving its first
+request. ``warm_up`` does that work up front: in the gunicorn master when
+``preload_app`` is on (workers inherit the result copy-on-write),
+otherwise in each worker on import of ``config.wsgi``.
+
+``FirstRequestTimer`` wraps the WSGI application and logs how long after
+boot the first request was answered.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Reset by mark_boot() when a worker is forked from a preloaded master.
+_booted = time.monotonic()
+
+
+def mark_boot():
+    """Restart the boot clock, called in a freshly forked worker."""
+
+    global _booted
+    _booted = time.monotonic()
+
+
+def since_boot():
+    """:return: Seconds elapsed since the process (or worker) booted"""
+
+    return time.monotonic() - _booted
+
+
+def compile_templates():
+    """
+    Compile every template in the template engines' DIRS.
+
+    Django's cached loader keeps the compiled templates, so later
+    ``get_template`` calls in this process (and forked children) are free.
+
+    :return: Number of templates compiled
+    :rtype: int
+    """
+
+    from django.template import TemplateSyntaxError, engines
+    from django.template.backends.django import DjangoTemplates
+
+    compiled = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for directory in engine.engine.dirs:
+            root = Path(directory)
+            for path in sorted(root.rglob("*")):
+                if not path.is_file() or path.name.startswith("."):
+                    continue
+                name = path.relative_to(root).as_posix()
+                try:
+                    engine.get_template(name)
+                except (TemplateSyntaxError, UnicodeDecodeError) as e:
+                    logger.warning("warm-up: could not compile template %s: %s", name, e)
+                else:
+                    compiled += 1
+    return compiled
+
+
+def prime_urls():
+    """
+    Populate the root URL resolver and the ones it includes.
+
+    :return: Number of URL names known to the resolver
+    :rtype: int
+    """
+
+    from django.urls import get_resolver
+
+    return len(get_resolver().reverse_dict)
+
+
+def prime_content_types():
+    """
+    Fill the ContentType cache for every installed model.
+
+    :return: Number of content types cached
+    :rtype: int
+    """
+
+    from django.apps import apps
+    from django.contrib.contenttypes.models import ContentType
+
+    return len(ContentType.objects.get_for_models(*apps.get_models()))
+
+
+def connect():
+    """
+    Open the connection for every configured database.
+
+    :return: Number of connections opened
+    :rtype: int
+    """
+
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return len(connections.all())
+
+
+def load_usernames():
+    """
+    Build the username availability filter, see apps.user.utils.usernames.
+
+    :return: Number of usernames in it
+    :rtype: int
+    """
+
+    from apps.user.utils.usernames import refresh_filter
+
+    return refresh_filter()
+
+
+# URLs first: importing the views registers the filters some templates use.
+STEPS = (
+    ("urls", prime_urls),
+    ("templates", compile_templates),
+    ("content_types", prime_content_types),
+    ("connections", connect),
+    ("usernames", load_usernames),
+)
+
+
+def warm_up(steps=STEPS):
+    """
+    Run the warm-up steps, logging their duration.
+
+    A failing step is logged and skipped, a worker that did not warm up is
+    still better than one that did not start.
+
+    :param steps: ``(name, callable)`` pairs, defaults to all steps
+    :type steps: tuple
+    :return: Seconds taken by each successful step, by name
+    :rtype: dict
+    """
+
+    timings = {}
+    for name, step in steps:
+        start = time.monotonic()
+        try:
+            result = step()
+        except Exception:
+            logger.exception("warm-up: %s failed", name)
+            continue
+        timings[name] = time.monotonic() - start
+        logger.info("warm-up: %s (%s) in %.1fms", name, result, timings[name] * 1000)
+    logger.info("warm-up: done %.1fms after boot", since_boot() * 1000)
+    return timings
+
+
+class FirstRequestTimer:
+    """WSGI middleware logging the time from boot to the first answered request."""
+
+    def __init__(self, application):
+        self.application = application
+        self.pending = True
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        response = self.application(environ, start_response)
+        if self.pending:
+            with self.lock:
+                if self.pending:
+                    self.pending = False
+                    logger.info(
+                        "first request %s answered %.1fms after boot",
+                        environ.get("PATH_INFO", ""),
+                        since_boot() * 1000,
+                    )
+        return response
@@ -33,6 +33,17 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
 # file. This includes Django's development server, if the WSGI_APPLICATION
 # setting points here.
 application = get_wsgi_application()
+
+# Pay the first-request costs (templates, URLconf, content types, database
+# connection, username filter) now rather than in the first request. With
+# gunicorn's preload_app this runs once in the master, see config/gunicorn.py.
+from django.conf import settings  # noqa: E402
+
+from config.warmup import FirstRequestTimer, warm_up  # noqa: E402
+
+if settings.WARMUP_ON_START:
+    warm_up()
+application = FirstRequestTimer(application)
 # Apply WSGI middleware here.
 # from helloworld.wsgi import HelloWorldApplication
 # application = HelloWorldApplication(application)
@@ -21,17 +21,85 @@ function csrfSafeMethod(method) {
 }
 
 
-function vote(voteButton) {
-    let csrftoken = getCookie('csrftoken');
+// Votes are sent in batches: clicks are queued and posted together once
+// no click came for VOTE_BATCH_DELAY ms, or when VOTE_BATCH_MAX are queued.
+const VOTE_BATCH_DELAY = 300;
+const VOTE_BATCH_MAX = 100;
+let voteQueue = [];
+let voteTimer = null;
 
-    $.ajaxSetup({
-        beforeSend: function (xhr, settings) {
-            if (!csrfSafeMethod(settings.type) && !this.crossDomain) {
-                xhr.setRequestHeader("X-CSRFToken", csrftoken);
-            }
+
+function updateVote($voteDiv, vote_value, voteDiff) {
+    let $votes = $voteDiv.children('div');
+    let $upvoteArrow = $votes.children('i.fa.fa-chevron-up');
+    let $downArrow = $votes.children('i.fa.fa-chevron-down');
+    let $score = $voteDiv.find("a.score:first");
+
+    // update vote elements
+
+    if (vote_value === -1) {
+        if ($upvoteArrow.hasClass("upvoted")) { // remove upvote, if any.
+            $upvoteArrow.removeClass("upvoted")
+        }
+        if ($downArrow.hasClass("downvoted")) { // Canceled downvote
+            $downArrow.removeClass("downvoted")
+        } else {                                // new downvote
+            $downArrow.addClass("downvoted")
+        }
+    } else if (vote_value === 1) {               // remove downvote
+        if ($downArrow.hasClass("downvoted")) {
+            $downArrow.removeClass("downvoted")
+        }
+
+        if ($upvoteArrow.hasClass("upvoted")) { // if canceling upvote
+            $upvoteArrow.removeClass("upvoted")
+        } else {                                // adding new upvote
+            $upvoteArrow.addClass("upvoted")
+        }
+    }
+
+    // update score element
+    let scoreInt = parseInt($score.text());
+    $score.text(scoreInt += voteDiff);
+}
+
+
+function sendVotes() {
+    clearTimeout(voteTimer);
+    voteTimer = null;
+    if (voteQueue.length === 0) {
+        return;
+    }
+    let batch = voteQueue;
+    voteQueue = [];
+
+    // keepalive: a batch sent while the page is being left is still delivered.
+    fetch('/blog/vote/batch/', {
+        method: 'POST',
+        keepalive: true,
+        credentials: 'same-origin',
+        headers: {'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken')},
+        body: JSON.stringify({
+            votes: batch.map(function (item) {
+                return {id: item.id, value: item.value};
+            })
+        }),
+    }).then(function (response) {
+        return response.ok ? response.json() : null;
+    }).then(function (response) {
+        if (response && response.error == null) {
+            // Results come back in the order the votes were sent.
+            $.each(response.results, function (i, result) {
+                if (result.error == null) {
+                    updateVote(batch[i].$voteDiv, batch[i].value, result.voteDiff);
+                }
+            });
         }
     });
+}
 
+
+function vote(voteButton) {
     let $voteDiv = $(voteButton).parent().parent();
     let $data = $voteDiv.data();
     let direction_name = $(voteButton).attr('title');
@@ -44,62 +112,44 @@ function vote(voteButton) {
         return;
     }
 
-    let doPost = $.post('/blog/vote/', {
-        what_id: $data.whatId,
-        vote_value: vote_value,
-    });
-
-    doPost.done(function (response) {
-        if (response.error == null) {
-            let voteDiff = response.voteDiff;
-            let $score = null;
-            let $upvoteArrow = null;
-            let $downArrow = null;
-
-            // let $medaiDiv = $voteDiv.parent().parent();
-            let $votes = $voteDiv.children('div');
-            $upvoteArrow = $votes.children('i.fa.fa-chevron-up');
-            $downArrow = $votes.children('i.fa.fa-chevron-down');
-            $score = $voteDiv.find("a.score:first");
-
-
-            // update vote elements
-
-            if (vote_value === -1) {
-                if ($upvoteArrow.hasClass("upvoted")) { // remove upvote, if any.
-                    $upvoteArrow.removeClass("upvoted")
-                }
-                if ($downArrow.hasClass("downvoted")) { // Canceled downvote
-                    $downArrow.removeClass("downvoted")
-                } else {                                // new downvote
-                    $downArrow.addClass("downvoted")
-                }
-            } else if (vote_value === 1) {               // remove downvote
-                if ($downArrow.hasClass("downvoted")) {
-                    $downArrow.removeClass("downvoted")
-                }
+    voteQueue.push({id: $data.whatId, value: vote_value, $voteDiv: $voteDiv});
+    if (voteQueue.length >= VOTE_BATCH_MAX) {
+        sendVotes();
+    } else {
+        clearTimeout(voteTimer);
+        voteTimer = setTimeout(sendVotes, VOTE_BATCH_DELAY);
+    }
+}
 
-                if ($upvoteArrow.hasClass("upvoted")) { // if canceling upvote
-                    $upvoteArrow.removeClass("upvoted")
-                } else {                                // adding new upvote
-                    $upvoteArrow.addClass("upvoted")
-                }
-            } else if (vote_value === 0) {               // voting yourself (that's a no-no)
-                if ($upvoteArrow.hasClass("upvoted")) {
-                    $upvoteArrow.removeClass("upvoted")
-                }
-                if ($downArrow.hasClass("downvoted")) {
-                    $downArrow.removeClass("downvoted")
-                }
+// The thread HTML is the same for everyone, the user's own votes are fetched separately.
+function showVotes() {
+    let $section = $('#commentsSection');
+    let url = $section.data('votesUrl');
+    if (!url) {
+        return;
+    }
+    $.getJSON(url, function (votes) {
+        $.each(votes, function (id, value) {
+            let $votes = $section.find('.comment-votes[data-what-id="' + id + '"]').children('div');
+            if (value === 1) {
+                $votes.children('i.fa.fa-chevron-up').addClass("upvoted");
+            } else if (value === -1) {
+                $votes.children('i.fa.fa-chevron-down').addClass("downvoted");
             }
-
-            // update score element
-            let scoreInt = parseInt($score.text());
-            $score.text(scoreInt += voteDiff);
-        }
+        });
     });
 }
 
+$(showVotes);
+
+// Do not lose votes queued just before leaving the page, or before a hidden tab is discarded.
+$(window).on('pagehide', sendVotes);
+$(document).on('visibilitychange', function () {
+    if (document.visibilityState === 'hidden') {
+        sendVotes();
+    }
+});
+
 
 function submitEvent(event, form) {
     event.preventDefault();
@@ -175,6 +225,89 @@ $('a[name="replyButton"]').click(function () {
 
 });
 
+// The thread HTML is shared, so the author's own edit and delete links are added here.
+function postCommentAction(id, action, data) {
+    $.ajax({
+        type: 'POST',
+        url: '/blog/comment/' + id + '/' + action + '/',
+        data: data,
+        headers: {'X-CSRFToken': getCookie('csrftoken')}
+    }).done(function () {
+        location.reload();
+    });
+}
+
+function showCommentActions() {
+    let $section = $('#commentsSection');
+    let username = $section.data('username');
+    if (!username) {
+        return;
+    }
+    $section.find('.media-body[data-parent-id]').each(function () {
+        let $body = $(this);
+        if (String($body.children('h6.media-heading').children('a:first').text()) !== String(username)) {
+            return;
+        }
+        let id = $body.data('parentId');
+        let $buttons = $body.children('.reply-container').children('.buttons');
+        let $edit = $('<li><a href="javascript:void(0)">edit</a></li>');
+        let $delete = $('<li><a href="javascript:void(0)">delete</a></li>');
+
+        $edit.children('a').click(function () {
+            let $content = $body.children('h5:first');
+            if ($body.children('.comment-edit').length) {
+                return;
+            }
+            let $form = $('<form class="comment-edit" style="max-width: 800px;">\
+                              <textarea class="form-control" rows="3"></textarea>\
+                              <button type="submit" class="btn btn-primary">Save</button>\
+                          </form>');
+            $content.after($form);
+            // The raw content, the rendered one has lost its markup.
+            $.getJSON('/blog/comment/' + id + '/source/').done(function (data) {
+                $form.children('textarea').val(data.content);
+            });
+            $form.submit(function (event) {
+                event.preventDefault();
+                let content = $form.children('textarea').val();
+                if (content.trim().length > 0) {
+                    postCommentAction(id, 'edit', {content: content});
+                }
+            });
+        });
+        $delete.children('a').click(function () {
+            if (confirm("Are you sure you want to delete this comment?")) {
+                postCommentAction(id, 'delete', {});
+            }
+        });
+        $buttons.append($edit, $delete);
+    });
+}
+
+$(showCommentActions);
+
+// Author links show the author's karma and post counts when hovered, each
+// author's card is fetched once per page from the profile's card/ URL.
+let userCards = {};
+
+function showUserCard() {
+    let $link = $(this);
+    let href = $link.attr('href');
+    if (!href || href === '#' || $link.attr('title')) {
+        return;
+    }
+    if (!(href in userCards)) {
+        userCards[href] = $.getJSON(href + 'card/');
+    }
+    userCards[href].done(function (card) {
+        $link.attr('title', card.username + (card.name ? ' (' + card.name + ')' : '') + '\n' +
+            card.karma + ' karma, ' + card.submission_count + ' posts, ' + card.comment_count + ' comments\n' +
+            'joined ' + card.joined);
+    });
+}
+
+$(document).on('mouseenter', '#commentsSection h6.media-heading > a, .article-metadata > a.mr-2', showUserCard);
+
 function confirmDelete() {
     if (confirm("Are you sure you want to delete this post?")) {
       document.getElementById("deleteForm").submit();
@@ -182,3 +315,22 @@ function confirmDelete() {
       event.preventDefault();
     }
 }
+
+// Tell whether the username typed on the register page is free, once typing pauses.
+let usernameTimer = null;
+
+$(document).on('input', '.form-signin #id_username', function () {
+    let $input = $(this);
+    clearTimeout(usernameTimer);
+    usernameTimer = setTimeout(function () {
+        $.getJSON('/register/check/', {username: $input.val()}).done(function (data) {
+            let $hint = $input.next('.username-hint');
+            if ($hint.length === 0) {
+                $hint = $('<p class="username-hint"></p>');
+                $input.after($hint);
+            }
+            $hint.toggleClass('text-danger', !data.available).toggleClass('text-success', data.available);
+            $hint.text(data.available ? 'Username is available' : data.message);
+        });
+    }, 300);
+});
@@ -0,0 +1,54 @@
+import logging
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.template import engines
+
+from config.warmup import FirstRequestTimer, compile_templates, warm_up
+
+
+def test_compile_templates_fills_cached_loader():
+    engine = engines["django"].engine
+    loader = engine.template_loaders[0]
+    loader.reset()
+
+    compiled = compile_templates()
+
+    assert compiled >= 16
+    assert "frontpage.html" in loader.get_template_cache
+    assert "comments.html" in loader.get_template_cache
+
+
+@pytest.mark.django_db
+def test_warm_up_runs_every_step(django_assert_num_queries):
+    ContentType.objects.clear_cache()
+
+    timings = warm_up()
+
+    assert set(timings) == {"templates", "urls", "content_types", "connections", "usernames"}
+    with django_assert_num_queries(0):
+        ContentType.objects.get_by_natural_key("blog", "comment")
+
+
+def test_warm_up_skips_failing_steps(caplog):
+    def broken():
+        raise RuntimeError("boom")
+
+    timings = warm_up(steps=(("broken", broken), ("fine", lambda: 1)))
+
+    assert list(timings) == ["fine"]
+    assert "warm-up: broken failed" in caplog.text
+
+
+def test_first_request_logged_once(caplog):
+    def app(environ, start_response):
+        return [b"ok"]
+
+    timed = FirstRequestTimer(app)
+    with caplog.at_level(logging.INFO, logger="config.warmup"):
+        assert timed({"PATH_INFO": "/"}, None) == [b"ok"]
+        timed({"PATH_INFO": "/other/"}, None)
+
+    messages = [r.getMessage() for r in caplog.records if r.name == "config.warmup"]
+    assert len(messages) == 1
+    assert messages[0].startswith("first request / answered")